@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, make_response
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, make_response, send_file
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import sys
@@ -9,14 +9,19 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from models import db, User, Subject, Faculty, Classroom, Batch, Timetable, TimetableEntry, FacultySubject, ClassroomAllocation
 from timetable_optimizer import TimetableOptimizer
 from classroom_allocator import SmartClassroomAllocator, extract_branch_section_from_name, generate_batch_name
+from timetable_jobs import TimetableJobManager
+from timetable_pdf import load_timetable_pdf_data, pdf_content_hash, render_timetable_pdf, render_timetable_pdf_files
+from pdf_cache import PdfCache
+from timetable_persistence import prepare_entry_rows, insert_entry_rows, sync_timetable_entries, parse_cell, load_slot_grid, store_slot_grid
+from slot_grid import SlotGrid
 import json
+import base64
+import random
+import itertools
+import tempfile
+import shutil
+import zipfile
 from functools import wraps
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from io import BytesIO
 from datetime import datetime
 from dotenv import load_dotenv
 from authlib.integrations.flask_client import OAuth
@@ -24,6 +29,7 @@ import requests
 from itsdangerous import URLSafeTimedSerializer
 from flask_mail import Mail, Message
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import secure_filename
 
 load_dotenv()
 
@@ -141,6 +147,15 @@ serializer = URLSafeTimedSerializer(app.secret_key)
 
 db.init_app(app)
 
+# Background timetable generation jobs (in-process, one run at a time)
+job_manager = TimetableJobManager(max_workers=1)
+
+# Rendered timetable PDFs, reused until the timetable changes
+app.config['PDF_CACHE_DIR'] = os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'timetable_pdf_cache'))
+app.config['PDF_CACHE_MAX_ENTRIES'] = int(os.getenv('PDF_CACHE_MAX_ENTRIES', 200))
+app.config['PDF_SPOOL_MAX_SIZE'] = int(os.getenv('PDF_SPOOL_MAX_SIZE', 4 * 1024 * 1024))
+pdf_cache = PdfCache(app.config['PDF_CACHE_DIR'], max_entries=app.config['PDF_CACHE_MAX_ENTRIES'])
+
 # ✅ Initialize database tables on startup (runs on Render)
 with app.app_context():
     try:
@@ -861,10 +876,14 @@ def api_classroom_detail(classroom_id):
 @app.route('/api/classroom-allocations', methods=['GET'])
 @login_required
 def api_classroom_allocations():
-    """Get classroom allocation status and utilization report"""
+    """Get classroom allocation status and utilization report, optionally filtered by day, department or academic year"""
     try:
         allocator = SmartClassroomAllocator()
-        utilization_report = allocator.get_classroom_utilization_report()
+        utilization_report = allocator.get_classroom_utilization_report(
+            day_of_week=request.args.get('day', type=int),
+            department=request.args.get('department'),
+            academic_year=request.args.get('academic_year')
+        )
         
         return jsonify({
             'success': True,
@@ -877,6 +896,7 @@ def api_classroom_allocations():
                 'total_slots_used': report['total_slots_used'],
                 'temporary_allocations': report['temporary_allocations'],
                 'fixed_allocations': report['fixed_allocations'],
+                'max_possible_slots': report['max_possible_slots'],
                 'utilization_percentage': report['utilization_percentage'],
                 'sharing_efficiency': report['sharing_efficiency']
             } for report in utilization_report]
@@ -884,16 +904,73 @@ def api_classroom_allocations():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def encode_suggestion_cursor(entry):
+    """Opaque cursor for the suggestion stream's sort key (day_of_week, time_slot, id) of an entry"""
+    key = json.dumps([entry.day_of_week, entry.time_slot, entry.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_suggestion_cursor(cursor):
+    """Sort key from a cursor made by encode_suggestion_cursor; returns (key or None, error message)"""
+    if not cursor:
+        return None, None
+    try:
+        day_of_week, time_slot, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(day_of_week, int) or not isinstance(time_slot, str) or not isinstance(entry_id, int):
+            raise ValueError
+    except (TypeError, ValueError, AttributeError):
+        return None, 'Invalid cursor'
+    return (day_of_week, time_slot, entry_id), None
+
 @app.route('/api/classroom-allocations/optimize', methods=['POST'])
 @login_required
 def api_optimize_classroom_allocations():
-    """Get optimization suggestions for classroom allocations"""
+    """
+    Get optimization suggestions for classroom allocations, "per_page" at a time.
+    Pass the "next_cursor" of a response as "cursor" to get the following page.
+    With {"mode": "optimal"} the rooms of the user's timetables are reassigned by
+    exact per-slot matching; the changes are committed when "apply" is true.
+    """
     try:
+        data = request.get_json(silent=True) or {}
         allocator = SmartClassroomAllocator()
-        suggestions = allocator.optimize_classroom_assignments()
+        
+        if data.get('mode') == 'optimal':
+            apply = bool(data.get('apply', False))
+            timetable_ids = [timetable.id for timetable in Timetable.query.filter_by(created_by=session['user_id']).all()]
+            changes, score_before, score_after = allocator.assign_classrooms_optimally(timetable_ids, apply=apply)
+            return jsonify({
+                'success': True,
+                'mode': 'optimal',
+                'applied': apply,
+                'total_score_before': score_before,
+                'total_score_after': score_after,
+                'changes': [{
+                    'timetable_entry_id': change['entry'].id,
+                    'batch_name': change['entry'].batch.name,
+                    'subject_name': change['entry'].subject.name,
+                    'current_classroom': change['current_classroom'].name,
+                    'suggested_classroom': change['suggested_classroom'].name,
+                    'improvement_score': change['new_score'] - change['current_score'],
+                    'allocation_type': change['allocation_type'],
+                    'day_of_week': change['entry'].day_of_week,
+                    'time_slot': change['entry'].time_slot
+                } for change in changes]
+            })
+        
+        # Suggestions are streamed from the database and resumed after the cursor's entry
+        per_page = max(1, min(int(data.get('per_page', request.args.get('per_page', 100))), 500))
+        after, error = decode_suggestion_cursor(data.get('cursor', request.args.get('cursor')))
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        page_items = list(itertools.islice(allocator.iter_classroom_suggestions(after=after), per_page + 1))
+        has_more = len(page_items) > per_page
+        suggestions = page_items[:per_page]
         
         return jsonify({
             'success': True,
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': encode_suggestion_cursor(suggestions[-1]['entry']) if has_more else None,
             'suggestions': [{
                 'timetable_entry_id': suggestion['entry'].id,
                 'batch_name': suggestion['entry'].batch.name,
@@ -909,6 +986,51 @@ def api_optimize_classroom_allocations():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/classroom-allocations/bulk', methods=['POST'])
+@login_required
+def api_bulk_classroom_allocations():
+    """Allocate classrooms for many timetable entries in one transaction"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No JSON data received'})
+        
+        timetable_id = data.get('timetable_id')
+        entries = data.get('entries', [])
+        if not timetable_id or not entries:
+            return jsonify({'success': False, 'error': 'Missing required parameters'})
+        
+        timetable = Timetable.query.filter_by(id=timetable_id, created_by=session['user_id']).first()
+        if not timetable:
+            return jsonify({'success': False, 'error': 'Timetable not found'}), 404
+        
+        required_fields = ('batch_id', 'subject_id', 'faculty_id', 'day_of_week', 'time_slot')
+        for index, entry in enumerate(entries):
+            missing = [field for field in required_fields if entry.get(field) is None]
+            if missing:
+                return jsonify({'success': False, 'error': f'Entry {index} is missing: {", ".join(missing)}'})
+        
+        allocator = SmartClassroomAllocator()
+        results = allocator.allocate_classrooms_bulk(entries, timetable.id)
+        if results is None:
+            return jsonify({'success': False, 'error': 'Failed to allocate classrooms'}), 500
+        
+        allocated = [result for result in results if result]
+        return jsonify({
+            'success': True,
+            'allocated_count': len(allocated),
+            'unallocated_count': len(results) - len(allocated),
+            'allocations': [{
+                'classroom_id': result['classroom'].id,
+                'classroom_name': result['classroom'].name,
+                'allocation_type': result['allocation_type'],
+                'is_temporary': result['is_temporary']
+            } if result else None for result in results]
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/classroom-availability', methods=['POST'])
 @login_required
 def api_check_classroom_availability():
@@ -1318,7 +1440,7 @@ def api_batches():
                 semester=data['semester'],
                 student_count=data['student_count'],
                 priority_for_allocation=data.get('priority_for_allocation', 2),
-                # shift will be automatically assigned during timetable generation
+                # shift is chosen during timetable generation and set when the timetable is saved
                 created_by=session['user_id']
             )
             db.session.add(batch)
@@ -1460,14 +1582,49 @@ def api_timetables():
         } for t in timetables]
     })
 
+def serialize_timetable_schedule(timetable_id):
+    """Load a timetable's entries with subject, faculty and classroom names in one joined query"""
+    rows = db.session.query(
+        TimetableEntry.id,
+        TimetableEntry.day_of_week,
+        TimetableEntry.time_slot,
+        TimetableEntry.slot_index,
+        TimetableEntry.subject_id,
+        TimetableEntry.faculty_id,
+        TimetableEntry.classroom_id,
+        TimetableEntry.batch_id,
+        Subject.name.label('subject_name'),
+        Subject.code.label('subject_code'),
+        Faculty.name.label('faculty_name'),
+        Classroom.name.label('classroom_name')
+    ).outerjoin(Subject, TimetableEntry.subject_id == Subject.id
+    ).outerjoin(Faculty, TimetableEntry.faculty_id == Faculty.id
+    ).outerjoin(Classroom, TimetableEntry.classroom_id == Classroom.id
+    ).filter(TimetableEntry.timetable_id == timetable_id).order_by(TimetableEntry.id).all()
+    
+    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    return [{
+        'id': row.id,
+        'day': day_names[row.day_of_week] if row.day_of_week < len(day_names) else 'Unknown',
+        'time_slot': row.time_slot,
+        'slot_index': row.slot_index,
+        'subject_id': row.subject_id,
+        'subject_name': row.subject_name or 'Unknown Subject',
+        'subject_code': row.subject_code or 'N/A',
+        'faculty_id': row.faculty_id,
+        'faculty_name': row.faculty_name or 'Unknown Faculty',
+        'classroom_id': row.classroom_id,
+        'classroom_name': row.classroom_name or 'Unknown Room',
+        'batch_id': row.batch_id,
+        'is_fixed': False
+    } for row in rows]
+
 @app.route('/api/timetables/<int:timetable_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def api_timetable_detail(timetable_id):
     timetable = Timetable.query.get_or_404(timetable_id)
     
     if request.method == 'GET':
-        entries = TimetableEntry.query.filter_by(timetable_id=timetable_id).all()
-        
         # Get timing configuration from timetable model
         timing_config = None
         if timetable.timing_config:
@@ -1476,33 +1633,7 @@ def api_timetable_detail(timetable_id):
             except:
                 timing_config = None
         
-        # Format entries with proper names for frontend display
-        formatted_entries = []
-        for e in entries:
-            # Get related objects
-            subject = Subject.query.get(e.subject_id) if e.subject_id else None
-            faculty = Faculty.query.get(e.faculty_id) if e.faculty_id else None
-            classroom = Classroom.query.get(e.classroom_id) if e.classroom_id else None
-            
-            # Convert day_of_week number to day name
-            day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            day_name = day_names[e.day_of_week] if e.day_of_week < len(day_names) else 'Unknown'
-            
-            formatted_entry = {
-                'id': e.id,
-                'day': day_name,
-                'time_slot': e.time_slot,
-                'subject_id': e.subject_id,
-                'subject_name': subject.name if subject else 'Unknown Subject',
-                'subject_code': subject.code if subject else 'N/A',
-                'faculty_id': e.faculty_id,
-                'faculty_name': faculty.name if faculty else 'Unknown Faculty',
-                'classroom_id': e.classroom_id,
-                'classroom_name': classroom.name if classroom else 'Unknown Room',
-                'batch_id': e.batch_id,
-                'is_fixed': False
-            }
-            formatted_entries.append(formatted_entry)
+        formatted_entries = serialize_timetable_schedule(timetable_id)
         
         return jsonify({
             'success': True,
@@ -1530,39 +1661,18 @@ def api_timetable_detail(timetable_id):
             timetable.academic_year = data.get('academic_year', timetable.academic_year)
             timetable.status = data.get('status', timetable.status)
             
-            # Update timetable entries if provided
+            # Update timetable entries if provided; only changed cells are written
+            changes = None
             if 'entries' in data:
-                # Delete existing entries
-                TimetableEntry.query.filter_by(timetable_id=timetable_id).delete()
-                
-                # Add new entries
-                for entry_data in data['entries']:
-                    # Validate required fields
-                    subject_id = entry_data.get('subject_id')
-                    faculty_id = entry_data.get('faculty_id')
-                    classroom_id = entry_data.get('classroom_id')
-                    day_of_week = entry_data.get('day_of_week')
-                    time_slot = entry_data.get('time_slot')
-                    batch_id = entry_data.get('batch_id')
-                    
-                    # Skip entries with missing required data
-                    if not all([subject_id, faculty_id, classroom_id, day_of_week is not None, time_slot, batch_id]):
-                        print(f"WARNING: Skipping entry with missing data - subject_id: {subject_id}, faculty_id: {faculty_id}, classroom_id: {classroom_id}, day_of_week: {day_of_week}, time_slot: {time_slot}, batch_id: {batch_id}")
-                        continue
-                        
-                    entry = TimetableEntry(
-                        timetable_id=timetable_id,
-                        day_of_week=day_of_week,
-                        time_slot=time_slot,
-                        subject_id=subject_id,
-                        faculty_id=faculty_id,
-                        classroom_id=classroom_id,
-                        batch_id=batch_id
-                    )
-                    db.session.add(entry)
+                rows, skipped, errors = prepare_entry_rows(timetable_id, data['entries'], grid=load_slot_grid(timetable))
+                if errors:
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': 'Invalid timetable entries: ' + '; '.join(errors[:10])}), 400
+                changes = sync_timetable_entries(timetable_id, rows)
             
             db.session.commit()
-            return jsonify({'success': True, 'message': 'Timetable updated successfully'})
+            pdf_cache.invalidate(timetable_id)
+            return jsonify({'success': True, 'message': 'Timetable updated successfully', 'changes': changes})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -1574,99 +1684,346 @@ def api_timetable_detail(timetable_id):
             # Delete timetable
             db.session.delete(timetable)
             db.session.commit()
+            pdf_cache.invalidate(timetable_id)
             return jsonify({'success': True, 'message': 'Timetable deleted successfully'})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/timetables/<int:timetable_id>/entries', methods=['PATCH'])
+@login_required
+def patch_timetable_entry(timetable_id):
+    """
+    Edit one cell, identified by day_of_week, time_slot and batch_id (defaults
+    to the timetable's batch). subject_id, faculty_id and classroom_id set the
+    cell; "clear": true empties it. An optional "from" cell is emptied in the
+    same transaction, which is how the editor moves a class.
+    """
+    timetable = Timetable.query.filter_by(id=timetable_id, created_by=session['user_id']).first_or_404()
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No JSON data received'})
+        
+        batch_id = data.get('batch_id') or timetable.batch_id
+        cell_keys = set()
+        for cell in [data] + ([data['from']] if data.get('from') else []):
+            key, error = parse_cell(cell, batch_id)
+            if error:
+                return jsonify({'success': False, 'error': f'Invalid cell: {error}'}), 400
+            cell_keys.add(key)
+        
+        rows = []
+        if not data.get('clear'):
+            rows, skipped, errors = prepare_entry_rows(timetable_id, [dict(data, batch_id=batch_id)], grid=load_slot_grid(timetable))
+            if skipped or errors:
+                return jsonify({'success': False, 'error': 'Invalid cell: ' + ('; '.join(errors) if errors else 'subject_id, faculty_id and classroom_id are required')}), 400
+        
+        changes = sync_timetable_entries(timetable_id, rows, cells=cell_keys)
+        db.session.commit()
+        pdf_cache.invalidate(timetable_id)
+        return jsonify({'success': True, 'message': 'Timetable entry updated successfully', 'changes': changes})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def parse_generation_request(data):
+    """Validate a timetable generation request; returns (params, error message)"""
+    if not data:
+        return None, 'No JSON data received'
+    
+    batch_id = data.get('batch_id')
+    semester = data.get('semester')
+    academic_year = data.get('academic_year')
+    engine = data.get('engine', 'random')
+    parallel = data.get('parallel', False)
+    improve = data.get('improve', False)
+    seed = data.get('seed')
+    timing = {
+        'include_short_break': data.get('include_short_break', False),
+        'short_break_duration': data.get('short_break_duration', 10),
+        'college_start_time': data.get('college_start_time', '09:00'),
+        'college_end_time': data.get('college_end_time', '16:30'),
+        'lunch_break_duration': data.get('lunch_break_duration', 60),
+        'lunch_break_start_time': data.get('lunch_break_start_time', '12:15')
+    }
+    
+    print(f"Received timing parameters: start={timing['college_start_time']}, end={timing['college_end_time']}, lunch_duration={timing['lunch_break_duration']}, lunch_start={timing['lunch_break_start_time']}")
+    
+    if not all([batch_id, semester, academic_year]):
+        missing = []
+        if not batch_id: missing.append('batch')
+        if not semester: missing.append('semester')
+        if not academic_year: missing.append('academic year')
+        return None, f'Missing required parameters: {", ".join(missing)}'
+    
+    if seed is None:
+        # Pick the seed here so it can be echoed back and the run repeated
+        seed = random.randrange(2 ** 31)
+    else:
+        try:
+            seed = int(seed)
+        except (TypeError, ValueError):
+            return None, 'Seed must be an integer'
+    
+    if engine not in TimetableOptimizer.ENGINES:
+        return None, f'Unknown engine "{engine}". Use one of: {", ".join(TimetableOptimizer.ENGINES)}'
+    
+    # Validate batch exists
+    batch = Batch.query.get(batch_id)
+    if not batch:
+        return None, f'Batch with ID {batch_id} not found'
+    
+    # Check if subjects exist for this semester and department
+    subjects_count = Subject.query.filter_by(
+        department=batch.department,
+        semester=int(semester)
+    ).count()
+    
+    if subjects_count == 0:
+        return None, f'No subjects found for {batch.department} department, semester {semester}. Please add subjects first.'
+    
+    return {
+        'batch_id': batch_id,
+        'semester': semester,
+        'timing': timing,
+        'engine': engine,
+        'parallel': parallel,
+        'improve': improve,
+        'seed': seed,
+        # More options are affordable when they are generated in parallel
+        'num_options': max(1, min(int(data.get('num_options', 3)), 50 if parallel else 10))
+    }, None
+
+def run_generation(params, progress_callback=None, cancel_event=None):
+    """Run the optimizer for parsed generation parameters"""
+    optimizer = TimetableOptimizer(seed=params['seed'], **params['timing'])
+    optimizer.progress_callback = progress_callback
+    optimizer.cancel_event = cancel_event
+    return optimizer.generate_optimized_timetables(
+        batch_id=params['batch_id'],
+        semester=params['semester'],
+        num_options=params['num_options'],
+        engine=params['engine'],
+        parallel=params['parallel'],
+        improve=params['improve'],
+        **params['timing']
+    )
+
 # Timetable generation and saving
 @app.route('/api/generate-timetable', methods=['POST'])
 @login_required
 def generate_timetable():
+    try:
+        params, error = parse_generation_request(request.get_json())
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        
+        # Generate timetable options
+        options = run_generation(params)
+        
+        if not options:
+            return jsonify({
+                'success': False,
+                'message': 'No timetable options could be generated'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'options': options,
+            'seed': params['seed'],
+            'message': f'Generated {len(options)} timetable options'
+        })
+        
+    except Exception as e:
+        print(f"Error generating timetable: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error generating timetable: {str(e)}'
+        }), 500
+
+@app.route('/api/timetable-jobs', methods=['POST'])
+@login_required
+def submit_timetable_job():
+    """Queue a timetable generation run and return its job id immediately"""
+    try:
+        params, error = parse_generation_request(request.get_json())
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        
+        job_id = job_manager.submit(app, session['user_id'], run_generation, params)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'seed': params['seed'],
+            'status_url': url_for('timetable_job_status', job_id=job_id)
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error submitting job: {str(e)}'}), 500
+
+@app.route('/api/timetable-jobs/<job_id>', methods=['GET'])
+@login_required
+def timetable_job_status(job_id):
+    """Poll a generation job's status and progress"""
+    job = job_manager.get(job_id, session['user_id'])
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_manager.describe(job)})
+
+@app.route('/api/timetable-jobs/<job_id>/result', methods=['GET'])
+@login_required
+def timetable_job_result(job_id):
+    """Fetch the options produced by a finished generation job"""
+    job = job_manager.get(job_id, session['user_id'])
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if job['status'] != 'completed':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'message': job['error'] or f'Job is {job["status"]}'
+        }), 409
+    
+    options = job['result'] or []
+    return jsonify({
+        'success': bool(options),
+        'options': options,
+        'message': f'Generated {len(options)} timetable options' if options else 'No timetable options could be generated'
+    })
+
+@app.route('/api/timetable-jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_timetable_job(job_id):
+    """Ask a queued or running generation job to stop"""
+    job = job_manager.get(job_id, session['user_id'])
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({'success': False, 'message': f'Job is already {job["status"]}'}), 409
+    return jsonify({'success': True, 'message': 'Cancellation requested'})
+
+@app.route('/api/generate-timetables/bulk', methods=['POST'])
+@login_required
+def generate_timetables_bulk():
+    """Generate timetables for every batch of a department/semester in one solver run"""
     try:
         data = request.get_json()
-        batch_id = data.get('batch_id')
+        if not data:
+            return jsonify({'success': False, 'message': 'No JSON data received'}), 400
+        
+        department = data.get('department')
         semester = data.get('semester')
+        batch_ids = data.get('batch_ids')
         academic_year = data.get('academic_year')
         college_name = data.get('college_name', '')
-        include_short_break = data.get('include_short_break', False)
-        short_break_duration = data.get('short_break_duration', 10)
-        college_start_time = data.get('college_start_time', '09:00')
-        college_end_time = data.get('college_end_time', '16:30')
-        lunch_break_duration = data.get('lunch_break_duration', 60)
-        lunch_break_start_time = data.get('lunch_break_start_time', '12:15')
-        
-        print(f"Received timing parameters: start={college_start_time}, end={college_end_time}, lunch_duration={lunch_break_duration}, lunch_start={lunch_break_start_time}")
-        
-        if not all([batch_id, semester, academic_year]):
-            missing = []
-            if not batch_id: missing.append('batch')
-            if not semester: missing.append('semester')
-            if not academic_year: missing.append('academic year')
-            return jsonify({
-                'success': False,
-                'message': f'Missing required parameters: {", ".join(missing)}'
-            }), 400
+        engine = data.get('engine', 'random')
+        improve = data.get('improve', False)
+        seed = data.get('seed')
+        save = data.get('save', False)
+        timing_config = {
+            'college_start_time': data.get('college_start_time', '09:00'),
+            'college_end_time': data.get('college_end_time', '16:30'),
+            'lunch_break_start_time': data.get('lunch_break_start_time', '12:15'),
+            'lunch_break_duration': data.get('lunch_break_duration', 60),
+            'include_short_break': data.get('include_short_break', False),
+            'short_break_duration': data.get('short_break_duration', 10)
+        }
         
-        # Validate batch exists
-        batch = Batch.query.get(batch_id)
-        if not batch:
+        if not department and not semester and not batch_ids:
             return jsonify({
                 'success': False,
-                'message': f'Batch with ID {batch_id} not found'
+                'message': 'Provide a department, a semester or a list of batch_ids'
             }), 400
         
-        # Check if subjects exist for this semester and department
-        subjects_count = Subject.query.filter_by(
-            department=batch.department,
-            semester=int(semester)
-        ).count()
+        if save and not academic_year:
+            return jsonify({'success': False, 'message': 'Missing required parameters: academic year'}), 400
         
-        if subjects_count == 0:
+        if engine not in TimetableOptimizer.ENGINES:
             return jsonify({
                 'success': False,
-                'message': f'No subjects found for {batch.department} department, semester {semester}. Please add subjects first.'
+                'message': f'Unknown engine "{engine}". Use one of: {", ".join(TimetableOptimizer.ENGINES)}'
             }), 400
         
-        # Initialize optimizer with all timing configurations
-        optimizer = TimetableOptimizer(
-            include_short_break=include_short_break,
-            short_break_duration=short_break_duration,
-            college_start_time=college_start_time,
-            college_end_time=college_end_time,
-            lunch_break_duration=lunch_break_duration,
-            lunch_break_start_time=lunch_break_start_time
-        )
+        if seed is not None:
+            try:
+                seed = int(seed)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'message': 'Seed must be an integer'}), 400
+        
+        query = Batch.query.filter_by(created_by=session['user_id'])
+        if batch_ids:
+            query = query.filter(Batch.id.in_(batch_ids))
+        if department:
+            query = query.filter_by(department=department)
+        if semester:
+            query = query.filter_by(semester=int(semester))
+        batches = query.order_by(Batch.department, Batch.semester, Batch.name).all()
+        
+        if not batches:
+            return jsonify({'success': False, 'message': 'No batches matched the request'}), 400
         
-        # Generate timetable options
-        options = optimizer.generate_optimized_timetables(
-            batch_id=batch_id,
-            semester=semester,
-            include_short_break=include_short_break,
-            short_break_duration=short_break_duration,
-            college_start_time=college_start_time,
-            college_end_time=college_end_time,
-            lunch_break_duration=lunch_break_duration,
-            lunch_break_start_time=lunch_break_start_time
+        optimizer = TimetableOptimizer(
+            include_short_break=timing_config['include_short_break'],
+            short_break_duration=timing_config['short_break_duration'],
+            college_start_time=timing_config['college_start_time'],
+            college_end_time=timing_config['college_end_time'],
+            lunch_break_duration=timing_config['lunch_break_duration'],
+            lunch_break_start_time=timing_config['lunch_break_start_time'],
+            seed=seed
         )
-        
-        if not options:
-            return jsonify({
-                'success': False,
-                'message': 'No timetable options could be generated'
-            }), 400
+        results = optimizer.generate_institution_timetables(batches, engine=engine, improve=improve)
+        
+        if save:
+            saved = [result for result in results if result['schedule']]
+            timetables = []
+            for result in saved:
+                timetable = Timetable(
+                    name=f"{result['batch_name']} {academic_year}",
+                    batch_id=result['batch_id'],
+                    semester=result['semester'],
+                    academic_year=academic_year,
+                    college_name=college_name,
+                    timing_config=json.dumps(timing_config),
+                    created_by=session['user_id']
+                )
+                db.session.add(timetable)
+                timetables.append(timetable)
+                
+                batch = next(batch for batch in batches if batch.id == result['batch_id'])
+                batch.shift = result['shift']
+            db.session.flush()  # One round trip for all timetable ids
+            
+            # Every batch's entries go out in a single bulk insert
+            rows = []
+            for result, timetable in zip(saved, timetables):
+                rows.extend({
+                    'timetable_id': timetable.id,
+                    'day_of_week': entry['day_index'],
+                    'time_slot': entry['time_slot'],
+                    'slot_index': optimizer.slot_grid.ordinal(entry['time_slot']),
+                    'subject_id': entry['subject_id'],
+                    'faculty_id': entry['faculty_id'],
+                    'classroom_id': entry['classroom_id'],
+                    'batch_id': result['batch_id']
+                } for entry in result['schedule'])
+                result['timetable_id'] = timetable.id
+            store_slot_grid(optimizer.slot_grid, [timetable.id for timetable in timetables])
+            insert_entry_rows(rows)
+            db.session.commit()
         
         return jsonify({
             'success': True,
-            'options': options,
-            'message': f'Generated {len(options)} timetable options'
+            'results': results,
+            'seed': optimizer.seed,
+            'message': f'Generated timetables for {len(results)} batches'
         })
         
     except Exception as e:
-        print(f"Error generating timetable: {str(e)}")
+        db.session.rollback()
+        print(f"Error generating bulk timetables: {str(e)}")
         return jsonify({
             'success': False,
-            'message': f'Error generating timetable: {str(e)}'
+            'message': f'Error generating timetables: {str(e)}'
         }), 500
 
 @app.route('/api/save-timetable', methods=['POST'])
@@ -1684,6 +2041,7 @@ def save_timetable():
         college_name = data.get('college_name', '')
         print(f"DEBUG: Saving timetable with college_name: '{college_name}'")
         entries = data.get('entries', [])
+        shift = data.get('shift')
         
         # Extract timing configuration from request
         timing_config = {
@@ -1698,6 +2056,22 @@ def save_timetable():
         if not all([name, batch_id, semester, academic_year]):
             return jsonify({'success': False, 'error': 'Missing required parameters'})
         
+        if shift is not None and shift not in TimetableOptimizer.SHIFTS:
+            return jsonify({'success': False, 'error': f'Invalid shift "{shift}"'})
+        
+        # The shift chosen for the generated option is only persisted once it is saved
+        if shift:
+            batch = Batch.query.get(batch_id)
+            if batch:
+                batch.shift = shift
+        
+        # Validate every entry before anything is written
+        grid = SlotGrid.from_timing_config(timing_config)
+        rows, skipped, errors = prepare_entry_rows(None, entries, day_key='day', batch_id=batch_id, grid=grid)
+        if errors:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Invalid timetable entries: ' + '; '.join(errors[:10])}), 400
+        
         # Create new timetable with timing configuration
         timetable = Timetable(
             name=name,
@@ -1711,37 +2085,17 @@ def save_timetable():
         db.session.add(timetable)
         db.session.flush()  # Get the timetable ID
         
-        # Add timetable entries
-        for entry in entries:
-            # Validate required fields
-            subject_id = entry.get('subject_id')
-            faculty_id = entry.get('faculty_id')
-            classroom_id = entry.get('classroom_id')
-            day = entry.get('day')
-            time_slot = entry.get('time_slot')
-            
-            # Skip entries with missing required data
-            if not all([subject_id, faculty_id, classroom_id, day is not None, time_slot]):
-                print(f"WARNING: Skipping entry with missing data - subject_id: {subject_id}, faculty_id: {faculty_id}, classroom_id: {classroom_id}, day: {day}, time_slot: {time_slot}")
-                continue
-                
-            timetable_entry = TimetableEntry(
-                timetable_id=timetable.id,
-                day_of_week=day,
-                time_slot=time_slot,
-                subject_id=subject_id,
-                faculty_id=faculty_id,
-                classroom_id=classroom_id,
-                batch_id=batch_id
-            )
-            db.session.add(timetable_entry)
-        
+        store_slot_grid(grid, [timetable.id])
+        for row in rows:
+            row['timetable_id'] = timetable.id
+        insert_entry_rows(rows)
         db.session.commit()
         
         return jsonify({
             'success': True,
             'message': f'Timetable "{name}" saved successfully!',
-            'timetable_id': timetable.id
+            'timetable_id': timetable.id,
+            'skipped_entries': skipped
         })
         
     except Exception as e:
@@ -1851,455 +2205,89 @@ def convert_24_to_12_hour(time_str):
 @login_required
 def download_timetable_pdf(timetable_id):
     try:
-        # Get timetable data
         timetable = Timetable.query.get_or_404(timetable_id)
-        entries = TimetableEntry.query.filter_by(timetable_id=timetable_id).all()
-        
-        # Get batch info
-        batch = Batch.query.get(timetable.batch_id)
-        
-        # Parse timing configuration
-        timing_config = json.loads(timetable.timing_config) if timetable.timing_config else {}
+        data = load_timetable_pdf_data([timetable_id])[timetable_id]
+        digest = pdf_content_hash(data)
+        download_name = f"timetable_{timetable.name}_{datetime.now().strftime('%Y%m%d')}.pdf"
         
-        # Create PDF buffer with landscape orientation for better timetable display
-        from reportlab.lib.pagesizes import landscape
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+        # Serve repeated downloads of unchanged timetables straight from disk;
+        # a miss renders into the cache file, so the document is never held in memory
+        cached = pdf_cache.get(timetable_id, digest)
+        if cached is None:
+            cached = pdf_cache.store(timetable_id, digest, lambda output: render_timetable_pdf(data, output))
         
-        # Container for the 'Flowable' objects
-        elements = []
-        
-        # Define styles
-        styles = getSampleStyleSheet()
-        
-        # College header style
-        college_style = ParagraphStyle(
-            'CollegeHeader',
-            parent=styles['Heading1'],
-            fontSize=14,
-            spaceAfter=5,
-            alignment=1,  # Center alignment
-            textColor=colors.darkblue
-        )
-        
-        # Department style
-        dept_style = ParagraphStyle(
-            'DeptHeader',
-            parent=styles['Heading2'],
-            fontSize=12,
-            spaceAfter=10,
-            alignment=1,  # Center alignment
-            textColor=colors.darkblue
-        )
-        
-        # Add configurable college name - FORCE USE WHAT USER ENTERED
-        college_name = timetable.college_name if timetable.college_name and timetable.college_name.strip() else "SRKR Engg. College (A) (Affiliated to JNTU Kakinada), Bhimavaram-534 204, India"
-        print(f"DEBUG: Using college name: '{college_name}' (from timetable.college_name: '{timetable.college_name}')")
-        college_para = Paragraph(college_name, college_style)
-        elements.append(college_para)
-        
-        # Add department name - ALWAYS
-        department_name = "Department of Computer Science and Engineering"
-        dept_para = Paragraph(department_name, dept_style)
-        elements.append(dept_para)
-        
-        # Extract section from batch name (e.g., "CSE-A-2025" -> "Sec-A")
-        section = "Sec-A"  # Default section
-        if batch and batch.name:
-            # Try to extract section from batch name patterns like "CSE-A", "CSE-A-2025", etc.
-            parts = batch.name.split('-')
-            if len(parts) >= 2:
-                section = f"Sec-{parts[1]}"
-            elif len(parts) == 1 and len(batch.name) > 3:
-                # Handle cases like "CSEA" -> "Sec-A"
-                section = f"Sec-{batch.name[-1]}"
-        
-        # Create info table with timetable details
-        info_data = [
-            [f"{section}", f"B.Tech. AIML: {timetable.academic_year} {timetable.semester}{'st' if timetable.semester == 1 else 'nd' if timetable.semester == 2 else 'rd' if timetable.semester == 3 else 'th'} Semester", f"w.e.f. {datetime.now().strftime('%d-%m-%Y')}", f"Room: H-301"]
-        ]
-        
-        info_table = Table(info_data, colWidths=[1.5*inch, 3*inch, 1.5*inch, 1.5*inch])
-        info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-        ]))
-        
-        elements.append(info_table)
-        elements.append(Spacer(1, 15))
-        
-        # Generate timetable grid
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        
-        # FIXED TIMING CONFIGURATION - FORCE LUNCH BREAK 12:00-13:30
-        college_start = '09:00'
-        college_end = '16:30'
-        lunch_start = '12:00'  # FIXED lunch start time
-        lunch_end = '13:30'    # FIXED lunch end time
-        lunch_duration = 90    # FIXED 90 minutes (1.5 hours) for lunch break
-        
-        # Generate complete time slots MATCHING REFERENCE IMAGE
-        def generate_complete_time_slots_with_labs():
-            slots = []
-            
-            # Based on reference image - create all time slots
-            slots.append("09:00-09:45")   # 1st period
-            slots.append("09:45-10:30")   # 2nd period  
-            slots.append("10:30-11:15")   # 3rd period
-            slots.append("11:15-12:00")   # 4th period
-            slots.append("12:00-13:30")   # Lunch break
-            slots.append("01:30-02:15")   # 5th period
-            slots.append("02:15-03:00")   # 6th period
-            slots.append("03:00-03:45")   # 7th period
-            slots.append("03:45-04:30")   # 8th period
-            slots.append("04:30-05:15")   # 9th period (Sports/Counselling)
-            
-            return slots
-        
-        time_slots = generate_complete_time_slots_with_labs()
-        
-        # Function to map database time slots to PDF time slots
-        def map_db_time_to_pdf_time(db_time):
-            """Map database time format to PDF time format"""
-            time_mapping = {
-                "09:00-09:45": "09:00-09:45",
-                "09:45-10:30": "09:45-10:30", 
-                "10:30-11:15": "10:30-11:15",
-                "11:15-12:00": "11:15-12:00",
-                "12:00-13:30": "12:00-13:30",
-                "13:30-14:15": "01:30-02:15",
-                "14:15-15:00": "02:15-03:00",
-                "15:00-15:45": "03:00-03:45",
-                "15:45-16:30": "03:45-04:30",
-                "16:30-17:15": "04:30-05:15",
-                # Alternative formats
-                "01:30-02:15": "01:30-02:15",
-                "02:15-03:00": "02:15-03:00",
-                "03:00-03:45": "03:00-03:45",
-                "03:45-04:30": "03:45-04:30",
-                "04:30-05:15": "04:30-05:15",
-            }
-            return time_mapping.get(db_time, db_time)
-        
-        # Debug: Print time slots to see what's generated
-        print(f"DEBUG: Generated time slots: {time_slots}")
-        print(f"DEBUG: Lunch start: {lunch_start}, Duration: {lunch_duration}")
-        print(f"DEBUG: College: {college_name}")
-        print(f"DEBUG: Department: {department_name}")
-        print(f"DEBUG: Section: {section}")
-        
-        # Format entries exactly like the web interface does
-        formatted_entries = []
-        for e in entries:
-            # Get related objects
-            subject = Subject.query.get(e.subject_id) if e.subject_id else None
-            faculty = Faculty.query.get(e.faculty_id) if e.faculty_id else None
-            classroom = Classroom.query.get(e.classroom_id) if e.classroom_id else None
-            
-            # Convert day_of_week number to day name
-            day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            day_name = day_names[e.day_of_week] if e.day_of_week < len(day_names) else 'Unknown'
-            
-            formatted_entry = {
-                'day': day_name,
-                'time_slot': e.time_slot,
-                'subject_id': e.subject_id,  # Include subject_id for lab checking
-                'subject_name': subject.name if subject else 'Unknown Subject',
-                'subject_code': subject.code if subject else 'N/A',
-                'faculty_name': faculty.name if faculty else 'Unknown Faculty',
-                'classroom_name': classroom.name if classroom else 'Unknown Room',
-                'requires_lab': subject.requires_lab if subject else False  # Include lab flag
-            }
-            formatted_entries.append(formatted_entry)
-        
-        print(f"DEBUG: Processing {len(formatted_entries)} formatted entries")
-        for entry in formatted_entries:
-            print(f"DEBUG: Entry - Day: {entry['day']}, Time: {entry['time_slot']}, Subject: {entry['subject_name']}")
-        
-        # Create timetable data structure using formatted entries
-        timetable_data = {}
-        
-        # Initialize grid with empty slots for each day
-        for day_idx, day_name in enumerate(days):
-            timetable_data[day_name] = {}
-        
-        # Use the same time slot generation as web interface
-        # Get timing configuration from timetable model
-        timing_config = None
-        if timetable.timing_config:
-            try:
-                timing_config = json.loads(timetable.timing_config)
-            except:
-                timing_config = None
-        
-        # Use timing config or defaults
-        college_start = timing_config.get('college_start_time', '09:00') if timing_config else '09:00'
-        college_end = timing_config.get('college_end_time', '16:30') if timing_config else '16:30'
-        lunch_start = timing_config.get('lunch_break_start_time', '12:00') if timing_config else '12:00'
-        lunch_duration = timing_config.get('lunch_break_duration', 90) if timing_config else 90
-        
-        print(f"DEBUG: Using timing config - Start: {college_start}, End: {college_end}, Lunch: {lunch_start}, Duration: {lunch_duration}")
-        
-        # Populate grid with formatted entries - handle lab sessions properly
-        for entry in formatted_entries:
-            day = entry['day']
-            time_slot = entry['time_slot']
-            subject_name = entry['subject_name']
-            
-            # Check if this is a lab subject
-            is_lab = entry.get('requires_lab', False)
-            
-            if day in timetable_data:
-                if is_lab and time_slot in ["09:00-12:00", "13:30-16:30"]:
-                    # For lab sessions, mark the entire 3-hour block
-                    timetable_data[day][time_slot] = f"{subject_name} (LAB)"
-                    print(f"DEBUG: Placed LAB {subject_name} at {day} {time_slot} (3-hour block)")
-                else:
-                    # For regular classes
-                    timetable_data[day][time_slot] = subject_name
-                    print(f"DEBUG: Placed {subject_name} at {day} {time_slot}")
-        
-        print(f"DEBUG: Final timetable_data: {timetable_data}")
-        
-        # Create table data for PDF
-        table_data = []
-        
-        # Header row with time slots - MATCHING REFERENCE IMAGE
-        header_row = ['Day/Time']
-        for slot in time_slots:
-            if slot == "09:00-09:45":
-                header_row.append("09:00-09:45")
-            elif slot == "09:45-10:30":
-                header_row.append("09:45-10:30")
-            elif slot == "10:30-11:15":
-                header_row.append("10:30-11:15")
-            elif slot == "11:15-12:00":
-                header_row.append("11:15-12:00")
-            elif slot == "12:00-13:30":
-                header_row.append("12:00-01:30")
-            elif slot == "01:30-02:15":
-                header_row.append("01:30-02:15")
-            elif slot == "02:15-03:00":
-                header_row.append("02:15-03:00")
-            elif slot == "03:00-03:45":
-                header_row.append("03:00-03:45")
-            elif slot == "03:45-04:30":
-                header_row.append("03:45-04:30")
-            elif slot == "04:30-05:15":
-                header_row.append("04:30-05:15")
-            else:
-                header_row.append(slot)
-        table_data.append(header_row)
-        
-        # Add rows for each day - USE ACTUAL TIMETABLE DATA WITH DAY NAMES
-        for day_name in days:
-            row = [day_name]
-            for time_slot in time_slots:
-                if time_slot == "12:00-13:30":
-                    row.append("LUNCH BREAK")
-                elif time_slot == "04:30-05:15":
-                    # Last period - check if there's actual scheduled content
-                    cell_content = timetable_data.get(day_name, {}).get(time_slot, "")
-                    if cell_content:
-                        row.append(cell_content)
-                    else:
-                        row.append("---")
-                else:
-                    # Get actual class content from timetable data (using day names as keys)
-                    cell_content = timetable_data.get(day_name, {}).get(time_slot, "")
-                    row.append(cell_content)
-            table_data.append(row)
-        
-        # Calculate optimal column widths for landscape orientation
-        available_width = landscape(A4)[0] - 72  # Total width minus margins
-        day_col_width = 0.8*inch
-        time_col_width = (available_width - day_col_width) / len(time_slots)
-        col_widths = [day_col_width] + [time_col_width] * len(time_slots)
-        
-        table = Table(table_data, colWidths=col_widths)
-        
-        table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            
-            # Day column styling
-            ('BACKGROUND', (0, 1), (0, -1), colors.lightblue),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 1), (0, -1), 8),
-            ('TEXTCOLOR', (0, 1), (0, -1), colors.darkblue),
-            
-            # Data cells styling
-            ('FONTNAME', (1, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (1, 1), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 3),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            
-            # Alternating row colors for better readability
-            ('ROWBACKGROUNDS', (1, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        # Special styling for lunch break cells and class cells
-        for row_idx in range(1, len(table_data)):
-            for col_idx, time_slot in enumerate(time_slots):
-                if time_slot == "12:00-13:30":
-                    # Lunch break styling
-                    table.setStyle(TableStyle([
-                        ('BACKGROUND', (col_idx + 1, row_idx), (col_idx + 1, row_idx), colors.orange),
-                        ('FONTNAME', (col_idx + 1, row_idx), (col_idx + 1, row_idx), 'Helvetica-Bold'),
-                        ('TEXTCOLOR', (col_idx + 1, row_idx), (col_idx + 1, row_idx), colors.white),
-                    ]))
-                else:
-                    # Check if this cell has class data (including lab data)
-                    day_idx = row_idx - 1
-                    cell_content = table_data[row_idx][col_idx + 1]  # Get actual cell content from table
-                    if cell_content and cell_content.strip():
-                        # Determine if it's a lab or regular class
-                        is_lab = "LAB" in cell_content.upper()
-                        if is_lab:
-                            # Lab cell styling (blue background)
-                            table.setStyle(TableStyle([
-                                ('BACKGROUND', (col_idx + 1, row_idx), (col_idx + 1, row_idx), colors.lightblue),
-                                ('FONTNAME', (col_idx + 1, row_idx), (col_idx + 1, row_idx), 'Helvetica-Bold'),
-                            ]))
-                        else:
-                            # Regular class cell styling (light green)
-                            table.setStyle(TableStyle([
-                                ('BACKGROUND', (col_idx + 1, row_idx), (col_idx + 1, row_idx), colors.lightgreen),
-                                ('FONTNAME', (col_idx + 1, row_idx), (col_idx + 1, row_idx), 'Helvetica-Bold'),
-                            ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 20))
-        
-        # Add Course Details Table (matching reference image)
-        course_title_style = ParagraphStyle(
-            'CourseTitle',
-            parent=styles['Heading2'],
-            fontSize=12,
-            spaceAfter=10,
-            alignment=1,  # Center alignment
-            textColor=colors.darkblue
-        )
-        
-        course_title = Paragraph("Course Details", course_title_style)
-        elements.append(course_title)
-        
-        # Get ONLY subjects that are actually scheduled in this timetable
-        scheduled_subject_ids = set()
-        for entry in entries:
-            if entry.subject_id:
-                scheduled_subject_ids.add(entry.subject_id)
-        
-        # Get only the subjects that are actually in the timetable
-        subjects = []
-        for subject_id in scheduled_subject_ids:
-            subject = Subject.query.get(subject_id)
-            if subject:
-                subjects.append(subject)
-        
-        print(f"DEBUG: Found {len(subjects)} scheduled subjects: {[s.name for s in subjects]}")
-        
-        # Create course details table
-        course_data = [
-            ['Course Code', 'Course (Credits)', 'Teacher', 'Lec.', 'Tut.', 'Lab']
-        ]
-        
-        total_lec = 0
-        total_tut = 0
-        total_lab = 0
-        
-        for subject in subjects:
-            # Get faculty for this subject
-            faculty_subjects = FacultySubject.query.filter_by(subject_id=subject.id).first()
-            faculty_name = "TBD"
-            if faculty_subjects:
-                faculty = Faculty.query.get(faculty_subjects.faculty_id)
-                if faculty:
-                    faculty_name = faculty.name
-            
-            # Calculate hours based on subject type
-            lec_hours = subject.hours_per_week if not subject.requires_lab else max(0, subject.hours_per_week - 3)
-            tut_hours = 1 if subject.credits >= 3 and not subject.requires_lab else 0
-            lab_hours = 3 if subject.requires_lab else 0
-            
-            total_lec += lec_hours
-            total_tut += tut_hours
-            total_lab += lab_hours
-            
-            course_data.append([
-                subject.code,
-                f"{subject.name} ({subject.credits})",
-                faculty_name,
-                str(lec_hours),
-                str(tut_hours),
-                str(lab_hours)
-            ])
-        
-        # Add total row
-        course_data.append([
-            '',
-            'Total',
-            '',
-            str(total_lec),
-            str(total_tut),
-            str(total_lab)
-        ])
-        
-        # Create course table
-        course_table = Table(course_data, colWidths=[1*inch, 4*inch, 2*inch, 0.8*inch, 0.8*inch, 0.8*inch])
-        course_table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            
-            # Data styling
-            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -2), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            
-            # Total row styling
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 10),
-        ]))
-        
-        elements.append(course_table)
-        
-        # Build PDF
-        doc.build(elements)
-        
-        # Get PDF data
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        
-        # Create response
-        response = make_response(pdf_data)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="timetable_{timetable.name}_{datetime.now().strftime("%Y%m%d")}.pdf"'
-        
-        return response
+        return send_file(cached, mimetype='application/pdf', as_attachment=True, download_name=download_name)
         
     except Exception as e:
         print(f"Error generating PDF: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/download-timetables-pdf/bulk')
+@login_required
+def download_timetables_pdf_bulk():
+    """ZIP of the PDFs of every timetable matching department / semester / academic_year"""
+    try:
+        department = request.args.get('department')
+        semester = request.args.get('semester', type=int)
+        academic_year = request.args.get('academic_year')
+        if not any([department, semester, academic_year]):
+            return jsonify({'success': False, 'error': 'Filter by at least one of department, semester or academic_year'}), 400
+        
+        query = db.session.query(Timetable.id, Timetable.name).join(Batch, Timetable.batch_id == Batch.id)
+        query = query.filter(Timetable.created_by == session['user_id'])
+        if department:
+            query = query.filter(Batch.department == department)
+        if semester:
+            query = query.filter(Timetable.semester == semester)
+        if academic_year:
+            query = query.filter(Timetable.academic_year == academic_year)
+        timetables = query.order_by(Timetable.id).all()
+        if not timetables:
+            return jsonify({'success': False, 'error': 'No timetables match the given filters'}), 404
+        
+        # One bulk load for every timetable, then render only what the cache lacks
+        data_by_id = load_timetable_pdf_data([t.id for t in timetables])
+        names = {t.id: secure_filename(f"timetable_{t.id}_{t.name}.pdf") for t in timetables}
+        digests = {timetable_id: pdf_content_hash(data) for timetable_id, data in data_by_id.items()}
+        
+        # The archive spills to disk past PDF_SPOOL_MAX_SIZE and each PDF is
+        # copied in from its cache file, so memory stays bounded however many there are
+        archive_file = tempfile.SpooledTemporaryFile(max_size=app.config['PDF_SPOOL_MAX_SIZE'])
+        jobs = {}
+        from_cache = 0
+        try:
+            with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for timetable_id, digest in digests.items():
+                    cached = pdf_cache.get(timetable_id, digest)
+                    if cached is None:
+                        jobs[timetable_id] = (data_by_id[timetable_id], pdf_cache.reserve())
+                        continue
+                    with cached, archive.open(names[timetable_id], 'w') as member:
+                        shutil.copyfileobj(cached, member)
+                    from_cache += 1
+                
+                for timetable_id in render_timetable_pdf_files(jobs):
+                    _, temp_path = jobs.pop(timetable_id)
+                    with pdf_cache.commit(timetable_id, digests[timetable_id], temp_path) as rendered, \
+                            archive.open(names[timetable_id], 'w') as member:
+                        shutil.copyfileobj(rendered, member)
+        except Exception:
+            archive_file.close()
+            raise
+        finally:
+            for _, temp_path in jobs.values():
+                pdf_cache.discard(temp_path)
+        archive_file.seek(0)
+        
+        print(f"Bulk PDF export: {len(digests)} timetables, {len(digests) - from_cache} rendered, {from_cache} from cache")
+        label = '_'.join(str(part) for part in [department, semester, academic_year] if part)
+        download_name = secure_filename(f"timetables_{label}_{datetime.now().strftime('%Y%m%d')}.zip")
+        return send_file(archive_file, mimetype='application/zip', as_attachment=True, download_name=download_name)
+        
+    except Exception as e:
+        print(f"Error exporting PDFs: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Run with: gunicorn backend.app:app
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
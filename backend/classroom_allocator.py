@@ -3,14 +3,98 @@ Smart Classroom Allocation System
 Handles dynamic classroom sharing between branches and sections
 """
 
-from models import db, Classroom, Batch, Subject, TimetableEntry, ClassroomAllocation
-from sqlalchemy import and_, or_
+from models import db, Classroom, Batch, Subject, Timetable, TimetableEntry, ClassroomAllocation
+from sqlalchemy import and_, or_, func, case
+from sqlalchemy.orm import joinedload
+from room_assignment import max_weight_assignment
 from datetime import datetime
+from collections import defaultdict
+from bisect import bisect_left
+import json
 import logging
 
+try:
+    import numpy as np
+except ImportError:  # Vectorized scoring is optional; the per-room path is used without it
+    np = None
+
+
+class ClassroomArrays:
+    """
+    Classroom attributes stored as parallel NumPy arrays so availability and
+    priority scores can be computed for every room in one operation
+    """
+    
+    def __init__(self, classrooms):
+        self.classrooms = list(classrooms)
+        self.index = {classroom.id: i for i, classroom in enumerate(self.classrooms)}
+        self.ids = np.array([classroom.id for classroom in self.classrooms], dtype=np.int64)
+        self.capacity = np.array([classroom.capacity or 0 for classroom in self.classrooms], dtype=np.int64)
+        self.is_lab = np.array([classroom.type == 'lab' for classroom in self.classrooms], dtype=bool)
+        self.is_regular = np.array([classroom.type == 'regular' for classroom in self.classrooms], dtype=bool)
+        self.priority_level = np.array([classroom.priority_level or 0 for classroom in self.classrooms], dtype=np.int64)
+        self.is_fixed = np.array([bool(classroom.is_fixed_allocation) for classroom in self.classrooms], dtype=bool)
+        self.fixed_batch_id = np.array([classroom.fixed_batch_id if classroom.fixed_batch_id is not None else -1
+                                        for classroom in self.classrooms], dtype=np.int64)
+        self.can_be_shared = np.array([bool(classroom.can_be_shared) for classroom in self.classrooms], dtype=bool)
+    
+    def __len__(self):
+        return len(self.classrooms)
+    
+    def priority_scores(self, batch_id, batch_priority, student_count, requires_lab=None):
+        """Vectorized SmartClassroomAllocator.calculate_priority_score for every room"""
+        scores = np.full(len(self), {1: 100, 2: 50}.get(batch_priority, 25), dtype=np.int64)
+        scores += np.where(self.is_fixed & (self.fixed_batch_id == batch_id), 200, 0)
+        scores += np.select([self.priority_level == 1, self.priority_level == 2], [75, 40], 15)
+        
+        if requires_lab is not None:
+            if requires_lab:
+                scores += np.where(self.is_lab, 150, np.where(self.is_regular, -50, 0))
+            else:
+                scores += np.where(self.is_regular, 50, 0)
+        
+        student_count = student_count or 0
+        fits = student_count <= self.capacity
+        efficiency = np.divide(student_count * 100.0, self.capacity,
+                               out=np.zeros(len(self)), where=self.capacity > 0)
+        bonus = np.select([efficiency >= 80, efficiency >= 60, efficiency >= 40], [30, 20, 10], 0)
+        scores += np.where(fits, bonus, -100)
+        return scores
+    
+    def availability(self, batch_id, occupied_by, owner_has_lab):
+        """
+        Vectorized SmartClassroomAllocator.check_classroom_availability.
+        occupied_by holds the batch id already using each room (-1 if free) and
+        owner_has_lab whether each room's fixed owner is in a lab session.
+        Returns (available mask, allocation type per room).
+        """
+        occupied = occupied_by >= 0
+        own_existing = occupied & (occupied_by == batch_id)
+        fixed_own = ~occupied & self.is_fixed & (self.fixed_batch_id == batch_id)
+        borrow = ~occupied & self.is_fixed & (self.fixed_batch_id != batch_id) & owner_has_lab & self.can_be_shared
+        available = own_existing | fixed_own | borrow | (~occupied & ~self.is_fixed)
+        types = np.select(
+            [own_existing, occupied, fixed_own, borrow, self.is_fixed],
+            ['own_existing', 'occupied', 'fixed_own', 'temporary_borrow', 'fixed_unavailable'],
+            'regular_available'
+        )
+        return available, types
+    
+    def slot_state(self, occupied, lab_batches):
+        """Turn one slot's {classroom_id: batch_id} and lab batch ids into per-room arrays"""
+        occupied_by = np.full(len(self), -1, dtype=np.int64)
+        for classroom_id, batch_id in occupied.items():
+            if classroom_id in self.index:
+                occupied_by[self.index[classroom_id]] = batch_id
+        owner_has_lab = (self.fixed_batch_id >= 0) & np.isin(self.fixed_batch_id, list(lab_batches))
+        return occupied_by, owner_has_lab
+
+
 class SmartClassroomAllocator:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # (day_of_week, time_slot) -> occupancy loaded by prefetch_slot_occupancy
+        self.slot_cache = {}
     
     def calculate_priority_score(self, batch, classroom, time_slot, day_of_week, subject=None):
         """
@@ -70,48 +154,119 @@ class SmartClassroomAllocator:
         """
         batch = Batch.query.get(batch_id)
         subject = Subject.query.get(subject_id) if subject_id else None
-        
-        # Get all classrooms
-        all_classrooms = Classroom.query.all()
-        available_classrooms = []
-        
-        for classroom in all_classrooms:
-            allocation_info = self.check_classroom_availability(
-                classroom, batch, day_of_week, time_slot, subject
-            )
-            
-            if allocation_info['available']:
-                priority_score = self.calculate_priority_score(
-                    batch, classroom, time_slot, day_of_week, subject
+        classrooms = Classroom.query.all()
+        arrays = ClassroomArrays(classrooms) if np is not None else None
+        return self.rank_classrooms(classrooms, batch, subject, day_of_week, time_slot, arrays)
+    
+    def rank_classrooms(self, classrooms, batch, subject, day_of_week, time_slot, arrays=None):
+        """
+        Available classrooms for a batch in a slot, best priority score first.
+        Scores every room in one pass when ClassroomArrays for classrooms are given.
+        """
+        if arrays is None:
+            available_classrooms = []
+            for classroom in classrooms:
+                allocation_info = self.check_classroom_availability(
+                    classroom, batch, day_of_week, time_slot, subject
                 )
                 
-                available_classrooms.append({
-                    'classroom': classroom,
-                    'priority_score': priority_score,
-                    'allocation_type': allocation_info['type'],
-                    'can_borrow': allocation_info.get('can_borrow', False),
-                    'original_owner': allocation_info.get('original_owner', None)
-                })
+                if allocation_info['available']:
+                    priority_score = self.calculate_priority_score(
+                        batch, classroom, time_slot, day_of_week, subject
+                    )
+                    
+                    available_classrooms.append({
+                        'classroom': classroom,
+                        'priority_score': priority_score,
+                        'allocation_type': allocation_info['type'],
+                        'can_borrow': allocation_info.get('can_borrow', False),
+                        'original_owner': allocation_info.get('original_owner', None)
+                    })
+            
+            # Sort by priority score (highest first)
+            available_classrooms.sort(key=lambda x: x['priority_score'], reverse=True)
+            return available_classrooms
+        
+        slot = self.get_slot_occupancy(day_of_week, time_slot)
+        occupied_by, owner_has_lab = arrays.slot_state(slot['classrooms'], slot['lab_batches'])
+        available, types = arrays.availability(batch.id, occupied_by, owner_has_lab)
+        scores = arrays.priority_scores(
+            batch.id, batch.priority_for_allocation, batch.student_count,
+            subject.requires_lab if subject else None
+        )
         
-        # Sort by priority score (highest first)
-        available_classrooms.sort(key=lambda x: x['priority_score'], reverse=True)
+        # Stable sort keeps the database order among equal scores, as the per-room path does
+        available_classrooms = []
+        for i in np.flatnonzero(available)[np.argsort(-scores[available], kind='stable')]:
+            borrowing = types[i] == 'temporary_borrow'
+            available_classrooms.append({
+                'classroom': arrays.classrooms[i],
+                'priority_score': int(scores[i]),
+                'allocation_type': str(types[i]),
+                'can_borrow': bool(borrowing),
+                'original_owner': int(arrays.fixed_batch_id[i]) if borrowing else None
+            })
         return available_classrooms
     
+    def prefetch_slot_occupancy(self, slots):
+        """
+        Load classroom usage and lab sessions for every (day, time_slot) pair
+        not cached yet, in one query. Availability and lab-borrow checks for
+        those slots are then answered from memory.
+        """
+        missing = set(slots) - set(self.slot_cache)
+        if not missing:
+            return
+        for slot_key in missing:
+            self.slot_cache[slot_key] = {'classrooms': {}, 'lab_batches': set(), 'batch_names': {}}
+        
+        rows = db.session.query(
+            TimetableEntry.day_of_week,
+            TimetableEntry.time_slot,
+            TimetableEntry.classroom_id,
+            TimetableEntry.batch_id,
+            Subject.requires_lab,
+            Batch.name.label('batch_name')
+        ).outerjoin(Subject, TimetableEntry.subject_id == Subject.id
+        ).outerjoin(Batch, TimetableEntry.batch_id == Batch.id).filter(
+            TimetableEntry.day_of_week.in_({day for day, _ in missing}),
+            TimetableEntry.time_slot.in_({time_slot for _, time_slot in missing})
+        ).order_by(TimetableEntry.id).all()
+        
+        for row in rows:
+            slot_key = (row.day_of_week, row.time_slot)
+            if slot_key not in missing:
+                continue
+            cached = self.slot_cache[slot_key]
+            # First entry wins, matching the .first() lookup the per-room queries used
+            cached['classrooms'].setdefault(row.classroom_id, row.batch_id)
+            cached['batch_names'][row.batch_id] = row.batch_name
+            if row.requires_lab:
+                cached['lab_batches'].add(row.batch_id)
+    
+    def get_slot_occupancy(self, day_of_week, time_slot):
+        """Cached {'classrooms': {classroom_id: batch_id}, 'lab_batches': set, 'batch_names': dict} for one slot"""
+        slot_key = (day_of_week, time_slot)
+        if slot_key not in self.slot_cache:
+            self.prefetch_slot_occupancy([slot_key])
+        return self.slot_cache[slot_key]
+    
+    def invalidate_slot_occupancy(self):
+        """Forget cached slot occupancy after timetable entries change"""
+        self.slot_cache = {}
+    
     def check_classroom_availability(self, classroom, requesting_batch, day_of_week, time_slot, subject=None):
         """
         Check if a classroom is available for allocation
         Returns availability info with allocation type
         """
         # Check if classroom is already occupied at this time
-        existing_entry = TimetableEntry.query.filter_by(
-            classroom_id=classroom.id,
-            day_of_week=day_of_week,
-            time_slot=time_slot
-        ).first()
+        slot = self.get_slot_occupancy(day_of_week, time_slot)
         
-        if existing_entry:
+        if classroom.id in slot['classrooms']:
+            occupying_batch_id = slot['classrooms'][classroom.id]
             # Check if it's the same batch (updating existing schedule)
-            if existing_entry.batch_id == requesting_batch.id:
+            if occupying_batch_id == requesting_batch.id:
                 return {
                     'available': True,
                     'type': 'own_existing',
@@ -121,7 +276,7 @@ class SmartClassroomAllocator:
                 return {
                     'available': False,
                     'type': 'occupied',
-                    'reason': f'Occupied by batch {existing_entry.batch.name}'
+                    'reason': f"Occupied by batch {slot['batch_names'].get(occupying_batch_id, occupying_batch_id)}"
                 }
         
         # Check if this is a fixed allocation classroom
@@ -164,16 +319,14 @@ class SmartClassroomAllocator:
         """
         Check if a batch has a lab session at the given time
         """
-        lab_entry = db.session.query(TimetableEntry).join(Subject).filter(
-            and_(
-                TimetableEntry.batch_id == batch_id,
-                TimetableEntry.day_of_week == day_of_week,
-                TimetableEntry.time_slot == time_slot,
-                Subject.requires_lab == True
-            )
-        ).first()
+        return batch_id in self.get_slot_occupancy(day_of_week, time_slot)['lab_batches']
+    
+    def timetable_slot_grid(self, timetable_id):
+        """SlotGrid used for the slot_index of new entries, or None if the timetable does not exist"""
+        from timetable_persistence import load_slot_grid
         
-        return lab_entry is not None
+        timetable = Timetable.query.get(timetable_id)
+        return load_slot_grid(timetable) if timetable else None
     
     def allocate_classroom_smart(self, batch_id, subject_id, faculty_id, day_of_week, time_slot, timetable_id):
         """
@@ -203,6 +356,7 @@ class SmartClassroomAllocator:
         elif allocation_type == 'fixed_own':
             allocation_reason = 'fixed_classroom'
         
+        grid = self.timetable_slot_grid(timetable_id)
         timetable_entry = TimetableEntry(
             timetable_id=timetable_id,
             batch_id=batch_id,
@@ -211,6 +365,7 @@ class SmartClassroomAllocator:
             classroom_id=classroom.id,
             day_of_week=day_of_week,
             time_slot=time_slot,
+            slot_index=grid.ordinal(time_slot) if grid else None,
             is_temporary_allocation=is_temporary,
             original_classroom_owner_id=original_owner_id,
             allocation_reason=allocation_reason
@@ -230,6 +385,8 @@ class SmartClassroomAllocator:
             db.session.add(timetable_entry)
             db.session.add(classroom_allocation)
             db.session.commit()
+            # The new entry occupies this slot, so cached availability is stale
+            self.invalidate_slot_occupancy()
             
             self.logger.info(f"Successfully allocated classroom {classroom.name} to batch {batch_id}")
             return {
@@ -245,71 +402,418 @@ class SmartClassroomAllocator:
             self.logger.error(f"Failed to allocate classroom: {str(e)}")
             return None
     
-    def get_classroom_utilization_report(self):
+    def allocate_classrooms_bulk(self, requests, timetable_id):
         """
-        Generate classroom utilization report
+        Allocate classrooms for many entries in one transaction.
+        requests is a list of dicts with batch_id, subject_id, faculty_id,
+        day_of_week and time_slot. Rooms are chosen against a shared in-memory
+        occupancy, so later requests see earlier placements, and every row is
+        written with one bulk insert per table and a single commit.
+        A batch that already has a class in the timetable at that day and
+        time_slot (stored, or placed earlier in the same call) cannot be given
+        a second one.
+        Returns one result per request (None where no classroom was available
+        or the batch was busy), or None if the transaction failed.
         """
+        batch_ids = {request['batch_id'] for request in requests}
+        subject_ids = {request['subject_id'] for request in requests if request.get('subject_id')}
+        batches = {batch.id: batch for batch in Batch.query.filter(Batch.id.in_(batch_ids)).all()} if batch_ids else {}
+        subjects = {subject.id: subject for subject in Subject.query.filter(Subject.id.in_(subject_ids)).all()} if subject_ids else {}
         classrooms = Classroom.query.all()
-        report = []
+        arrays = ClassroomArrays(classrooms) if np is not None else None
+        self.prefetch_slot_occupancy({(request['day_of_week'], request['time_slot']) for request in requests})
         
-        for classroom in classrooms:
-            # Count total allocated slots
-            total_slots = TimetableEntry.query.filter_by(classroom_id=classroom.id).count()
+        grid = self.timetable_slot_grid(timetable_id)
+        
+        # Cells (batch_id, day, time_slot) the timetable already holds; one entry per cell
+        busy_cells = {tuple(row) for row in db.session.query(
+            TimetableEntry.batch_id, TimetableEntry.day_of_week, TimetableEntry.time_slot
+        ).filter(
+            TimetableEntry.timetable_id == timetable_id,
+            TimetableEntry.batch_id.in_(batch_ids)
+        )} if batch_ids else set()
+        
+        entry_rows = []
+        allocation_rows = []
+        results = []
+        for request in requests:
+            batch = batches.get(request['batch_id'])
+            subject = subjects.get(request.get('subject_id'))
+            day_of_week = request['day_of_week']
+            time_slot = request['time_slot']
+            
+            cell = (request['batch_id'], day_of_week, time_slot)
+            if cell in busy_cells:
+                self.logger.warning(f"Batch {request['batch_id']} already has a class on day {day_of_week} at {time_slot}")
+                results.append(None)
+                continue
+            
+            ranked = self.rank_classrooms(classrooms, batch, subject, day_of_week, time_slot, arrays) if batch else []
+            if not ranked:
+                self.logger.warning(f"No available classrooms for batch {request['batch_id']} at {time_slot}")
+                results.append(None)
+                continue
+            
+            best_allocation = ranked[0]
+            classroom = best_allocation['classroom']
+            allocation_type = best_allocation['allocation_type']
+            is_temporary = allocation_type == 'temporary_borrow'
             
-            # Count temporary allocations
-            temp_slots = TimetableEntry.query.filter_by(
-                classroom_id=classroom.id,
-                is_temporary_allocation=True
-            ).count()
+            allocation_reason = None
+            if is_temporary:
+                allocation_reason = 'borrowed_during_lab_session'
+            elif allocation_type == 'fixed_own':
+                allocation_reason = 'fixed_classroom'
+            
+            entry_rows.append({
+                'timetable_id': timetable_id,
+                'batch_id': batch.id,
+                'subject_id': request['subject_id'],
+                'faculty_id': request['faculty_id'],
+                'classroom_id': classroom.id,
+                'day_of_week': day_of_week,
+                'time_slot': time_slot,
+                'slot_index': grid.ordinal(time_slot) if grid else None,
+                'is_temporary_allocation': is_temporary,
+                'original_classroom_owner_id': best_allocation.get('original_owner') if is_temporary else None,
+                'allocation_reason': allocation_reason
+            })
+            allocation_rows.append({
+                'classroom_id': classroom.id,
+                'batch_id': batch.id,
+                'day_of_week': day_of_week,
+                'time_slot': time_slot,
+                'allocation_type': allocation_type,
+                'priority_score': best_allocation['priority_score']
+            })
+            results.append({
+                'classroom': classroom,
+                'allocation_type': allocation_type,
+                'is_temporary': is_temporary
+            })
             
-            # Calculate utilization (assuming 5 days * 8 slots = 40 total possible slots)
-            max_possible_slots = 40
-            utilization_percentage = (total_slots / max_possible_slots) * 100
+            # Record the placement so the following requests see this room and batch as taken
+            busy_cells.add(cell)
+            slot = self.slot_cache[(day_of_week, time_slot)]
+            slot['classrooms'].setdefault(classroom.id, batch.id)
+            slot['batch_names'][batch.id] = batch.name
+            if subject and subject.requires_lab:
+                slot['lab_batches'].add(batch.id)
+        
+        try:
+            if entry_rows:
+                # Core inserts keep every row in one executemany; ORM bulk mode splits on NULL columns
+                db.session.execute(TimetableEntry.__table__.insert(), entry_rows)
+                db.session.execute(ClassroomAllocation.__table__.insert(), allocation_rows)
+            db.session.commit()
+            self.logger.info(f"Allocated {len(entry_rows)} of {len(requests)} entries in bulk")
+            return results
+        except Exception as e:
+            db.session.rollback()
+            # The in-memory placements were never written
+            self.invalidate_slot_occupancy()
+            self.logger.error(f"Failed to allocate classrooms in bulk: {str(e)}")
+            return None
+    
+    def get_classroom_utilization_report(self, day_of_week=None, department=None, academic_year=None):
+        """
+        Generate classroom utilization report
+        Usage comes from one grouped aggregate, optionally limited to a day,
+        a batch department or a timetable academic year.
+        """
+        filters = []
+        if day_of_week is not None:
+            filters.append(TimetableEntry.day_of_week == day_of_week)
+        if department:
+            filters.append(Batch.department == department)
+        if academic_year:
+            filters.append(Timetable.academic_year == academic_year)
+        
+        usage_query = db.session.query(
+            TimetableEntry.classroom_id,
+            func.count(TimetableEntry.id),
+            func.sum(case((TimetableEntry.is_temporary_allocation == True, 1), else_=0))
+        )
+        timing_query = db.session.query(Timetable.timing_config).distinct()
+        if academic_year:
+            usage_query = usage_query.join(Timetable, TimetableEntry.timetable_id == Timetable.id)
+            timing_query = timing_query.filter(Timetable.academic_year == academic_year)
+        if department:
+            usage_query = usage_query.join(Batch, TimetableEntry.batch_id == Batch.id)
+            timing_query = timing_query.join(Batch, Timetable.batch_id == Batch.id).filter(Batch.department == department)
+        usage = {
+            classroom_id: (total, int(temporary or 0))
+            for classroom_id, total, temporary in usage_query.filter(*filters).group_by(TimetableEntry.classroom_id).all()
+        }
+        
+        # Periods per week under the timing the timetables were generated with
+        days, periods_per_day = self.slot_capacity([row.timing_config for row in timing_query.all()])
+        max_possible_slots = periods_per_day * (1 if day_of_week is not None else days)
+        
+        classrooms = Classroom.query.options(joinedload(Classroom.fixed_batch)).all()
+        report = []
+        
+        for classroom in classrooms:
+            total_slots, temp_slots = usage.get(classroom.id, (0, 0))
+            utilization_percentage = (total_slots / max_possible_slots) * 100 if max_possible_slots else 0
             
             report.append({
                 'classroom': classroom,
                 'total_slots_used': total_slots,
                 'temporary_allocations': temp_slots,
                 'fixed_allocations': total_slots - temp_slots,
+                'max_possible_slots': max_possible_slots,
                 'utilization_percentage': round(utilization_percentage, 2),
                 'sharing_efficiency': round((temp_slots / total_slots * 100), 2) if total_slots > 0 else 0
             })
         
         return report
     
-    def optimize_classroom_assignments(self):
+    def slot_capacity(self, timing_configs):
+        """
+        (days per week, periods per day) under the widest of the given timing
+        configurations (JSON strings or dicts); the default timing if there are none
+        """
+        from timetable_optimizer import TimetableOptimizer
+        
+        capacities = {}
+        for timing_config in timing_configs or [None]:
+            if isinstance(timing_config, str):
+                try:
+                    timing_config = json.loads(timing_config)
+                except ValueError:
+                    timing_config = None
+            config = {
+                key: value for key, value in (timing_config or {}).items()
+                if key in ('college_start_time', 'college_end_time', 'lunch_break_duration', 'lunch_break_start_time')
+            }
+            cache_key = tuple(sorted(config.items()))
+            if cache_key not in capacities:
+                optimizer = TimetableOptimizer(**config)
+                capacities[cache_key] = (len(optimizer.days), len(optimizer.time_slots))
+        return max(capacities.values(), key=lambda capacity: capacity[0] * capacity[1])
+    
+    def optimize_classroom_assignments(self, timetable_ids=None):
         """
         Optimize existing classroom assignments for better utilization
         """
-        # Get all current timetable entries
-        entries = TimetableEntry.query.all()
-        optimization_suggestions = []
+        return list(self.iter_classroom_suggestions(timetable_ids))
+    
+    def iter_classroom_suggestions(self, timetable_ids=None, chunk_size=1000, after=None):
+        """
+        Yield room-change suggestions entry by entry in (day_of_week, time_slot, id)
+        order. Entries are read in keyset chunks of chunk_size, and each chunk's
+        slot occupancy is prefetched with one query, so stopping early costs only
+        the chunks read. after is a (day_of_week, time_slot, id) sort key to resume
+        after, which lets callers page without rescanning earlier entries.
+        Only rooms of the right type (lab for lab subjects, non-lab otherwise)
+        that can seat the batch are considered.
+        """
+        query = TimetableEntry.query.options(
+            joinedload(TimetableEntry.batch), joinedload(TimetableEntry.subject), joinedload(TimetableEntry.classroom)
+        )
+        if timetable_ids is not None:
+            query = query.filter(TimetableEntry.timetable_id.in_(list(timetable_ids)))
+        query = query.order_by(TimetableEntry.day_of_week, TimetableEntry.time_slot, TimetableEntry.id)
+        candidate_index = self.build_candidate_index(Classroom.query.all())
+        
+        while True:
+            chunk = query
+            if after is not None:
+                day_of_week, time_slot, entry_id = after
+                chunk = chunk.filter(or_(
+                    TimetableEntry.day_of_week > day_of_week,
+                    and_(TimetableEntry.day_of_week == day_of_week, TimetableEntry.time_slot > time_slot),
+                    and_(TimetableEntry.day_of_week == day_of_week, TimetableEntry.time_slot == time_slot,
+                         TimetableEntry.id > entry_id)
+                ))
+            entries = chunk.limit(chunk_size).all()
+            if not entries:
+                return
+            
+            # One query covers the availability checks for every slot in the chunk
+            self.prefetch_slot_occupancy({(entry.day_of_week, entry.time_slot) for entry in entries})
+            for entry in entries:
+                suggestion = self.suggest_better_classroom(entry, candidate_index)
+                if suggestion:
+                    yield suggestion
+            
+            if len(entries) < chunk_size:
+                return
+            last = entries[-1]
+            after = (last.day_of_week, last.time_slot, last.id)
+    
+    def build_candidate_index(self, classrooms):
+        """Classrooms split by lab/non-lab and sorted by capacity, for bisecting on batch size"""
+        index = {}
+        for is_lab in (True, False):
+            rooms = sorted(
+                ((classroom.capacity or 0, position, classroom) for position, classroom in enumerate(classrooms)
+                 if (classroom.type == 'lab') == is_lab),
+                key=lambda room: room[0]
+            )
+            index[is_lab] = ([room[0] for room in rooms], [(room[1], room[2]) for room in rooms])
+        return index
+    
+    def suggest_better_classroom(self, entry, candidate_index):
+        """Suggest the best candidate room for an entry if it beats the current one significantly"""
+        capacities, rooms = candidate_index[bool(entry.subject and entry.subject.requires_lab)]
+        start = bisect_left(capacities, entry.batch.student_count or 0)
+        
+        best_option = None
+        for position, classroom in rooms[start:]:
+            allocation_info = self.check_classroom_availability(
+                classroom, entry.batch, entry.day_of_week, entry.time_slot, entry.subject
+            )
+            if not allocation_info['available']:
+                continue
+            priority_score = self.calculate_priority_score(
+                entry.batch, classroom, entry.time_slot, entry.day_of_week, entry.subject
+            )
+            # Highest score wins; ties go to the room listed first, as in find_available_classrooms
+            if best_option is None or (priority_score, -position) > (best_option['priority_score'], -best_option['position']):
+                best_option = {
+                    'classroom': classroom,
+                    'position': position,
+                    'priority_score': priority_score,
+                    'allocation_type': allocation_info['type']
+                }
+        
+        if not best_option:
+            return None
+        
+        current_classroom = entry.classroom
+        current_score = self.calculate_priority_score(
+            entry.batch, current_classroom, entry.time_slot, entry.day_of_week, entry.subject
+        )
+        if best_option['priority_score'] <= current_score + 50:  # Significant improvement threshold
+            return None
+        
+        return {
+            'entry': entry,
+            'current_classroom': current_classroom,
+            'suggested_classroom': best_option['classroom'],
+            'improvement_score': best_option['priority_score'] - current_score,
+            'reason': f"Better match: {best_option['allocation_type']}"
+        }
+
+    def assign_classrooms_optimally(self, timetable_ids=None, apply=False):
+        """
+        Reassign classrooms so each (day, time_slot) gets the room assignment
+        with the highest total priority score, solved exactly as a maximum-weight
+        bipartite matching between that slot's entries and the classrooms.
+        Entries outside timetable_ids keep their rooms and block them. Every
+        entry may always keep its current room, so nothing becomes unplaceable.
+        Returns (changes, total score before, total score after); with
+        apply=True the changes are committed.
+        """
+        if np is None:
+            raise RuntimeError('NumPy is required for optimal classroom assignment')
         
+        query = TimetableEntry.query.options(
+            joinedload(TimetableEntry.batch), joinedload(TimetableEntry.subject), joinedload(TimetableEntry.classroom)
+        )
+        if timetable_ids is not None:
+            query = query.filter(TimetableEntry.timetable_id.in_(list(timetable_ids)))
+        entries = query.order_by(TimetableEntry.id).all()
+        
+        classrooms = Classroom.query.all()
+        arrays = ClassroomArrays(classrooms)
+        entries_by_slot = defaultdict(list)
         for entry in entries:
-            # Find better classroom options
-            better_options = self.find_available_classrooms(
-                entry.batch_id, entry.day_of_week, entry.time_slot, entry.subject_id
+            entries_by_slot[(entry.day_of_week, entry.time_slot)].append(entry)
+        
+        # Rooms held by entries that are not being reassigned, plus lab sessions per slot
+        entry_ids = {entry.id for entry in entries}
+        blocked = defaultdict(set)
+        lab_batches = defaultdict(set)
+        if entries_by_slot:
+            rows = db.session.query(
+                TimetableEntry.id,
+                TimetableEntry.day_of_week,
+                TimetableEntry.time_slot,
+                TimetableEntry.classroom_id,
+                TimetableEntry.batch_id,
+                Subject.requires_lab
+            ).outerjoin(Subject, TimetableEntry.subject_id == Subject.id).filter(
+                TimetableEntry.day_of_week.in_({day for day, _ in entries_by_slot}),
+                TimetableEntry.time_slot.in_({time_slot for _, time_slot in entries_by_slot})
+            ).all()
+            for row in rows:
+                slot_key = (row.day_of_week, row.time_slot)
+                if slot_key not in entries_by_slot:
+                    continue
+                if row.id not in entry_ids:
+                    blocked[slot_key].add(row.classroom_id)
+                if row.requires_lab:
+                    lab_batches[slot_key].add(row.batch_id)
+        
+        changes = []
+        total_before = 0
+        total_after = 0
+        for slot_key, slot_entries in entries_by_slot.items():
+            occupied_by, owner_has_lab = arrays.slot_state(
+                {classroom_id: 0 for classroom_id in blocked[slot_key]}, lab_batches[slot_key]
             )
+            weights = []
+            allowed = []
+            types = []
+            for entry in slot_entries:
+                available, room_types = arrays.availability(entry.batch_id, occupied_by, owner_has_lab)
+                current = arrays.index.get(entry.classroom_id)
+                if current is not None:
+                    available[current] = True
+                weights.append(arrays.priority_scores(
+                    entry.batch_id, entry.batch.priority_for_allocation, entry.batch.student_count,
+                    entry.subject.requires_lab if entry.subject else None
+                ).tolist())
+                allowed.append(available.tolist())
+                types.append(room_types)
             
-            if better_options:
-                current_classroom = entry.classroom
-                best_option = better_options[0]
-                
-                # If we found a significantly better option
-                current_score = self.calculate_priority_score(
-                    entry.batch, current_classroom, entry.time_slot, entry.day_of_week, entry.subject
-                )
+            assignment = max_weight_assignment(weights, allowed)
+            for row, entry in enumerate(slot_entries):
+                current = arrays.index.get(entry.classroom_id)
+                chosen = assignment[row] if assignment[row] is not None else current
+                current_score = weights[row][current] if current is not None else 0
+                total_before += current_score
+                if chosen is None:
+                    continue
+                total_after += weights[row][chosen]
+                if chosen == current:
+                    continue
                 
-                if best_option['priority_score'] > current_score + 50:  # Significant improvement threshold
-                    optimization_suggestions.append({
-                        'entry': entry,
-                        'current_classroom': current_classroom,
-                        'suggested_classroom': best_option['classroom'],
-                        'improvement_score': best_option['priority_score'] - current_score,
-                        'reason': f"Better match: {best_option['allocation_type']}"
-                    })
+                changes.append({
+                    'entry': entry,
+                    'current_classroom': entry.classroom,
+                    'suggested_classroom': arrays.classrooms[chosen],
+                    'current_score': current_score,
+                    'new_score': weights[row][chosen],
+                    'allocation_type': str(types[row][chosen])
+                })
+        
+        if apply and changes:
+            for change in changes:
+                entry = change['entry']
+                is_temporary = change['allocation_type'] == 'temporary_borrow'
+                entry.classroom_id = change['suggested_classroom'].id
+                entry.is_temporary_allocation = is_temporary
+                entry.original_classroom_owner_id = change['suggested_classroom'].fixed_batch_id if is_temporary else None
+                if is_temporary:
+                    entry.allocation_reason = 'borrowed_during_lab_session'
+                elif change['allocation_type'] == 'fixed_own':
+                    entry.allocation_reason = 'fixed_classroom'
+                else:
+                    entry.allocation_reason = None
+            try:
+                db.session.commit()
+                self.invalidate_slot_occupancy()
+                self.logger.info(f"Applied optimal classroom assignment to {len(changes)} entries")
+            except Exception as e:
+                db.session.rollback()
+                self.logger.error(f"Failed to apply optimal classroom assignment: {str(e)}")
+                raise
         
-        return optimization_suggestions
+        return changes, total_before, total_after
 
 # Utility functions for batch and section management
 def extract_branch_section_from_name(batch_name):
@@ -0,0 +1,299 @@
+"""
+Constraint Propagation Timetable Solver
+Places subject blocks with backtracking search instead of random trial placement
+"""
+
+import random
+import time
+
+
+class ConstraintSolver:
+    """
+    Models every subject block as a variable whose domain is the list of
+    feasible (day, slots, faculty, classroom) placements, then searches with
+    most-constrained-first ordering, forward checking and backtracking.
+    """
+
+    def __init__(self, optimizer, max_nodes=2000, time_limit=5.0, max_rooms_per_block=8):
+        self.optimizer = optimizer
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        # Rooms come back best-fit first; only the closest fits are kept to keep domains small
+        self.max_rooms_per_block = max_rooms_per_block
+        self.nodes = 0
+        self.best_assignment = {}
+
+    def build_variables(self, batch_id, semester):
+        """Create one variable per subject block along with its candidate faculty and rooms"""
+        subjects = self.optimizer.get_batch_subjects(batch_id, semester)
+        variables = []
+        faculty_cache = {}
+        classroom_cache = {}
+
+        for subject in subjects:
+            requires_lab = subject.get('requires_lab', False)
+            if subject['id'] not in faculty_cache:
+                faculty_cache[subject['id']] = self.optimizer.get_available_faculty(subject['id'], batch_id)
+            if requires_lab not in classroom_cache:
+                classroom_cache[requires_lab] = self.optimizer.get_available_classrooms(batch_id, requires_lab)
+
+            for block_size in self.optimizer.calculate_subject_blocks(subject):
+                variables.append({
+                    'index': len(variables),
+                    'subject': subject,
+                    'block_size': block_size,
+                    'faculty': faculty_cache[subject['id']],
+                    'classrooms': classroom_cache[requires_lab][:self.max_rooms_per_block]
+                })
+
+        return variables
+
+    def start_slots(self, variable):
+        """Slots a block may start at: full-length labs only start at lab start times"""
+        if variable['subject'].get('requires_lab', False) and variable['block_size'] == 4:
+            return self.optimizer.get_lab_start_times()
+        return self.optimizer.time_slots
+
+    def initial_domain(self, variable):
+        """Enumerate every placement of a block that fits the slot grid, bucketed by day"""
+        block_size = variable['block_size']
+        start_slots = self.start_slots(variable)
+
+        slot_runs = []
+        for start_slot in start_slots:
+            block_slots = self.optimizer.get_consecutive_slots(start_slot, block_size)
+            if block_slots and len(block_slots) == block_size:
+                slot_runs.append(tuple(block_slots))
+
+        domain = {}
+        for day_idx in range(len(self.optimizer.days)):
+            domain[day_idx] = [(day_idx, block_slots, faculty['id'], classroom['id'])
+                               for block_slots in slot_runs
+                               for faculty in variable['faculty']
+                               for classroom in variable['classrooms']]
+        return domain
+
+    def feasible_domain(self, variable, occupancy):
+        """
+        initial_domain without the placements whose slots are already taken.
+        Each (faculty, classroom) pair's free starts come from one availability
+        mask operation instead of a slot-by-slot check of every placement.
+        """
+        grid = occupancy.grid
+        if grid is not self.optimizer.slot_grid:
+            return self.initial_domain(variable)
+
+        block_size = variable['block_size']
+        start_slots = self.start_slots(variable)
+        starts = {}
+        for faculty in variable['faculty']:
+            for classroom in variable['classrooms']:
+                starts[(faculty['id'], classroom['id'])] = occupancy.feasible_starts(
+                    block_size, faculty['id'], classroom['id'], self.batch_id, start_slots)
+
+        # Same value order as initial_domain: start slot, then faculty, then classroom
+        slot_runs = []
+        for start_slot in start_slots:
+            ordinal = grid.ordinal(start_slot)
+            if ordinal is not None and grid.consecutive_ordinals(ordinal, block_size):
+                slot_runs.append((ordinal, tuple(grid.consecutive(start_slot, block_size))))
+
+        domain = {}
+        for day_idx in range(len(self.optimizer.days)):
+            offset = day_idx * len(grid)
+            domain[day_idx] = [(day_idx, block_slots, faculty_id, classroom_id)
+                               for ordinal, block_slots in slot_runs
+                               for (faculty_id, classroom_id), mask in starts.items()
+                               if mask >> (offset + ordinal) & 1]
+        return domain
+
+    def is_consistent(self, variable, value, occupancy, batch_id):
+        """Check a placement against the current occupancy and workload limits"""
+        day_idx, block_slots, faculty_id, classroom_id = value
+        block_size = variable['block_size']
+
+        if not occupancy.is_block_free(day_idx, block_slots, faculty_id, classroom_id, batch_id):
+            return False
+
+        faculty = self.faculty_lookup[faculty_id]
+        day_hours, total_hours = occupancy.faculty_workload(faculty_id, day_idx)
+        if day_hours + block_size > faculty.get('max_hours_per_day', 6):
+            return False
+        if total_hours + block_size > faculty.get('max_hours_per_week', 20):
+            return False
+
+        return occupancy.batch_classes_on_day(batch_id, day_idx) + block_size <= self.optimizer.max_classes_per_day
+
+    def solve(self, batch_id, semester, occupancy, order_seed=None):
+        """
+        Search for a complete placement of all blocks on top of an existing
+        ScheduleOccupancy. Returns schedule entries in the same shape as generate_single_timetable;
+        if the node or time budget runs out, the largest partial assignment found
+        is completed greedily. Placed blocks are left recorded in the occupancy.
+        """
+        variables = self.build_variables(batch_id, semester)
+        if not variables:
+            print("No subjects found for this batch/semester combination")
+            return []
+
+        self.faculty_lookup = {}
+        for variable in variables:
+            for faculty in variable['faculty']:
+                self.faculty_lookup[faculty['id']] = faculty
+
+        # Seeded tie-breaking lets different options explore different solutions deterministically
+        self.rng = random.Random(order_seed) if order_seed is not None else None
+        self.variables = variables
+        self.batch_id = batch_id
+        self.nodes = 0
+        self.best_assignment = {}
+
+        domains = {}
+        for variable in variables:
+            domain = {}
+            for day_idx, values in self.feasible_domain(variable, occupancy).items():
+                values = [value for value in values if self.is_consistent(variable, value, occupancy, batch_id)]
+                if self.rng:
+                    self.rng.shuffle(values)
+                domain[day_idx] = values
+            if self._domain_size(domain):
+                domains[variable['index']] = domain
+            else:
+                print(f"No feasible placement for {variable['subject']['name']} (block size: {variable['block_size']})")
+
+        assignment = {}
+        self.optimizer.report_progress(blocks_placed=0, blocks_total=len(variables))
+        self.deadline = time.monotonic() + self.time_limit
+        needed_periods = sum(variables[i]['block_size'] for i in domains)
+        free_periods = sum(self.optimizer.max_classes_per_day - occupancy.batch_classes_on_day(batch_id, day_idx)
+                           for day_idx in range(len(self.optimizer.days)))
+        if needed_periods > free_periods:
+            # No complete solution exists, so skip the exhaustive search
+            print(f"Batch needs {needed_periods} periods but only {free_periods} are free; placing greedily")
+            solved = False
+        else:
+            solved = self._search(set(domains), domains, occupancy, assignment)
+        if not solved:
+            # Search unwinds the occupancy on failure; replay the best partial and fill greedily
+            assignment = dict(self.best_assignment)
+            for var_index, value in assignment.items():
+                for entry in self._entries_for(variables[var_index], value):
+                    occupancy.add(entry)
+            self._complete_greedily(assignment, occupancy)
+
+        if len(assignment) < len(variables):
+            print(f"Solver placed {len(assignment)} of {len(variables)} blocks after {self.nodes} nodes")
+        else:
+            print(f"Solver placed all {len(variables)} blocks after {self.nodes} nodes")
+
+        schedule = []
+        for var_index in sorted(assignment):
+            schedule.extend(self._entries_for(variables[var_index], assignment[var_index]))
+        return schedule
+
+    def _entries_for(self, variable, value):
+        day_idx, block_slots, faculty_id, classroom_id = value
+        subject = variable['subject']
+        block_size = variable['block_size']
+        return [{
+            'day_of_week': day_idx,
+            'time_slot': slot,
+            'subject_id': subject['id'],
+            'faculty_id': faculty_id,
+            'classroom_id': classroom_id,
+            'batch_id': self.batch_id,
+            'is_fixed': False,
+            'block_size': block_size,
+            'is_continuous_block': block_size > 1,
+            'is_lab': subject.get('requires_lab', False)
+        } for slot in block_slots]
+
+    def _complete_greedily(self, assignment, occupancy):
+        """Place any still-unassigned blocks at their first consistent value"""
+        for variable in self.variables:
+            if variable['index'] in assignment:
+                continue
+            for values in self.feasible_domain(variable, occupancy).values():
+                value = next((value for value in values
+                              if self.is_consistent(variable, value, occupancy, self.batch_id)), None)
+                if value is not None:
+                    assignment[variable['index']] = value
+                    for entry in self._entries_for(variable, value):
+                        occupancy.add(entry)
+                    break
+
+    def _out_of_budget(self):
+        return self.nodes > self.max_nodes or time.monotonic() > self.deadline
+
+    def _domain_size(self, domain):
+        return sum(len(values) for values in domain.values())
+
+    def _order_values(self, domain, occupancy):
+        # Prefer the days this batch uses least so classes spread across the week
+        days = sorted(domain, key=lambda day_idx: (occupancy.batch_classes_on_day(self.batch_id, day_idx), day_idx))
+        for day_idx in days:
+            for value in domain[day_idx]:
+                yield value
+
+    def _search(self, unassigned, domains, occupancy, assignment):
+        self.nodes += 1
+        self.optimizer.check_cancelled()
+        if self.nodes % 50 == 0:
+            self.optimizer.report_progress(blocks_placed=len(assignment))
+        if len(assignment) > len(self.best_assignment):
+            self.best_assignment = dict(assignment)
+        if not unassigned:
+            return True
+        if self._out_of_budget():
+            return False
+
+        # Most constrained variable first; larger blocks break ties
+        var_index = min(unassigned, key=lambda i: (self._domain_size(domains[i]), -self.variables[i]['block_size'], i))
+        variable = self.variables[var_index]
+        remaining = unassigned - {var_index}
+
+        for value in list(self._order_values(domains[var_index], occupancy)):
+            # Weekly faculty limits span days, so they are re-checked here rather than propagated
+            if not self.is_consistent(variable, value, occupancy, self.batch_id):
+                continue
+
+            entries = self._entries_for(variable, value)
+            for entry in entries:
+                occupancy.add(entry)
+            assignment[var_index] = value
+
+            pruned = self._forward_check(remaining, domains, occupancy, value[0])
+            if pruned is not None:
+                if self._search(remaining, domains, occupancy, assignment):
+                    return True
+                for pruned_index, values in pruned.items():
+                    domains[pruned_index][value[0]] = values
+
+            del assignment[var_index]
+            for entry in entries:
+                occupancy.remove(entry)
+
+            if self._out_of_budget():
+                return False
+
+        return False
+
+    def _forward_check(self, unassigned, domains, occupancy, day_idx):
+        """
+        Prune the assigned day's values from unassigned domains.
+        Returns the saved day buckets, or None if some domain was wiped out.
+        """
+        saved = {}
+        for var_index in unassigned:
+            variable = self.variables[var_index]
+            values = domains[var_index][day_idx]
+            reduced = [value for value in values
+                       if self.is_consistent(variable, value, occupancy, self.batch_id)]
+            if len(reduced) != len(values):
+                saved[var_index] = values
+                domains[var_index][day_idx] = reduced
+                if not reduced and not self._domain_size(domains[var_index]):
+                    for restored_index, restored in saved.items():
+                        domains[restored_index][day_idx] = restored
+                    return None
+        return saved
@@ -0,0 +1,268 @@
+"""
+Local Search Timetable Improvement
+Simulated annealing with a short tabu list over a generated schedule
+"""
+
+from collections import deque
+import math
+import random
+import time
+
+from schedule_scorer import IncrementalScorer
+
+
+class LocalSearchImprover:
+    """
+    Repeatedly moves, swaps or reassigns blocks of a schedule and keeps the
+    changes that improve evaluate_timetable, occasionally accepting worse ones
+    (annealing) to escape local optima. Each move is scored with a delta over
+    an IncrementalScorer instead of a full re-evaluation.
+    """
+
+    def __init__(self, optimizer, batch_id, time_budget=1.0, max_iterations=2000,
+                 initial_temperature=5.0, cooling_rate=0.995, tabu_tenure=15, rng=None):
+        self.optimizer = optimizer
+        self.batch_id = batch_id
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.initial_temperature = initial_temperature
+        self.cooling_rate = cooling_rate
+        self.tabu_tenure = tabu_tenure
+        self.rng = rng or random
+
+    def improve(self, schedule, occupancy=None):
+        """
+        Return an improved copy of schedule. occupancy, if given, must already
+        contain the schedule's entries (and any other batches' classes); it is
+        left reflecting the returned schedule.
+        """
+        from timetable_optimizer import ScheduleOccupancy
+
+        fixed_entries = [entry for entry in schedule if entry.get('is_fixed', False)]
+        self.blocks = self._group_blocks([entry for entry in schedule if not entry.get('is_fixed', False)])
+        if not self.blocks:
+            return list(schedule)
+
+        self.occupancy = occupancy if occupancy is not None else ScheduleOccupancy(schedule, grid=self.optimizer.slot_grid)
+        self._load_candidates()
+        self.scorer = IncrementalScorer(schedule)
+        initial_score = self.scorer.raw_score()
+
+        current_score = initial_score
+        best_score = current_score
+        best_blocks = [dict(block) for block in self.blocks]
+        tabu = deque(maxlen=self.tabu_tenure)
+        temperature = self.initial_temperature
+        deadline = time.monotonic() + self.time_budget
+        moves = (self._move_block, self._swap_blocks, self._reassign_faculty, self._reassign_classroom)
+
+        iteration = 0
+        while iteration < self.max_iterations and time.monotonic() < deadline:
+            iteration += 1
+            self.optimizer.check_cancelled()
+            change = self.rng.choice(moves)()
+            if change is None:
+                continue
+
+            touched, new_values = change
+            # Tabu blocks may only move again if that beats the best schedule so far (aspiration)
+            is_tabu = any(index in tabu for index in touched)
+            delta = self._apply(touched, new_values)
+            if delta is None:
+                continue
+
+            new_score = current_score + delta
+            accept = delta >= 0 or (temperature > 1e-6 and self.rng.random() < math.exp(delta / temperature))
+            if is_tabu and new_score <= best_score:
+                accept = False
+
+            if accept:
+                current_score = new_score
+                tabu.extend(touched)
+                if current_score > best_score:
+                    best_score = current_score
+                    best_blocks = [dict(block) for block in self.blocks]
+            else:
+                self._apply(touched, [self._placement(self.previous[index]) for index in touched], force=True)
+            temperature *= self.cooling_rate
+
+        # Leave the occupancy describing the best schedule found
+        for index, block in enumerate(self.blocks):
+            if block != best_blocks[index]:
+                for entry in self._entries(block):
+                    self.occupancy.remove(entry)
+        for index, block in enumerate(best_blocks):
+            if block != self.blocks[index]:
+                for entry in self._entries(block):
+                    self.occupancy.add(entry)
+        self.blocks = best_blocks
+
+        print(f"Local search: {iteration} iterations, score {initial_score:.1f} -> {best_score:.1f}")
+        improved = list(fixed_entries)
+        for block in self.blocks:
+            improved.extend(self._entries(block))
+        return improved
+
+    # Schedule representation
+
+    def _group_blocks(self, entries):
+        """Rebuild blocks from entries, which the generators append block by block"""
+        blocks = []
+        index = 0
+        while index < len(entries):
+            entry = entries[index]
+            size = max(1, entry.get('block_size', 1))
+            members = entries[index:index + size]
+            blocks.append({
+                'subject_id': entry['subject_id'],
+                'batch_id': entry.get('batch_id', self.batch_id),
+                'block_size': len(members),
+                'is_lab': entry.get('is_lab', False),
+                'day_of_week': entry['day_of_week'],
+                'slots': tuple(member['time_slot'] for member in members),
+                'faculty_id': entry['faculty_id'],
+                'classroom_id': entry['classroom_id']
+            })
+            index += len(members)
+        return blocks
+
+    def _entries(self, block):
+        return [{
+            'day_of_week': block['day_of_week'],
+            'time_slot': slot,
+            'subject_id': block['subject_id'],
+            'faculty_id': block['faculty_id'],
+            'classroom_id': block['classroom_id'],
+            'batch_id': block['batch_id'],
+            'is_fixed': False,
+            'block_size': block['block_size'],
+            'is_continuous_block': block['block_size'] > 1,
+            'is_lab': block['is_lab']
+        } for slot in block['slots']]
+
+    def _placement(self, block):
+        return {key: block[key] for key in ('day_of_week', 'slots', 'faculty_id', 'classroom_id')}
+
+    def _run_key(self, block):
+        return block['block_size'], block['is_lab']
+
+    def _load_candidates(self):
+        """Slot runs per block size plus the faculty and rooms each subject may use"""
+        self.slot_runs = {}
+        self.faculty_options = {}
+        self.classroom_options = {}
+        self.faculty_limits = {}
+        for block in self.blocks:
+            run_key = self._run_key(block)
+            if run_key not in self.slot_runs:
+                size = block['block_size']
+                # Same start times the generators use: full-length labs only start at lab slots
+                start_slots = self.optimizer.get_lab_start_times() if block['is_lab'] and size == 4 else self.optimizer.time_slots
+                runs = []
+                for start_slot in start_slots:
+                    block_slots = self.optimizer.get_consecutive_slots(start_slot, size)
+                    if block_slots and len(block_slots) == size:
+                        runs.append(tuple(block_slots))
+                self.slot_runs[run_key] = runs
+            if block['subject_id'] not in self.faculty_options:
+                faculty = self.optimizer.get_available_faculty(block['subject_id'], self.batch_id)
+                self.faculty_options[block['subject_id']] = [member['id'] for member in faculty]
+                for member in faculty:
+                    self.faculty_limits[member['id']] = (member.get('max_hours_per_day', 6), member.get('max_hours_per_week', 20))
+            if block['is_lab'] not in self.classroom_options:
+                classrooms = self.optimizer.get_available_classrooms(self.batch_id, block['is_lab'])
+                self.classroom_options[block['is_lab']] = [classroom['id'] for classroom in classrooms]
+
+    # Moves: each returns (touched block indexes, new placements) or None
+
+    def _move_block(self):
+        index = self.rng.randrange(len(self.blocks))
+        runs = self.slot_runs.get(self._run_key(self.blocks[index]))
+        if not runs:
+            return None
+        placement = self._placement(self.blocks[index])
+        placement['day_of_week'] = self.rng.randrange(len(self.optimizer.days))
+        placement['slots'] = self.rng.choice(runs)
+        return [index], [placement]
+
+    def _swap_blocks(self):
+        first = self.rng.randrange(len(self.blocks))
+        second = self.rng.randrange(len(self.blocks))
+        if first == second or self._run_key(self.blocks[first]) != self._run_key(self.blocks[second]):
+            return None
+        first_placement = self._placement(self.blocks[first])
+        second_placement = self._placement(self.blocks[second])
+        first_placement['day_of_week'], second_placement['day_of_week'] = second_placement['day_of_week'], first_placement['day_of_week']
+        first_placement['slots'], second_placement['slots'] = second_placement['slots'], first_placement['slots']
+        return [first, second], [first_placement, second_placement]
+
+    def _reassign_faculty(self):
+        index = self.rng.randrange(len(self.blocks))
+        options = self.faculty_options.get(self.blocks[index]['subject_id'])
+        if not options or len(options) < 2:
+            return None
+        placement = self._placement(self.blocks[index])
+        placement['faculty_id'] = self.rng.choice(options)
+        return [index], [placement]
+
+    def _reassign_classroom(self):
+        index = self.rng.randrange(len(self.blocks))
+        options = self.classroom_options.get(self.blocks[index]['is_lab'])
+        if not options or len(options) < 2:
+            return None
+        placement = self._placement(self.blocks[index])
+        placement['classroom_id'] = self.rng.choice(options)
+        return [index], [placement]
+
+    def _apply(self, touched, placements, force=False):
+        """
+        Replace the touched blocks' placements. Returns the score delta, or None
+        (with nothing changed) if the new placement breaks a hard constraint.
+        """
+        before = self.scorer.raw_score()
+        self.previous = {index: dict(self.blocks[index]) for index in touched}
+        for index in touched:
+            for entry in self._entries(self.blocks[index]):
+                self.occupancy.remove(entry)
+                self.scorer.remove(entry)
+
+        candidates = []
+        for index, placement in zip(touched, placements):
+            block = dict(self.blocks[index])
+            block.update(placement)
+            candidates.append((index, block))
+
+        feasible = True
+        added = []
+        for index, block in candidates:
+            if not force and not self._fits(block):
+                feasible = False
+                break
+            for entry in self._entries(block):
+                self.occupancy.add(entry)
+                self.scorer.add(entry)
+                added.append(entry)
+
+        if not feasible:
+            for entry in added:
+                self.occupancy.remove(entry)
+                self.scorer.remove(entry)
+            for index in touched:
+                for entry in self._entries(self.blocks[index]):
+                    self.occupancy.add(entry)
+                    self.scorer.add(entry)
+            return None
+
+        for index, block in candidates:
+            self.blocks[index] = block
+        return self.scorer.raw_score() - before
+
+    def _fits(self, block):
+        day_idx = block['day_of_week']
+        if not self.occupancy.is_block_free(day_idx, block['slots'], block['faculty_id'], block['classroom_id'], block['batch_id']):
+            return False
+        max_per_day, max_per_week = self.faculty_limits.get(block['faculty_id'], (6, 20))
+        day_hours, total_hours = self.occupancy.faculty_workload(block['faculty_id'], day_idx)
+        if day_hours + block['block_size'] > max_per_day or total_hours + block['block_size'] > max_per_week:
+            return False
+        return self.occupancy.batch_classes_on_day(block['batch_id'], day_idx) + block['block_size'] <= self.optimizer.max_classes_per_day
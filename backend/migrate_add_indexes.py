@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the composite indexes and the per-cell unique
+constraint declared in models.py to an existing MySQL or PostgreSQL database.
+A cell is (timetable_id, day_of_week, time_slot, batch_id).
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, inspect, text
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from models import db
+
+# Load environment variables
+load_dotenv()
+
+
+def get_database_url():
+    """PostgreSQL from DATABASE_URL (Render), otherwise the local MySQL database"""
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+        return database_url
+
+    mysql_user = os.getenv('MYSQL_USER', 'root')
+    mysql_password = os.getenv('MYSQL_PASSWORD', 'sravan167')
+    mysql_host = os.getenv('MYSQL_HOST', 'localhost')
+    mysql_port = os.getenv('MYSQL_PORT', '3306')
+    mysql_database = os.getenv('MYSQL_DATABASE', 'smart_classroom_scheduler')
+    return f"mysql+pymysql://{mysql_user}:{mysql_password}@{mysql_host}:{mysql_port}/{mysql_database}"
+
+
+def existing_index_names(inspector, table_name):
+    names = {index['name'] for index in inspector.get_indexes(table_name)}
+    names.update(constraint['name'] for constraint in inspector.get_unique_constraints(table_name))
+    return names
+
+
+def find_duplicate_cells(connection, limit=10):
+    """Timetable cells holding more than one entry, which block the unique constraint"""
+    return connection.execute(text("""
+        SELECT timetable_id, day_of_week, time_slot, batch_id, COUNT(*) AS entries
+        FROM timetable_entries
+        GROUP BY timetable_id, day_of_week, time_slot, batch_id
+        HAVING COUNT(*) > 1
+        ORDER BY timetable_id, day_of_week, time_slot, batch_id
+        LIMIT :limit
+    """), {"limit": limit}).fetchall()
+
+
+def add_unique_cell_constraint(connection, existing):
+    """Add uq_timetable_entries_cell, or a plain index if duplicates exist"""
+    if 'uq_timetable_entries_cell' in existing:
+        print("[INFO] uq_timetable_entries_cell already exists")
+        return
+
+    duplicates = find_duplicate_cells(connection)
+    if not duplicates:
+        connection.execute(text("""
+            ALTER TABLE timetable_entries
+            ADD CONSTRAINT uq_timetable_entries_cell
+            UNIQUE (timetable_id, day_of_week, time_slot, batch_id)
+        """))
+        print("[SUCCESS] Added unique constraint uq_timetable_entries_cell")
+        return
+
+    print("[WARNING] Timetable cells with more than one entry, skipping the unique constraint:")
+    for row in duplicates:
+        print(f"  timetable {row.timetable_id}, day {row.day_of_week}, {row.time_slot}, batch {row.batch_id}: {row.entries} entries")
+    # Lookups by timetable still get an index; rerun after cleaning up to add the constraint
+    if 'ix_timetable_entries_cell' not in existing:
+        connection.execute(text("""
+            CREATE INDEX ix_timetable_entries_cell
+            ON timetable_entries (timetable_id, day_of_week, time_slot, batch_id)
+        """))
+        print("[SUCCESS] Added index ix_timetable_entries_cell instead")
+
+
+def run_migration():
+    """Create every index declared in models.py that the database lacks"""
+    try:
+        engine = create_engine(get_database_url())
+        print(f"Connected to: {engine.dialect.name}")
+
+        with engine.connect() as connection:
+            inspector = inspect(connection)
+            tables = set(inspector.get_table_names())
+
+            for table in db.metadata.sorted_tables:
+                if table.name not in tables:
+                    print(f"[INFO] Table {table.name} does not exist yet, db.create_all() will create it")
+                    continue
+                existing = existing_index_names(inspector, table.name)
+
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    if index.name in existing:
+                        print(f"[INFO] Index {index.name} already exists")
+                        continue
+                    index.create(connection)
+                    print(f"[SUCCESS] Added index {index.name} on {table.name}")
+
+                if table.name == 'timetable_entries':
+                    add_unique_cell_constraint(connection, existing)
+                connection.commit()
+
+        print("Index migration complete!")
+    except Exception as e:
+        print(f"Error running migration: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_migration()
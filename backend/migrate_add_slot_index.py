@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Migration script for integer slot ordinals: creates the timetable_slots table,
+adds timetable_entries.slot_index and backfills both from each timetable's
+timing_config. Works on MySQL and PostgreSQL and is safe to rerun.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from models import TimetableSlot
+from slot_grid import SlotGrid
+from migrate_add_indexes import get_database_url
+
+
+def add_slot_index_column(connection, inspector):
+    columns = {column['name'] for column in inspector.get_columns('timetable_entries')}
+    if 'slot_index' in columns:
+        print("[INFO] Column slot_index already exists in timetable_entries")
+        return
+    connection.execute(text("ALTER TABLE timetable_entries ADD COLUMN slot_index INTEGER NULL"))
+    print("[SUCCESS] Added column slot_index to timetable_entries")
+
+
+def backfill_timetable(connection, timetable_id, timing_config):
+    """Store the timetable's slot grid if missing and number its entries"""
+    stored = connection.execute(text(
+        "SELECT ordinal, time_slot FROM timetable_slots WHERE timetable_id = :timetable_id ORDER BY ordinal"
+    ), {"timetable_id": timetable_id}).fetchall()
+    if stored:
+        grid = SlotGrid([row.time_slot for row in stored])
+    else:
+        grid = SlotGrid.from_timing_config(timing_config)
+        if len(grid):
+            connection.execute(TimetableSlot.__table__.insert(), grid.slot_rows(timetable_id))
+
+    slot_rows = grid.slot_rows(timetable_id)
+    if not slot_rows:
+        return
+    connection.execute(text("""
+        UPDATE timetable_entries SET slot_index = :ordinal
+        WHERE timetable_id = :timetable_id AND time_slot = :time_slot AND slot_index IS NULL
+    """), slot_rows)
+
+
+def run_migration():
+    try:
+        engine = create_engine(get_database_url())
+        print(f"Connected to: {engine.dialect.name}")
+
+        with engine.connect() as connection:
+            TimetableSlot.__table__.create(connection, checkfirst=True)
+            print("[SUCCESS] Table timetable_slots is present")
+            add_slot_index_column(connection, inspect(connection))
+            connection.commit()
+
+            timetables = connection.execute(text("SELECT id, timing_config FROM timetables ORDER BY id")).fetchall()
+            print(f"Backfilling slot ordinals for {len(timetables)} timetables...")
+            for timetable in timetables:
+                backfill_timetable(connection, timetable.id, timetable.timing_config)
+                connection.commit()
+
+            unmatched = connection.execute(text(
+                "SELECT COUNT(*) FROM timetable_entries WHERE slot_index IS NULL"
+            )).scalar()
+            if unmatched:
+                print(f"[INFO] {unmatched} entries use time slots outside their timetable's grid and keep slot_index NULL")
+
+        print("Slot index migration complete!")
+    except Exception as e:
+        print(f"Error running migration: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -26,6 +26,9 @@ class User(db.Model):
 
 class Classroom(db.Model):
     __tablename__ = 'classrooms'
+    __table_args__ = (
+        db.Index('ix_classrooms_created_by', 'created_by'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -45,6 +48,9 @@ class Classroom(db.Model):
 
 class Subject(db.Model):
     __tablename__ = 'subjects'
+    __table_args__ = (
+        db.Index('ix_subjects_created_by', 'created_by'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -65,6 +71,9 @@ class Subject(db.Model):
 
 class Faculty(db.Model):
     __tablename__ = 'faculty'
+    __table_args__ = (
+        db.Index('ix_faculty_created_by', 'created_by'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -82,6 +91,9 @@ class Faculty(db.Model):
 
 class Batch(db.Model):
     __tablename__ = 'batches'
+    __table_args__ = (
+        db.Index('ix_batches_created_by', 'created_by'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -101,6 +113,10 @@ class Batch(db.Model):
 
 class FacultySubject(db.Model):
     __tablename__ = 'faculty_subjects'
+    __table_args__ = (
+        # Faculty lookup for a subject, narrowed by department, branch and semester
+        db.Index('ix_faculty_subjects_subject_department', 'subject_id', 'department', 'branch', 'semester'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     faculty_id = db.Column(db.Integer, db.ForeignKey('faculty.id'), nullable=False)
@@ -118,6 +134,9 @@ class FacultySubject(db.Model):
 
 class Timetable(db.Model):
     __tablename__ = 'timetables'
+    __table_args__ = (
+        db.Index('ix_timetables_created_by_created_at', 'created_by', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -134,8 +153,32 @@ class Timetable(db.Model):
     creator = db.relationship('User', backref='created_timetables')
 
 
+class TimetableSlot(db.Model):
+    __tablename__ = 'timetable_slots'
+    __table_args__ = (
+        db.UniqueConstraint('timetable_id', 'ordinal', name='uq_timetable_slots_ordinal'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    timetable_id = db.Column(db.Integer, db.ForeignKey('timetables.id'), nullable=False)
+    ordinal = db.Column(db.Integer, nullable=False)
+    time_slot = db.Column(db.String(20), nullable=False)
+    
+    timetable = db.relationship('Timetable', backref=db.backref('slots', cascade='all, delete-orphan', order_by='TimetableSlot.ordinal'))
+
+
 class TimetableEntry(db.Model):
     __tablename__ = 'timetable_entries'
+    __table_args__ = (
+        # One class per batch and slot of a timetable (the cell the editor diffs on);
+        # its (timetable_id, day_of_week, time_slot) prefix serves lookups by timetable and slot
+        db.UniqueConstraint('timetable_id', 'day_of_week', 'time_slot', 'batch_id', name='uq_timetable_entries_cell'),
+        # Occupancy checks by room or batch, covering the column each one reads back
+        db.Index('ix_timetable_entries_classroom_slot', 'classroom_id', 'day_of_week', 'time_slot', 'batch_id'),
+        db.Index('ix_timetable_entries_batch_slot', 'batch_id', 'day_of_week', 'time_slot', 'classroom_id'),
+        # Whole-slot occupancy prefetch in the classroom allocator
+        db.Index('ix_timetable_entries_slot', 'day_of_week', 'time_slot'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     timetable_id = db.Column(db.Integer, db.ForeignKey('timetables.id'), nullable=False)
@@ -145,6 +188,7 @@ class TimetableEntry(db.Model):
     classroom_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False)
     day_of_week = db.Column(db.Integer, nullable=False)
     time_slot = db.Column(db.String(20), nullable=False)
+    slot_index = db.Column(db.Integer, nullable=True)  # Ordinal of time_slot in the timetable's timetable_slots
     is_temporary_allocation = db.Column(db.Boolean, default=False)
     original_classroom_owner_id = db.Column(db.Integer, db.ForeignKey('batches.id'), nullable=True)
     allocation_reason = db.Column(db.String(100), nullable=True)
@@ -0,0 +1,110 @@
+"""
+Rendered PDF Cache
+Keeps generated timetable PDFs on local disk, keyed by timetable id and a
+content hash, with least-recently-used eviction
+"""
+
+import os
+import tempfile
+import threading
+
+
+class PdfCache:
+    """
+    One file per (timetable id, content hash) in a cache directory. A read
+    refreshes the file's modification time, which is what eviction orders by,
+    so the cache survives worker restarts and needs no index of its own.
+    """
+
+    def __init__(self, directory, max_entries=200):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, timetable_id, digest):
+        return os.path.join(self.directory, f"{timetable_id}-{digest}.pdf")
+
+    def get(self, timetable_id, digest):
+        """Open the cached PDF for reading, or return None on a miss"""
+        path = self.path_for(timetable_id, digest)
+        try:
+            cached = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cached
+
+    def reserve(self):
+        """Path of a new temporary file in the cache directory, for rendering into"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        return temp_path
+
+    def discard(self, temp_path):
+        """Remove a reserved file that will not be committed"""
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def commit(self, timetable_id, digest, temp_path):
+        """
+        Publish a fully written reserved file as the PDF for (timetable_id, digest),
+        replacing older versions of the same timetable. Returns the PDF opened
+        for reading, so eviction cannot remove it before it is served.
+        """
+        path = self.path_for(timetable_id, digest)
+        # Readers never see a partial file: the rename is atomic
+        os.replace(temp_path, path)
+        cached = open(path, 'rb')
+        self.invalidate(timetable_id, keep=path)
+        self._evict()
+        return cached
+
+    def store(self, timetable_id, digest, render):
+        """Call render(file) to write the PDF straight to disk, then commit it"""
+        temp_path = self.reserve()
+        try:
+            with open(temp_path, 'wb') as temp_file:
+                render(temp_file)
+        except Exception:
+            self.discard(temp_path)
+            raise
+        return self.commit(timetable_id, digest, temp_path)
+
+    def invalidate(self, timetable_id, keep=None):
+        """Drop every cached version of a timetable (except keep, a path)"""
+        prefix = f"{timetable_id}-"
+        with self.lock:
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.startswith(prefix) and name.endswith('.pdf') and path != keep:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _evict(self):
+        """Remove the least recently used PDFs beyond max_entries"""
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
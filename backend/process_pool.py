@@ -0,0 +1,36 @@
+"""
+Worker Process Pool
+One shared process pool for CPU-heavy work (timetable options, PDF rendering),
+replaced with a fresh one when a worker dies
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers=None):
+    """Shared process pool, created on first use and again after reset_process_pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps database connections inherited from the web worker out of the children
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def reset_process_pool(pool):
+    """
+    Drop a pool that raised BrokenProcessPool (e.g. a worker was OOM-killed)
+    so the next get_process_pool starts new workers. A pool already replaced
+    by another request is left alone.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,75 @@
+"""
+Optimal Room Assignment
+Maximum-weight bipartite matching (Hungarian algorithm) between the classes
+taught in one slot and the classrooms they may use
+"""
+
+
+def max_weight_assignment(weights, allowed):
+    """
+    Assign rows (classes) to distinct columns (classrooms) over allowed pairs:
+    as many rows as possible, and among those the maximum total weight.
+    weights and allowed are row-major matrices of the same shape.
+    Runs in O(rows^2 * (rows + columns)).
+    Returns the chosen column per row, or None where no allowed column is left.
+    """
+    rows = len(weights)
+    if not rows:
+        return []
+    columns = len(weights[0])
+
+    # Disallowed pairs cost more than any allowed assignment could save, so they
+    # are only used when a row has nothing else; one "unassigned" column per row
+    # keeps the problem solvable when there are more rows than columns
+    spread = max((abs(weights[i][j]) for i in range(rows) for j in range(columns) if allowed[i][j]), default=0)
+    forbidden = (spread + 1) * (rows + 1) * 2
+    unassigned = forbidden // 2
+    width = columns + rows
+    cost = [[-weights[i][j] if allowed[i][j] else forbidden for j in range(columns)] + [unassigned] * rows
+            for i in range(rows)]
+
+    # Shortest augmenting path Hungarian algorithm with row/column potentials (1-indexed)
+    infinity = float('inf')
+    u = [0] * (rows + 1)
+    v = [0] * (width + 1)
+    owner = [0] * (width + 1)
+    way = [0] * (width + 1)
+    for i in range(1, rows + 1):
+        owner[0] = i
+        j0 = 0
+        min_reduced = [infinity] * (width + 1)
+        used = [False] * (width + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            delta = infinity
+            j1 = 0
+            for j in range(1, width + 1):
+                if not used[j]:
+                    reduced = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if reduced < min_reduced[j]:
+                        min_reduced[j] = reduced
+                        way[j] = j0
+                    if min_reduced[j] < delta:
+                        delta = min_reduced[j]
+                        j1 = j
+            for j in range(width + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    assignment = [None] * rows
+    for j in range(1, columns + 1):
+        i = owner[j]
+        if i and allowed[i - 1][j - 1]:
+            assignment[i - 1] = j - 1
+    return assignment
@@ -0,0 +1,98 @@
+"""
+Incremental Timetable Scoring
+Keeps the aggregates behind TimetableOptimizer.evaluate_timetable up to date
+as entries are added, removed or moved
+"""
+
+from collections import defaultdict
+
+
+class IncrementalScorer:
+    """
+    Stateful scorer. add/remove/move update the per-day, per-faculty and
+    per-classroom counters in constant time; score() is only recomputed over
+    the (at most seven) active days when it is read.
+    """
+
+    MAX_WEEKLY_HOURS = 20  # Faculty hours above this are penalised
+    OVERLOAD_PENALTY = 5
+    DAILY_IMBALANCE_PENALTY = 2
+    CLASSROOM_USAGE_BONUS = 2
+
+    def __init__(self, entries=None):
+        self.daily_classes = defaultdict(int)         # day -> non-fixed classes
+        self.faculty_load = defaultdict(int)          # faculty_id -> all classes
+        self.classroom_usage = defaultdict(int)       # classroom_id -> all classes
+        self.faculty_teaching = defaultdict(int)      # faculty_id -> non-fixed classes
+        self.classroom_teaching = defaultdict(int)    # classroom_id -> non-fixed classes
+        self.overload_penalty = 0
+        self.total_entries = 0
+        self.used_classrooms = 0
+        for entry in entries or []:
+            self.add(entry)
+
+    def add(self, entry):
+        """Count an entry (dict with day_of_week, faculty_id, classroom_id, is_fixed)"""
+        self._update(entry, 1)
+
+    def remove(self, entry):
+        """Stop counting an entry previously passed to add()"""
+        self._update(entry, -1)
+
+    def move(self, old_entry, new_entry):
+        """Replace one entry with another, e.g. after changing its day, faculty or room"""
+        self._update(old_entry, -1)
+        self._update(new_entry, 1)
+
+    def _update(self, entry, sign):
+        if not entry.get('is_fixed', False):
+            self.daily_classes[entry['day_of_week']] += sign
+            self.faculty_teaching[entry['faculty_id']] += sign
+            self.classroom_teaching[entry['classroom_id']] += sign
+
+        faculty_id = entry['faculty_id']
+        load = self.faculty_load[faculty_id]
+        self.overload_penalty -= max(0, load - self.MAX_WEEKLY_HOURS) * self.OVERLOAD_PENALTY
+        self.faculty_load[faculty_id] = load + sign
+        self.overload_penalty += max(0, load + sign - self.MAX_WEEKLY_HOURS) * self.OVERLOAD_PENALTY
+
+        classroom_id = entry['classroom_id']
+        usage = self.classroom_usage[classroom_id]
+        if usage == 0 and sign > 0:
+            self.used_classrooms += 1
+        elif usage + sign == 0:
+            self.used_classrooms -= 1
+        self.classroom_usage[classroom_id] = usage + sign
+        self.total_entries += sign
+
+    def raw_score(self):
+        """Score without the floor at zero, so deltas stay meaningful for bad schedules"""
+        score = 100
+
+        # Penalty for uneven distribution across days
+        active_days = [count for count in self.daily_classes.values() if count]
+        if active_days:
+            avg_classes = sum(active_days) / len(active_days)
+            for count in active_days:
+                score -= abs(count - avg_classes) * self.DAILY_IMBALANCE_PENALTY
+
+        # Penalty for faculty overload
+        score -= self.overload_penalty
+
+        # Bonus for classroom utilization
+        if self.used_classrooms:
+            score += (self.total_entries / self.used_classrooms) * self.CLASSROOM_USAGE_BONUS
+
+        return score
+
+    def score(self):
+        """Same value TimetableOptimizer.evaluate_timetable returns"""
+        return max(0, self.raw_score())
+
+    def utilization_stats(self):
+        """Same shape as TimetableOptimizer.get_utilization_stats"""
+        return {
+            'faculty_utilization': {key: count for key, count in self.faculty_teaching.items() if count},
+            'classroom_utilization': {key: count for key, count in self.classroom_teaching.items() if count},
+            'daily_distribution': {key: count for key, count in self.daily_classes.items() if count}
+        }
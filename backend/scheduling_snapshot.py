@@ -0,0 +1,141 @@
+"""
+Scheduling Snapshot
+Loads everything timetable generation reads in a handful of bulk queries and
+serves the optimizer's lookups from plain in-memory dictionaries
+"""
+
+from models import Subject, Faculty, Classroom, Batch, FacultySubject
+from collections import defaultdict
+
+
+class SchedulingSnapshot:
+    """Indexed, picklable copy of batches, subjects, faculty, faculty-subject mappings and classrooms"""
+
+    def __init__(self, batches, subjects, faculty, faculty_subjects, classrooms):
+        self.batches = {batch['id']: batch for batch in batches}
+        self.subjects = {subject['id']: subject for subject in subjects}
+        self.faculty = {member['id']: member for member in faculty}
+        self.classrooms = {classroom['id']: classroom for classroom in classrooms}
+
+        self.subjects_by_department_semester = defaultdict(list)
+        for subject in subjects:
+            self.subjects_by_department_semester[(subject['department'], subject['semester'])].append(subject)
+
+        self.faculty_by_department = defaultdict(list)
+        for member in faculty:
+            self.faculty_by_department[member['department']].append(member)
+
+        # Same ordering the database queries used: priority ascending, primary first
+        self.assignments_by_subject = defaultdict(list)
+        for assignment in sorted(faculty_subjects, key=lambda fs: (fs['priority'] or 0, not fs['is_primary'])):
+            self.assignments_by_subject[assignment['subject_id']].append(assignment)
+
+        self.classrooms_by_capacity = sorted(classrooms, key=lambda classroom: classroom['capacity'])
+
+    def batch_subjects(self, batch_id, semester):
+        """Subjects of the batch's department for a semester"""
+        batch = self.batches.get(batch_id)
+        if not batch:
+            return []
+        return [dict(subject) for subject in self.subjects_by_department_semester.get((batch['department'], int(semester)), [])]
+
+    def faculty_for_subject(self, subject_id, batch_id=None):
+        """Faculty who can teach a subject, following the optimizer's five-level fallback"""
+        subject = self.subjects.get(subject_id)
+        if not subject:
+            return []
+        batch = self.batches.get(batch_id) if batch_id else None
+        assignments = self.assignments_by_subject.get(subject_id, [])
+
+        if batch:
+            exact = [fs for fs in assignments
+                     if fs['department'] == batch['department'] and fs['branch'] == batch['branch'] and fs['semester'] == batch['semester']]
+            if exact:
+                return [self._faculty_entry(fs['faculty_id'], fs['is_primary'], fs['priority'], 'exact_match') for fs in exact]
+
+        department = [fs for fs in assignments if fs['department'] == subject['department']]
+        if department:
+            return [self._faculty_entry(fs['faculty_id'], fs['is_primary'], fs['priority'], 'department_match') for fs in department]
+
+        if assignments:
+            return [self._faculty_entry(fs['faculty_id'], fs['is_primary'], fs['priority'], 'subject_match') for fs in assignments]
+
+        if subject['department'] and self.faculty_by_department.get(subject['department']):
+            return [self._faculty_entry(member['id'], False, 3, 'department_fallback')
+                    for member in self.faculty_by_department[subject['department']]]
+
+        return [self._faculty_entry(member_id, False, 4, 'general_fallback') for member_id in self.faculty]
+
+    def classrooms_for_batch(self, batch_id, requires_lab=False):
+        """Rooms big enough for the batch, smallest first; labs only when required"""
+        batch = self.batches.get(batch_id)
+        if not batch:
+            return []
+        return [dict(classroom) for classroom in self.classrooms_by_capacity
+                if classroom['capacity'] >= batch['student_count'] and (not requires_lab or classroom['type'] == 'lab')]
+
+    def _faculty_entry(self, faculty_id, is_primary, priority, match_type):
+        entry = dict(self.faculty[faculty_id])
+        entry.update({'is_primary': is_primary, 'priority': priority, 'match_type': match_type})
+        return entry
+
+
+def load_scheduling_snapshot(batch_ids):
+    """Fetch the data for generating timetables of the given batches in five bulk queries"""
+    batches = Batch.query.filter(Batch.id.in_(list(batch_ids))).all()
+    departments = {batch.department for batch in batches}
+
+    subjects = Subject.query.filter(Subject.department.in_(departments)).all() if departments else []
+    subject_ids = [subject.id for subject in subjects]
+    faculty_subjects = FacultySubject.query.filter(FacultySubject.subject_id.in_(subject_ids)).all() if subject_ids else []
+    faculty = Faculty.query.all()
+    classrooms = Classroom.query.all()
+
+    return SchedulingSnapshot(
+        batches=[{
+            'id': batch.id,
+            'name': batch.name,
+            'department': batch.department,
+            'branch': batch.branch,
+            'semester': batch.semester,
+            'student_count': batch.student_count or 0,
+            'priority_for_allocation': batch.priority_for_allocation
+        } for batch in batches],
+        subjects=[{
+            'id': subject.id,
+            'name': subject.name,
+            'code': subject.code,
+            'credits': subject.credits,
+            'department': subject.department,
+            'semester': subject.semester,
+            'hours_per_week': subject.hours_per_week,
+            'requires_lab': subject.requires_lab,
+            'scheduling_preference': getattr(subject, 'scheduling_preference', 'single'),
+            'continuous_block_size': getattr(subject, 'continuous_block_size', 2)
+        } for subject in subjects],
+        faculty=[{
+            'id': member.id,
+            'name': member.name,
+            'email': member.email,
+            'department': member.department,
+            'specialization': getattr(member, 'specialization', ''),
+            'max_hours_per_week': member.max_hours_per_week,
+            'max_hours_per_day': member.max_hours_per_day
+        } for member in faculty],
+        faculty_subjects=[{
+            'faculty_id': fs.faculty_id,
+            'subject_id': fs.subject_id,
+            'department': fs.department,
+            'branch': fs.branch,
+            'semester': fs.semester,
+            'is_primary': fs.is_primary,
+            'priority': fs.priority
+        } for fs in faculty_subjects],
+        classrooms=[{
+            'id': classroom.id,
+            'name': classroom.name,
+            'capacity': classroom.capacity,
+            'type': classroom.type,
+            'equipment': classroom.equipment
+        } for classroom in classrooms]
+    )
@@ -0,0 +1,134 @@
+"""
+Slot Grid
+Integer ordinals for a timetable's periods, so lookups and consecutive-block
+checks work on small integers instead of searching lists of "HH:MM-HH:MM" strings.
+Cells of the week double as bit positions for availability masks.
+"""
+
+import json
+
+# TimetableOptimizer arguments a stored timing_config may carry
+TIMING_KEYS = ('include_short_break', 'short_break_duration', 'college_start_time',
+               'college_end_time', 'lunch_break_duration', 'lunch_break_start_time')
+
+
+class SlotGrid:
+    """
+    Periods of one timing configuration numbered 0..n-1 in teaching order.
+    A (day, period) cell is day * n + ordinal, which gives every slot of the
+    week a dense integer index and a bit in an availability mask (an int with
+    bit `cell` set when the faculty member, room or batch is busy there).
+    """
+
+    def __init__(self, time_slots, break_slots=(), num_days=6):
+        self.slots = list(time_slots)
+        self.index = {time_slot: ordinal for ordinal, time_slot in enumerate(self.slots)}
+        self.num_days = num_days
+
+        # Periods usable from each ordinal before a break or the end of the day
+        self.run_length = [0] * (len(self.slots) + 1)
+        for ordinal in range(len(self.slots) - 1, -1, -1):
+            if self.slots[ordinal] not in break_slots:
+                self.run_length[ordinal] = self.run_length[ordinal + 1] + 1
+        self.week_mask = (1 << self.num_cells) - 1
+        self._start_masks = {}
+
+    @classmethod
+    def from_timing_config(cls, timing_config=None):
+        """Grid for a stored timing configuration (JSON string or dict); the default timing if empty"""
+        from timetable_optimizer import TimetableOptimizer
+
+        if isinstance(timing_config, str):
+            try:
+                timing_config = json.loads(timing_config)
+            except ValueError:
+                timing_config = None
+        config = {key: value for key, value in (timing_config or {}).items() if key in TIMING_KEYS}
+        return TimetableOptimizer(**config).slot_grid
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def num_cells(self):
+        return self.num_days * len(self.slots)
+
+    def ordinal(self, time_slot):
+        """Ordinal of a period, or None if the slot is not part of this grid"""
+        return self.index.get(time_slot)
+
+    def cell(self, day_of_week, time_slot):
+        """Week-wide index of a (day, period) cell, or None for an unknown slot or day"""
+        ordinal = self.index.get(time_slot)
+        if ordinal is None or not 0 <= day_of_week < self.num_days:
+            return None
+        return day_of_week * len(self.slots) + ordinal
+
+    def block_bits(self, day_of_week, block_slots):
+        """Mask of a consecutive block's cells, or None if the block is not a run of this grid"""
+        start = self.cell(day_of_week, block_slots[0])
+        if start is None:
+            return None
+        ordinal = self.index[block_slots[0]]
+        size = len(block_slots)
+        if self.run_length[ordinal] < size or self.slots[ordinal + size - 1] != block_slots[-1]:
+            return None
+        return ((1 << size) - 1) << start
+
+    def start_mask(self, block_size, start_slots=None):
+        """
+        Mask of every cell of the week where a block of block_size can start
+        without crossing a break or the end of the day, optionally limited to
+        start_slots. Cached per (block_size, start_slots).
+        """
+        key = (block_size, tuple(start_slots) if start_slots is not None else None)
+        mask = self._start_masks.get(key)
+        if mask is None:
+            allowed = set(start_slots) if start_slots is not None else None
+            day_mask = 0
+            for ordinal, time_slot in enumerate(self.slots):
+                if self.run_length[ordinal] >= block_size and (allowed is None or time_slot in allowed):
+                    day_mask |= 1 << ordinal
+            mask = 0
+            for day_of_week in range(self.num_days):
+                mask |= day_mask << (day_of_week * len(self.slots))
+            self._start_masks[key] = mask
+        return mask
+
+    def block_starts(self, free_mask, block_size, start_slots=None):
+        """
+        Mask of the cells where a whole block fits into free_mask: a start bit
+        survives only if the next block_size - 1 cells are free too. One shift
+        and AND per period covers every day of the week at once.
+        """
+        starts = self.start_mask(block_size, start_slots) & free_mask
+        for offset in range(1, block_size):
+            starts &= free_mask >> offset
+        return starts
+
+    def blocks(self, start_mask, block_size):
+        """Yield (day_of_week, block slot strings) for each start bit of a mask, in cell order"""
+        period_count = len(self.slots)
+        while start_mask:
+            lowest = start_mask & -start_mask
+            day_of_week, ordinal = divmod(lowest.bit_length() - 1, period_count)
+            yield day_of_week, tuple(self.slots[ordinal:ordinal + block_size])
+            start_mask ^= lowest
+
+    def consecutive_ordinals(self, start_ordinal, block_size):
+        """range of block_size back-to-back ordinals from start_ordinal, or None if they cross a break or the day's end"""
+        if self.run_length[start_ordinal] < block_size:
+            return None
+        return range(start_ordinal, start_ordinal + block_size)
+
+    def consecutive(self, start_slot, block_size):
+        """Same contract as TimetableOptimizer.get_consecutive_slots: the slot strings, or [] if impossible"""
+        start_ordinal = self.index.get(start_slot)
+        if start_ordinal is None or self.run_length[start_ordinal] < block_size:
+            return []
+        return self.slots[start_ordinal:start_ordinal + block_size]
+
+    def slot_rows(self, timetable_id):
+        """timetable_slots rows describing this grid for one timetable"""
+        return [{'timetable_id': timetable_id, 'ordinal': ordinal, 'time_slot': time_slot}
+                for ordinal, time_slot in enumerate(self.slots)]
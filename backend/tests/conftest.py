@@ -0,0 +1,93 @@
+"""
+Shared test fixtures: the Flask app on a throwaway SQLite database, a small
+seeded college, a logged-in test client and a disposable worker pool
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix='timetable-tests-')
+DATABASE_URL = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+# DATABASE_URL keeps app.py away from the local MySQL database
+os.environ['DATABASE_URL'] = DATABASE_URL
+os.environ['PDF_CACHE_DIR'] = os.path.join(TEST_DIR, 'pdf_cache')
+
+from app import app as flask_app, pdf_cache
+from models import db, User, Subject, Faculty, Classroom, Batch, FacultySubject
+from process_pool import get_process_pool, reset_process_pool
+
+# app.py sets PostgreSQL engine options (sslmode, pool size) whenever DATABASE_URL
+# is present, which SQLite rejects, so the app gets a plain SQLite engine instead
+with flask_app.app_context():
+    db.engine.dispose()
+db._app_engines[flask_app][None] = create_engine(DATABASE_URL)
+
+
+def seed_college(num_batches=2, num_subjects=7, num_faculty=8, num_classrooms=10):
+    """
+    One user (id 1) owning num_batches batches of semester 3, num_subjects
+    subjects (subject 1 is a lab), num_faculty faculty members with two
+    teachers per subject, and num_classrooms rooms of which every fourth is a lab.
+    Ids are assigned in creation order starting at 1.
+    """
+    db.session.add(User(username='tester', password_hash='x'))
+    for index in range(num_batches):
+        section = chr(ord('A') + index)
+        db.session.add(Batch(name=f'CSE-{section}-2025', department='CSE', branch='CSE', section=section,
+                             semester=3, student_count=55, created_by=1))
+    for index in range(num_classrooms):
+        db.session.add(Classroom(name=f'R{index + 1}', capacity=60 + 5 * (index % 3),
+                                 type='lab' if index % 4 == 0 else 'regular',
+                                 priority_level=1 + index % 3, created_by=1))
+    for index in range(num_faculty):
+        db.session.add(Faculty(name=f'F{index + 1}', email=f'f{index + 1}@college.test', department='CSE', created_by=1))
+    db.session.flush()
+    for index in range(num_subjects):
+        is_lab = index == 0
+        db.session.add(Subject(name=f'S{index + 1}', code=f'C{index + 1}', department='CSE', semester=3,
+                               hours_per_week=3 if is_lab else 4, requires_lab=is_lab,
+                               scheduling_preference='single', created_by=1))
+    db.session.flush()
+    for index in range(num_subjects):
+        for offset in range(2):
+            db.session.add(FacultySubject(faculty_id=1 + (index + offset) % num_faculty, subject_id=index + 1,
+                                          department='CSE', branch='CSE', semester=3))
+    db.session.commit()
+
+
+@pytest.fixture
+def app():
+    """App context over a freshly created and seeded database"""
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_college()
+        shutil.rmtree(pdf_cache.directory, ignore_errors=True)
+        os.makedirs(pdf_cache.directory)
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as the seeded user"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
+
+
+@pytest.fixture
+def fresh_pool():
+    """The shared process pool, replaced after the test so a pool it broke is not reused"""
+    pool = get_process_pool()
+    yield pool
+    reset_process_pool(get_process_pool())
@@ -0,0 +1,52 @@
+"""Bulk classroom allocation through /api/classroom-allocations/bulk"""
+
+from models import db, Timetable, TimetableEntry
+
+
+def make_timetable():
+    timetable = Timetable(name='CSE-A', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.commit()
+    return timetable.id
+
+
+def request_cell(day_of_week, time_slot, batch_id=1, subject_id=2, faculty_id=2):
+    return {'batch_id': batch_id, 'subject_id': subject_id, 'faculty_id': faculty_id,
+            'day_of_week': day_of_week, 'time_slot': time_slot}
+
+
+def allocate(client, timetable_id, entries):
+    return client.post('/api/classroom-allocations/bulk', json={'timetable_id': timetable_id, 'entries': entries})
+
+
+def test_bulk_allocation_gives_distinct_rooms(client):
+    timetable_id = make_timetable()
+    response = allocate(client, timetable_id, [request_cell(0, '09:00-09:45', batch_id=1),
+                                               request_cell(0, '09:00-09:45', batch_id=2)])
+    body = response.get_json()
+    assert response.status_code == 200 and body['allocated_count'] == 2
+    rooms = [allocation['classroom_id'] for allocation in body['allocations']]
+    assert len(set(rooms)) == 2
+    assert TimetableEntry.query.filter_by(timetable_id=timetable_id).count() == 2
+
+
+def test_same_cell_twice_in_one_request(client):
+    timetable_id = make_timetable()
+    response = allocate(client, timetable_id, [request_cell(1, '09:45-10:30'), request_cell(1, '09:45-10:30', subject_id=3)])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['allocated_count'] == 1 and body['unallocated_count'] == 1
+    assert body['allocations'][1] is None
+    assert TimetableEntry.query.filter_by(timetable_id=timetable_id).count() == 1
+
+
+def test_cell_the_batch_already_occupies(client):
+    timetable_id = make_timetable()
+    assert allocate(client, timetable_id, [request_cell(2, '10:30-11:15')]).status_code == 200
+
+    response = allocate(client, timetable_id, [request_cell(2, '10:30-11:15', subject_id=4),
+                                               request_cell(2, '11:15-12:00', subject_id=4)])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['allocations'][0] is None and body['allocations'][1] is not None
+    assert TimetableEntry.query.filter_by(timetable_id=timetable_id).count() == 2
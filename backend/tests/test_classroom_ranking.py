@@ -0,0 +1,67 @@
+"""Vectorized classroom ranking against the per-room path used without NumPy"""
+
+import pytest
+
+from classroom_allocator import SmartClassroomAllocator, ClassroomArrays
+from models import db, Batch, Classroom, Subject, Timetable, TimetableEntry
+
+SLOTS = [(0, '09:00-09:45'), (0, '09:45-10:30'), (2, '13:30-14:15')]
+
+
+@pytest.fixture
+def rooms(app):
+    """Fixed, shareable, unshareable and occupied rooms on top of the seeded ones"""
+    Batch.query.get(1).priority_for_allocation = 1
+    Batch.query.get(2).student_count = 70
+    db.session.add_all([
+        Classroom(name='Own', capacity=60, type='regular', priority_level=2, created_by=1,
+                  is_fixed_allocation=True, fixed_batch_id=1),
+        Classroom(name='Shared', capacity=70, type='regular', priority_level=1, created_by=1,
+                  is_fixed_allocation=True, fixed_batch_id=2, can_be_shared=True),
+        Classroom(name='Private', capacity=70, type='regular', priority_level=1, created_by=1,
+                  is_fixed_allocation=True, fixed_batch_id=2, can_be_shared=False),
+        Classroom(name='Small', capacity=30, type='regular', priority_level=1, created_by=1)
+    ])
+    timetable = Timetable(name='CSE', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.flush()
+    # Batch 2 is in a lab (subject 1) in room 1 at the first slot, which frees its fixed room for borrowing;
+    # batch 1 already holds room 2 and batch 2 holds room 3 at the second slot
+    for batch_id, subject_id, classroom_id, (day_of_week, time_slot) in (
+            (2, 1, 1, SLOTS[0]), (1, 2, 2, SLOTS[1]), (2, 3, 3, SLOTS[1])):
+        db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=batch_id, subject_id=subject_id,
+                                      faculty_id=1, classroom_id=classroom_id,
+                                      day_of_week=day_of_week, time_slot=time_slot))
+    db.session.commit()
+
+
+def summary(ranked):
+    return [(room['classroom'].id, room['priority_score'], room['allocation_type'],
+             room['can_borrow'], room['original_owner']) for room in ranked]
+
+
+@pytest.mark.parametrize('batch_id', [1, 2])
+@pytest.mark.parametrize('subject_id', [None, 1, 2])
+@pytest.mark.parametrize('slot', SLOTS)
+def test_vectorized_ranking_matches_per_room(rooms, batch_id, subject_id, slot):
+    allocator = SmartClassroomAllocator()
+    classrooms = Classroom.query.all()
+    batch = Batch.query.get(batch_id)
+    subject = Subject.query.get(subject_id) if subject_id else None
+
+    per_room = allocator.rank_classrooms(classrooms, batch, subject, *slot)
+    vectorized = allocator.rank_classrooms(classrooms, batch, subject, *slot, arrays=ClassroomArrays(classrooms))
+    assert summary(vectorized) == summary(per_room)
+
+
+def test_fixture_covers_every_allocation_type(rooms):
+    allocator = SmartClassroomAllocator()
+    classrooms = Classroom.query.all()
+    types = set()
+    for slot in SLOTS:
+        for batch in Batch.query.all():
+            types.update(room['allocation_type'] for room in allocator.rank_classrooms(classrooms, batch, None, *slot))
+    assert {'regular_available', 'fixed_own', 'temporary_borrow', 'own_existing'} <= types
+    # Occupied and unshareable rooms never show up as available
+    first_slot = {room['classroom'].name for room in allocator.rank_classrooms(classrooms, Batch.query.get(1), None, *SLOTS[0])}
+    assert 'Private' not in first_slot and 'R1' not in first_slot and 'Shared' in first_slot
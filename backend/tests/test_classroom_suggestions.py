@@ -0,0 +1,63 @@
+"""Keyset-paged room suggestions from /api/classroom-allocations/optimize"""
+
+import pytest
+
+from classroom_allocator import SmartClassroomAllocator
+from models import db, Classroom, Timetable, TimetableEntry
+
+
+@pytest.fixture
+def crowded_timetable(app):
+    """Entries on a room too small and poorly rated for the batch, so most get a suggestion"""
+    cramped = Classroom(name='Cramped', capacity=20, type='regular', priority_level=1, created_by=1)
+    db.session.add(cramped)
+    timetable = Timetable(name='CSE-A', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.flush()
+    for day_of_week in range(6):
+        for time_slot in ('09:00-09:45', '09:45-10:30', '10:30-11:15'):
+            for batch_id in (1, 2):
+                db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=batch_id, subject_id=2,
+                                              faculty_id=batch_id, classroom_id=cramped.id,
+                                              day_of_week=day_of_week, time_slot=time_slot))
+    db.session.commit()
+    return timetable.id
+
+
+def suggestion_ids(suggestions):
+    return [suggestion['entry'].id for suggestion in suggestions]
+
+
+def test_chunked_stream_matches_single_pass(crowded_timetable):
+    everything = suggestion_ids(SmartClassroomAllocator().iter_classroom_suggestions(chunk_size=1000))
+    assert len(everything) > 10
+    assert suggestion_ids(SmartClassroomAllocator().iter_classroom_suggestions(chunk_size=4)) == everything
+
+
+def test_resume_after_key_skips_earlier_entries(crowded_timetable):
+    allocator = SmartClassroomAllocator()
+    everything = list(allocator.iter_classroom_suggestions())
+    middle = everything[len(everything) // 2]['entry']
+    resumed = SmartClassroomAllocator().iter_classroom_suggestions(
+        chunk_size=5, after=(middle.day_of_week, middle.time_slot, middle.id))
+    assert suggestion_ids(resumed) == suggestion_ids(everything)[len(everything) // 2 + 1:]
+
+
+def test_cursor_pages_cover_every_suggestion_once(client, crowded_timetable):
+    expected = suggestion_ids(SmartClassroomAllocator().iter_classroom_suggestions())
+    seen = []
+    cursor = None
+    while True:
+        body = client.post('/api/classroom-allocations/optimize', json={'per_page': 5, 'cursor': cursor}).get_json()
+        assert body['success']
+        seen.extend(suggestion['timetable_entry_id'] for suggestion in body['suggestions'])
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            break
+        cursor = body['next_cursor']
+    assert seen == expected
+
+
+def test_invalid_cursor_is_rejected(client, crowded_timetable):
+    response = client.post('/api/classroom-allocations/optimize', json={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+"""Classroom utilization report against usage counted by hand"""
+
+import json
+
+import pytest
+
+from classroom_allocator import SmartClassroomAllocator
+from models import db, Batch, Timetable, TimetableEntry
+
+S0, S1, S2 = '09:00-09:45', '09:45-10:30', '10:30-11:15'
+
+
+@pytest.fixture
+def usage(app):
+    """
+    A CSE timetable for 2025-26 on the default timing (6 days x 8 periods) and
+    an ECE timetable for 2024-25 ending at 13:00 (6 days x 4 periods).
+    Room 1 holds 4 classes (2 temporary), room 2 holds 1 and room 3 holds 2.
+    """
+    db.session.add(Batch(name='ECE-A-2024', department='ECE', branch='ECE', section='A',
+                         semester=5, student_count=50, created_by=1))
+    cse = Timetable(name='CSE', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    ece = Timetable(name='ECE', batch_id=3, academic_year='2024-25', semester=5, created_by=1,
+                    timing_config=json.dumps({'college_end_time': '13:00'}))
+    db.session.add_all([cse, ece])
+    db.session.flush()
+    for timetable, classroom_id, day_of_week, time_slot, temporary in (
+            (cse, 1, 0, S0, False), (cse, 1, 0, S1, False), (cse, 1, 1, S0, True), (cse, 2, 2, S0, False),
+            (ece, 1, 0, S2, True), (ece, 3, 0, S0, False), (ece, 3, 3, S1, False)):
+        db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=timetable.batch_id, subject_id=2,
+                                      faculty_id=1, classroom_id=classroom_id, day_of_week=day_of_week,
+                                      time_slot=time_slot, is_temporary_allocation=temporary))
+    db.session.commit()
+
+
+def by_room(report):
+    """{classroom id: (used, temporary, fixed, max possible, utilization %, sharing %)}"""
+    return {row['classroom'].id: (row['total_slots_used'], row['temporary_allocations'], row['fixed_allocations'],
+                                  row['max_possible_slots'], row['utilization_percentage'], row['sharing_efficiency'])
+            for row in report}
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({}, {1: (4, 2, 2, 48, 8.33, 50.0), 2: (1, 0, 1, 48, 2.08, 0), 3: (2, 0, 2, 48, 4.17, 0)}),
+    ({'day_of_week': 0}, {1: (3, 1, 2, 8, 37.5, 33.33), 2: (0, 0, 0, 8, 0, 0), 3: (1, 0, 1, 8, 12.5, 0)}),
+    ({'department': 'ECE'}, {1: (1, 1, 0, 24, 4.17, 100.0), 2: (0, 0, 0, 24, 0, 0), 3: (2, 0, 2, 24, 8.33, 0)}),
+    ({'academic_year': '2025-26'}, {1: (3, 1, 2, 48, 6.25, 33.33), 2: (1, 0, 1, 48, 2.08, 0), 3: (0, 0, 0, 48, 0, 0)}),
+    ({'day_of_week': 0, 'department': 'ECE'}, {1: (1, 1, 0, 4, 25.0, 100.0), 2: (0, 0, 0, 4, 0, 0), 3: (1, 0, 1, 4, 25.0, 0)}),
+])
+def test_utilization_matches_hand_counts(usage, filters, expected):
+    report = by_room(SmartClassroomAllocator().get_classroom_utilization_report(**filters))
+    assert len(report) == 10
+    for classroom_id, row in report.items():
+        assert row == expected.get(classroom_id, (0, 0, 0, row[3], 0, 0))
+        assert row[3] == expected[1][3]
+
+
+def test_day_filter_counts_each_room_only_on_that_day(usage):
+    allocator = SmartClassroomAllocator()
+    weekly = by_room(allocator.get_classroom_utilization_report())
+    daily = [by_room(allocator.get_classroom_utilization_report(day_of_week=day)) for day in range(6)]
+    for classroom_id, row in weekly.items():
+        assert sum(day[classroom_id][0] for day in daily) == row[0]
+        assert sum(day[classroom_id][1] for day in daily) == row[1]
@@ -0,0 +1,83 @@
+"""ConstraintSolver placements against faculty, room and batch occupancy"""
+
+from collections import Counter
+
+from constraint_solver import ConstraintSolver
+from timetable_optimizer import TimetableOptimizer, ScheduleOccupancy
+
+
+def expected_periods(optimizer, batch_id, semester=3):
+    return sum(sum(optimizer.calculate_subject_blocks(subject))
+               for subject in optimizer.get_batch_subjects(batch_id, semester))
+
+
+def assert_no_double_booking(entries):
+    for field in ('faculty_id', 'classroom_id', 'batch_id'):
+        cells = Counter((entry['day_of_week'], entry['time_slot'], entry[field]) for entry in entries)
+        assert max(cells.values()) == 1, f"{field} booked twice in one slot"
+
+
+def test_solver_places_every_block_without_clashes(app):
+    optimizer = TimetableOptimizer(seed=1)
+    occupancy = ScheduleOccupancy(grid=optimizer.slot_grid)
+    schedule = ConstraintSolver(optimizer).solve(1, 3, occupancy, order_seed=1)
+
+    assert len(schedule) == expected_periods(optimizer, 1)
+    assert_no_double_booking(schedule)
+    assert all(entry['time_slot'] not in optimizer.break_slots for entry in schedule)
+    per_day = Counter(entry['day_of_week'] for entry in schedule)
+    assert max(per_day.values()) <= optimizer.max_classes_per_day
+
+
+def test_solver_respects_existing_occupancy(app):
+    optimizer = TimetableOptimizer(seed=2)
+    occupancy = ScheduleOccupancy(grid=optimizer.slot_grid)
+
+    # Faculty 1 is away on Monday, room 2 is booked all week, batch 1 is out on Tuesday morning
+    blocked = []
+    for time_slot in optimizer.time_slots:
+        blocked.append({'day_of_week': 0, 'time_slot': time_slot, 'faculty_id': 1, 'classroom_id': 99, 'batch_id': 99})
+        for day_idx in range(len(optimizer.days)):
+            blocked.append({'day_of_week': day_idx, 'time_slot': time_slot, 'faculty_id': 98, 'classroom_id': 2, 'batch_id': 98})
+    for time_slot in optimizer.time_slots[:3]:
+        blocked.append({'day_of_week': 1, 'time_slot': time_slot, 'faculty_id': 97, 'classroom_id': 97, 'batch_id': 1})
+    for entry in blocked:
+        occupancy.add(entry)
+
+    other_batch = ConstraintSolver(optimizer).solve(2, 3, occupancy, order_seed=2)
+    schedule = ConstraintSolver(optimizer).solve(1, 3, occupancy, order_seed=3)
+
+    assert schedule
+    assert_no_double_booking(other_batch + blocked + schedule)
+    assert not [entry for entry in schedule if entry['faculty_id'] == 1 and entry['day_of_week'] == 0]
+    assert not [entry for entry in schedule if entry['classroom_id'] == 2]
+    assert not [entry for entry in schedule
+                if entry['day_of_week'] == 1 and entry['time_slot'] in optimizer.time_slots[:3]]
+
+
+def test_solver_leaves_placements_in_occupancy(app):
+    optimizer = TimetableOptimizer(seed=4)
+    occupancy = ScheduleOccupancy(grid=optimizer.slot_grid)
+    schedule = ConstraintSolver(optimizer).solve(1, 3, occupancy, order_seed=4)
+
+    for entry in schedule:
+        assert not occupancy.is_free(entry['day_of_week'], entry['time_slot'], entry['faculty_id'], None)
+        assert not occupancy.is_free(entry['day_of_week'], entry['time_slot'], None, entry['classroom_id'])
+        assert not occupancy.is_free(entry['day_of_week'], entry['time_slot'], None, None, 1)
+
+
+def test_mask_domain_matches_slot_by_slot_check(app):
+    optimizer = TimetableOptimizer(include_short_break=True, seed=5)
+    occupancy = ScheduleOccupancy(grid=optimizer.slot_grid)
+    unindexed = ScheduleOccupancy()
+    for entry in ConstraintSolver(optimizer).solve(2, 3, ScheduleOccupancy(grid=optimizer.slot_grid), order_seed=5):
+        entry = dict(entry, batch_id=1)
+        occupancy.add(entry)
+        unindexed.add(entry)
+
+    solver = ConstraintSolver(optimizer)
+    solver.batch_id = 1
+    for variable in solver.build_variables(1, 3):
+        expected = {day_idx: [value for value in values if unindexed.is_block_free(value[0], value[1], value[2], value[3], 1)]
+                    for day_idx, values in solver.initial_domain(variable).items()}
+        assert solver.feasible_domain(variable, occupancy) == expected
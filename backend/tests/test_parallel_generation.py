@@ -0,0 +1,32 @@
+"""Parallel option generation and recovery from a dead pool worker"""
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from process_pool import get_process_pool
+from timetable_optimizer import TimetableOptimizer
+
+
+def schedules(options):
+    return [(option['option_id'], option['schedule']) for option in options]
+
+
+def test_parallel_options_match_sequential(app, fresh_pool):
+    sequential = TimetableOptimizer(seed=11).generate_optimized_timetables(1, 3, num_options=2, engine='csp')
+    parallel = TimetableOptimizer(seed=11).generate_optimized_timetables(1, 3, num_options=2, engine='csp', parallel=True)
+    assert schedules(parallel) == schedules(sequential)
+
+
+def test_broken_pool_falls_back_and_is_replaced(app, fresh_pool):
+    # A worker killed from outside (e.g. by the OOM killer) breaks the pool
+    with pytest.raises(BrokenProcessPool):
+        fresh_pool.submit(os._exit, 1).result(timeout=60)
+
+    options = TimetableOptimizer(seed=12).generate_optimized_timetables(1, 3, num_options=2, parallel=True)
+    assert len(options) == 2
+
+    replacement = get_process_pool()
+    assert replacement is not fresh_pool
+    assert replacement.submit(abs, -3).result(timeout=60) == 3
@@ -0,0 +1,101 @@
+"""Rendered PDF cache: content-hash keys, LRU eviction and failed renders"""
+
+import os
+
+import pytest
+
+import app as app_module
+from models import db, Timetable, TimetableEntry
+from pdf_cache import PdfCache
+from timetable_pdf import load_timetable_pdf_data, pdf_content_hash
+
+
+def make_timetable():
+    timetable = Timetable(name='CSE-A', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.flush()
+    for day_of_week, time_slot in ((0, '09:00-09:45'), (1, '09:45-10:30')):
+        db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=1, subject_id=2, faculty_id=1,
+                                      classroom_id=2, day_of_week=day_of_week, time_slot=time_slot))
+    db.session.commit()
+    return timetable.id
+
+
+def digest_of(timetable_id):
+    return pdf_content_hash(load_timetable_pdf_data([timetable_id])[timetable_id])
+
+
+def cached_files(directory):
+    return sorted(os.listdir(directory))
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Timetable data the download endpoint passed to the renderer, in call order"""
+    calls = []
+    render = app_module.render_timetable_pdf
+
+    def counting_render(data, output):
+        calls.append(data)
+        render(data, output)
+
+    monkeypatch.setattr(app_module, 'render_timetable_pdf', counting_render)
+    return calls
+
+
+def test_changed_entry_gets_a_new_digest_and_is_rendered_again(client, renders):
+    timetable_id = make_timetable()
+    url = f'/api/download-timetable-pdf/{timetable_id}'
+    first = client.get(url)
+    assert first.status_code == 200 and first.data.startswith(b'%PDF')
+    assert client.get(url).data == first.data
+    assert len(renders) == 1
+
+    old_digest = digest_of(timetable_id)
+    # Edited behind the API's back, so only the content hash can notice
+    entry = TimetableEntry.query.filter_by(timetable_id=timetable_id).first()
+    entry.subject_id = 3
+    db.session.commit()
+    new_digest = digest_of(timetable_id)
+    assert new_digest != old_digest
+
+    assert client.get(url).data.startswith(b'%PDF')
+    assert len(renders) == 2
+    # The new version replaces the old one on disk
+    assert cached_files(app_module.pdf_cache.directory) == [f'{timetable_id}-{new_digest}.pdf']
+
+
+def test_eviction_removes_the_least_recently_used(tmp_path):
+    cache = PdfCache(str(tmp_path), max_entries=2)
+    for timetable_id in (1, 2):
+        cache.store(timetable_id, 'a', lambda output: output.write(b'%PDF')).close()
+    os.utime(cache.path_for(1, 'a'), (1000, 1000))
+    os.utime(cache.path_for(2, 'a'), (2000, 2000))
+    # Reading timetable 1 makes timetable 2 the oldest
+    cache.get(1, 'a').close()
+
+    cache.store(3, 'a', lambda output: output.write(b'%PDF')).close()
+    assert cached_files(tmp_path) == ['1-a.pdf', '3-a.pdf']
+
+
+def test_failed_render_leaves_no_temporary_file(tmp_path):
+    cache = PdfCache(str(tmp_path))
+
+    def failing_render(output):
+        output.write(b'%PDF partial')
+        raise ValueError('render failed')
+
+    with pytest.raises(ValueError):
+        cache.store(1, 'a', failing_render)
+    assert cached_files(tmp_path) == []
+    assert cache.get(1, 'a') is None
+
+
+def test_invalidate_keeps_only_the_given_version(tmp_path):
+    cache = PdfCache(str(tmp_path))
+    # Written directly, as commit would already drop the other version of timetable 1
+    for timetable_id, digest in ((1, 'a'), (1, 'b'), (12, 'a')):
+        with open(cache.path_for(timetable_id, digest), 'wb') as output:
+            output.write(b'%PDF')
+    cache.invalidate(1, keep=cache.path_for(1, 'b'))
+    assert cached_files(tmp_path) == ['1-b.pdf', '12-a.pdf']
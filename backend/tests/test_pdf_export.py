@@ -0,0 +1,83 @@
+"""Bulk timetable PDF export through /api/download-timetables-pdf/bulk"""
+
+import io
+import os
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from models import db, User, Timetable, TimetableEntry
+from process_pool import get_process_pool
+
+BULK_URL = '/api/download-timetables-pdf/bulk?department=CSE'
+
+
+def make_timetables(count):
+    """count timetables alternating between the two seeded batches, each with a few classes"""
+    timetable_ids = []
+    for index in range(count):
+        batch_id = 1 + index % 2
+        timetable = Timetable(name=f'Option {index + 1}', batch_id=batch_id, academic_year='2025-26', semester=3, created_by=1)
+        db.session.add(timetable)
+        db.session.flush()
+        for day_of_week, time_slot in ((0, '09:00-09:45'), (1, '09:45-10:30'), (2, '10:30-11:15')):
+            db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=batch_id, subject_id=2 + index % 5,
+                                          faculty_id=1 + index % 8, classroom_id=2, day_of_week=day_of_week,
+                                          time_slot=time_slot))
+        timetable_ids.append(timetable.id)
+    db.session.commit()
+    return timetable_ids
+
+
+def export(client):
+    response = client.get(BULK_URL)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        names = archive.namelist()
+        assert all(archive.read(name).startswith(b'%PDF') for name in names)
+    return names
+
+
+def test_export_after_render_pool_broke(client, fresh_pool):
+    make_timetables(3)
+    with pytest.raises(BrokenProcessPool):
+        fresh_pool.submit(os._exit, 1).result(timeout=60)
+
+    assert len(export(client)) == 3
+    assert get_process_pool() is not fresh_pool
+
+
+def change_timetable(timetable_id):
+    """Edit one class so the timetable's PDF content, and so its cache key, changes"""
+    entry = TimetableEntry.query.filter_by(timetable_id=timetable_id).first()
+    entry.subject_id = 7 if entry.subject_id != 7 else 6
+    db.session.commit()
+
+
+@pytest.mark.parametrize('changed', [0, 1, 2, 3])
+def test_export_with_some_timetables_uncached(client, fresh_pool, changed):
+    timetable_ids = make_timetables(3)
+    first = export(client)
+    assert len(first) == 3
+
+    for timetable_id in timetable_ids[:changed]:
+        change_timetable(timetable_id)
+    assert sorted(export(client)) == sorted(first)
+
+
+def test_export_leaves_out_other_users_timetables(client):
+    timetable_ids = make_timetables(2)
+    db.session.add(User(username='other', password_hash='x'))
+    db.session.flush()
+    other = Timetable(name='Other', batch_id=1, academic_year='2025-26', semester=3, created_by=2)
+    db.session.add(other)
+    db.session.commit()
+
+    names = export(client)
+    assert sorted(name.split('_')[1] for name in names) == [str(timetable_id) for timetable_id in timetable_ids]
+
+
+def test_export_without_matches(client):
+    assert client.get(BULK_URL).status_code == 404
+    assert client.get('/api/download-timetables-pdf/bulk').status_code == 400
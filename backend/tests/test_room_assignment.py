@@ -0,0 +1,85 @@
+"""max_weight_assignment against brute force, and assign_classrooms_optimally end to end"""
+
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from classroom_allocator import SmartClassroomAllocator
+from models import db, Timetable, TimetableEntry
+from room_assignment import max_weight_assignment
+
+
+def brute_force(weights, allowed):
+    """Best (rows assigned, total weight) over every assignment of rows to distinct allowed columns"""
+    rows = len(weights)
+    columns = len(weights[0]) if rows else 0
+    best = (0, 0)
+    options = [[None] + [j for j in range(columns) if allowed[i][j]] for i in range(rows)]
+    for choice in itertools.product(*options):
+        chosen = [j for j in choice if j is not None]
+        if len(chosen) != len(set(chosen)):
+            continue
+        total = sum(weights[i][j] for i, j in enumerate(choice) if j is not None)
+        best = max(best, (len(chosen), total))
+    return best
+
+
+def evaluate(weights, allowed, assignment):
+    chosen = [j for j in assignment if j is not None]
+    assert len(chosen) == len(set(chosen)), "a column was used twice"
+    for i, j in enumerate(assignment):
+        if j is not None:
+            assert allowed[i][j], "a disallowed pair was used"
+    return len(chosen), sum(weights[i][j] for i, j in enumerate(assignment) if j is not None)
+
+
+@pytest.mark.parametrize('seed', range(150))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    rows = rng.randint(1, 5)
+    columns = rng.randint(1, 5)
+    weights = [[rng.randint(-20, 100) for _ in range(columns)] for _ in range(rows)]
+    allowed = [[rng.random() < 0.6 for _ in range(columns)] for _ in range(rows)]
+
+    assignment = max_weight_assignment(weights, allowed)
+    assert len(assignment) == rows
+    assert evaluate(weights, allowed, assignment) == brute_force(weights, allowed)
+
+
+def test_empty_and_fully_blocked():
+    assert max_weight_assignment([], []) == []
+    assert max_weight_assignment([[5, 7]], [[False, False]]) == [None]
+
+
+def test_prefers_more_assignments_over_weight():
+    # Row 0 alone would take column 0 for 100, but then row 1 gets nothing
+    weights = [[100, 1], [90, 0]]
+    allowed = [[True, True], [True, False]]
+    assert max_weight_assignment(weights, allowed) == [1, 0]
+
+
+def test_optimal_assignment_never_lowers_score_or_double_books(app):
+    timetable = Timetable(name='CSE-A', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.flush()
+    rng = random.Random(3)
+    for day_of_week in range(3):
+        for time_slot in ('09:00-09:45', '09:45-10:30'):
+            rooms = rng.sample(range(1, 11), 2)
+            for batch_id, classroom_id in zip((1, 2), rooms):
+                db.session.add(TimetableEntry(timetable_id=timetable.id, batch_id=batch_id, subject_id=2 + batch_id,
+                                              faculty_id=batch_id, classroom_id=classroom_id,
+                                              day_of_week=day_of_week, time_slot=time_slot))
+    db.session.commit()
+
+    allocator = SmartClassroomAllocator()
+    changes, before, after = allocator.assign_classrooms_optimally([timetable.id], apply=True)
+    assert after >= before
+
+    rooms = Counter((entry.day_of_week, entry.time_slot, entry.classroom_id) for entry in TimetableEntry.query.all())
+    assert max(rooms.values()) == 1
+    # Already optimal: a second pass finds nothing to change
+    changes, before_again, after_again = allocator.assign_classrooms_optimally([timetable.id])
+    assert not changes and before_again == after_again == after
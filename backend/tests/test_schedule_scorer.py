@@ -0,0 +1,79 @@
+"""IncrementalScorer kept in step with a full re-score under random moves"""
+
+import random
+from collections import defaultdict
+
+import pytest
+
+from schedule_scorer import IncrementalScorer
+from timetable_optimizer import TimetableOptimizer
+
+
+def full_score(schedule):
+    """evaluate_timetable as it was before incremental scoring, without the floor at zero"""
+    score = 100
+    daily_classes = defaultdict(int)
+    for entry in schedule:
+        if not entry.get('is_fixed', False):
+            daily_classes[entry['day_of_week']] += 1
+    if daily_classes:
+        avg_classes = sum(daily_classes.values()) / len(daily_classes)
+        for day_classes in daily_classes.values():
+            score -= abs(day_classes - avg_classes) * 2
+    faculty_workload = defaultdict(int)
+    for entry in schedule:
+        faculty_workload[entry['faculty_id']] += 1
+    for workload in faculty_workload.values():
+        if workload > 20:
+            score -= (workload - 20) * 5
+    classroom_usage = defaultdict(int)
+    for entry in schedule:
+        classroom_usage[entry['classroom_id']] += 1
+    if classroom_usage:
+        score += sum(classroom_usage.values()) / len(classroom_usage) * 2
+    return score
+
+
+def random_entry(rng):
+    # Few faculty ids so weekly loads cross the overload threshold
+    return {'day_of_week': rng.randrange(6), 'time_slot': f'p{rng.randrange(8)}',
+            'faculty_id': rng.randrange(3), 'classroom_id': rng.randrange(5),
+            'is_fixed': rng.random() < 0.1}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_score_matches_full_score_after_each_move(seed):
+    rng = random.Random(seed)
+    optimizer = TimetableOptimizer(seed=seed)
+    schedule = [random_entry(rng) for _ in range(60)]
+    scorer = IncrementalScorer(schedule)
+    assert scorer.raw_score() == pytest.approx(full_score(schedule))
+
+    for _ in range(400):
+        action = rng.random()
+        if action < 0.5 and schedule:
+            index = rng.randrange(len(schedule))
+            moved = dict(schedule[index])
+            field = rng.choice(['day_of_week', 'faculty_id', 'classroom_id'])
+            moved[field] = random_entry(rng)[field]
+            old_full = full_score(schedule)
+            before = scorer.raw_score()
+            scorer.move(schedule[index], moved)
+            schedule[index] = moved
+            # The delta local search accepts or rejects a move on
+            assert scorer.raw_score() - before == pytest.approx(full_score(schedule) - old_full)
+        elif action < 0.75 and schedule:
+            scorer.remove(schedule.pop(rng.randrange(len(schedule))))
+        else:
+            entry = random_entry(rng)
+            schedule.append(entry)
+            scorer.add(entry)
+
+        assert scorer.raw_score() == pytest.approx(full_score(schedule))
+        assert scorer.score() == pytest.approx(optimizer.evaluate_timetable(schedule))
+        assert scorer.score() == pytest.approx(max(0, full_score(schedule)))
+
+
+def test_empty_schedule_scores_baseline():
+    assert IncrementalScorer().score() == 100
+    assert IncrementalScorer([]).raw_score() == full_score([])
@@ -0,0 +1,134 @@
+"""Diff-based timetable edits: diff_timetable_entries, PUT /api/timetables/<id> and PATCH .../entries"""
+
+from models import db, User, Timetable, TimetableEntry
+from timetable_persistence import diff_timetable_entries
+
+
+def cell(day_of_week, time_slot, subject_id, faculty_id=1, classroom_id=2, batch_id=1):
+    return {'day_of_week': day_of_week, 'time_slot': time_slot, 'subject_id': subject_id,
+            'faculty_id': faculty_id, 'classroom_id': classroom_id, 'batch_id': batch_id}
+
+
+BASE = [cell(0, '09:00-09:45', 2), cell(0, '09:45-10:30', 3), cell(1, '09:00-09:45', 4)]
+
+
+def make_timetable(entries=BASE):
+    timetable = Timetable(name='CSE-A', batch_id=1, academic_year='2025-26', semester=3, created_by=1)
+    db.session.add(timetable)
+    db.session.flush()
+    for entry in entries:
+        db.session.add(TimetableEntry(timetable_id=timetable.id, **entry))
+    db.session.commit()
+    return timetable.id
+
+
+def stored_cells(timetable_id):
+    """{(day, time_slot, batch_id): (entry id, subject_id, classroom_id)}"""
+    return {(entry.day_of_week, entry.time_slot, entry.batch_id): (entry.id, entry.subject_id, entry.classroom_id)
+            for entry in TimetableEntry.query.filter_by(timetable_id=timetable_id)}
+
+
+def test_diff_pairs_cells_and_reports_only_changes():
+    stored = [dict(entry, id=index + 1) for index, entry in enumerate(BASE)]
+    rows = [cell(0, '09:00-09:45', 2), cell(0, '09:45-10:30', 5), cell(2, '11:15-12:00', 6)]
+    inserts, updates, deletes = diff_timetable_entries(stored, rows)
+    assert inserts == [rows[2]]
+    assert updates == [(2, rows[1])]
+    assert deletes == [3]
+
+
+def test_diff_removes_extra_rows_of_a_duplicated_cell():
+    # Rows saved before the per-cell unique constraint may share a cell
+    stored = [dict(cell(0, '09:00-09:45', 2), id=1), dict(cell(0, '09:00-09:45', 3), id=2)]
+    inserts, updates, deletes = diff_timetable_entries(stored, [cell(0, '09:00-09:45', 3)])
+    assert (inserts, updates, deletes) == ([], [(1, cell(0, '09:00-09:45', 3))], [2])
+
+
+def test_put_writes_only_changed_cells(client):
+    timetable_id = make_timetable()
+    before = stored_cells(timetable_id)
+    entries = [cell(0, '09:00-09:45', 2), cell(0, '09:45-10:30', 5, classroom_id=3), cell(3, '10:30-11:15', 6)]
+
+    body = client.put(f'/api/timetables/{timetable_id}', json={'entries': entries}).get_json()
+    assert body['success']
+    assert body['changes'] == {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1}
+
+    after = stored_cells(timetable_id)
+    assert set(after) == {(0, '09:00-09:45', 1), (0, '09:45-10:30', 1), (3, '10:30-11:15', 1)}
+    assert after[(0, '09:00-09:45', 1)] == before[(0, '09:00-09:45', 1)]
+    # An updated cell keeps its row
+    assert after[(0, '09:45-10:30', 1)] == (before[(0, '09:45-10:30', 1)][0], 5, 3)
+
+
+def test_put_with_same_entries_changes_nothing(client):
+    timetable_id = make_timetable()
+    before = stored_cells(timetable_id)
+    body = client.put(f'/api/timetables/{timetable_id}', json={'entries': BASE}).get_json()
+    assert body['changes'] == {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3}
+    assert stored_cells(timetable_id) == before
+
+
+def test_patch_moves_a_class(client):
+    timetable_id = make_timetable()
+    before = stored_cells(timetable_id)
+    body = client.patch(f'/api/timetables/{timetable_id}/entries', json=dict(
+        cell(4, '13:30-14:15', 4), **{'from': {'day_of_week': 1, 'time_slot': '09:00-09:45'}})).get_json()
+    assert body['success']
+    assert body['changes']['inserted'] == 1 and body['changes']['deleted'] == 1
+
+    after = stored_cells(timetable_id)
+    assert (1, '09:00-09:45', 1) not in after
+    assert after[(4, '13:30-14:15', 1)][1] == 4
+    # Cells outside the edit are untouched
+    assert after[(0, '09:00-09:45', 1)] == before[(0, '09:00-09:45', 1)]
+
+
+def test_patch_clears_a_cell(client):
+    timetable_id = make_timetable()
+    body = client.patch(f'/api/timetables/{timetable_id}/entries',
+                        json={'day_of_week': 0, 'time_slot': '09:45-10:30', 'clear': True}).get_json()
+    assert body['changes'] == {'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 0}
+    assert set(stored_cells(timetable_id)) == {(0, '09:00-09:45', 1), (1, '09:00-09:45', 1)}
+
+
+def test_put_rejects_two_entries_for_one_cell(client):
+    timetable_id = make_timetable()
+    before = stored_cells(timetable_id)
+    entries = BASE + [cell(1, '09:00-09:45', 5)]
+    response = client.put(f'/api/timetables/{timetable_id}', json={'entries': entries})
+    assert response.status_code == 400
+    assert 'already taken by entry 2' in response.get_json()['error']
+    assert stored_cells(timetable_id) == before
+
+
+def test_save_rejects_two_entries_for_one_cell(client):
+    entries = [{'day': 0, 'time_slot': '09:00-09:45', 'subject_id': 2, 'faculty_id': 1, 'classroom_id': 2},
+               {'day': 0, 'time_slot': '09:00-09:45', 'subject_id': 3, 'faculty_id': 2, 'classroom_id': 3}]
+    response = client.post('/api/save-timetable', json={'name': 'CSE-A', 'batch_id': 1, 'semester': 3,
+                                                         'academic_year': '2025-26', 'entries': entries})
+    assert response.status_code == 400
+    assert 'already taken' in response.get_json()['error']
+    assert Timetable.query.count() == 0
+
+
+def test_same_slot_for_different_batches_is_allowed(client):
+    entries = [{'day': 0, 'time_slot': '09:00-09:45', 'subject_id': 2, 'faculty_id': 1, 'classroom_id': 2, 'batch_id': 1},
+               {'day': 0, 'time_slot': '09:00-09:45', 'subject_id': 3, 'faculty_id': 2, 'classroom_id': 3, 'batch_id': 2}]
+    response = client.post('/api/save-timetable', json={'name': 'CSE', 'batch_id': 1, 'semester': 3,
+                                                         'academic_year': '2025-26', 'entries': entries})
+    assert response.status_code == 200 and response.get_json()['success']
+    assert TimetableEntry.query.count() == 2
+
+
+def test_patch_of_another_users_timetable_is_not_found(app, client):
+    timetable_id = make_timetable()
+    before = stored_cells(timetable_id)
+    db.session.add(User(username='other', password_hash='x'))
+    db.session.commit()
+    other = app.test_client()
+    with other.session_transaction() as session:
+        session['user_id'] = 2
+
+    response = other.patch(f'/api/timetables/{timetable_id}/entries', json=cell(4, '13:30-14:15', 4))
+    assert response.status_code == 404
+    assert stored_cells(timetable_id) == before
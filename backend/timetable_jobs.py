@@ -0,0 +1,123 @@
+"""
+Background Timetable Generation Jobs
+Runs the optimizer off the request thread with progress polling and cancellation
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+import traceback
+import uuid
+
+from timetable_optimizer import GenerationCancelled
+
+
+class TimetableJobManager:
+    """
+    In-process job store. Jobs live in memory on the worker that accepted
+    them, so no external queue or cache service is needed.
+    """
+
+    def __init__(self, max_workers=1, retention=timedelta(hours=1)):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='timetable-job')
+        self.retention = retention
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, app, owner_id, func, params):
+        """Queue func(params, progress_callback=..., cancel_event=...) inside an app context"""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'owner_id': owner_id,
+            'status': 'queued',
+            'created_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {
+                'options_total': params.get('num_options'),
+                'options_done': 0,
+                'blocks_placed': 0,
+                'blocks_total': 0,
+                'best_score': None
+            },
+            'result': None,
+            'error': None,
+            'cancel_event': threading.Event()
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        self.executor.submit(self._run, app, job, func, params)
+        return job_id
+
+    def get(self, job_id, owner_id=None):
+        """Return a job, optionally only if it belongs to owner_id"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job and owner_id is not None and job['owner_id'] != owner_id:
+            return None
+        return job
+
+    def cancel(self, job_id):
+        """Request cancellation; returns False if the job has already finished"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job['status'] not in ('queued', 'running'):
+                return False
+            job['cancel_event'].set()
+            return True
+
+    def describe(self, job):
+        """JSON-safe view of a job for status polling"""
+        with self.lock:
+            return {
+                'id': job['id'],
+                'status': job['status'],
+                'created_at': job['created_at'].isoformat(),
+                'started_at': job['started_at'].isoformat() if job['started_at'] else None,
+                'finished_at': job['finished_at'].isoformat() if job['finished_at'] else None,
+                'progress': dict(job['progress']),
+                'error': job['error']
+            }
+
+    def _run(self, app, job, func, params):
+        with self.lock:
+            if job['cancel_event'].is_set():
+                job['status'] = 'cancelled'
+                job['finished_at'] = datetime.utcnow()
+                return
+            job['status'] = 'running'
+            job['started_at'] = datetime.utcnow()
+
+        def progress_callback(**updates):
+            with self.lock:
+                best_score = updates.pop('best_score', None)
+                job['progress'].update(updates)
+                if best_score is not None and (job['progress']['best_score'] is None or best_score > job['progress']['best_score']):
+                    job['progress']['best_score'] = best_score
+
+        try:
+            with app.app_context():
+                result = func(params, progress_callback=progress_callback, cancel_event=job['cancel_event'])
+            status, error = 'completed', None
+        except GenerationCancelled:
+            result, status, error = None, 'cancelled', 'Job was cancelled'
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, 'failed', str(e)
+
+        with self.lock:
+            job['result'] = result
+            job['status'] = status
+            job['error'] = error
+            job['finished_at'] = datetime.utcnow()
+
+    def _prune(self):
+        """Drop finished jobs older than the retention window"""
+        cutoff = datetime.utcnow() - self.retention
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job['finished_at'] and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
@@ -1,12 +1,157 @@
-from models import db, Subject, Faculty, Classroom, Batch, FacultySubject
+from models import db, Subject, Faculty, Classroom, Batch, FacultySubject, Timetable, TimetableEntry
 from classroom_allocator import SmartClassroomAllocator
+from constraint_solver import ConstraintSolver
+from local_search import LocalSearchImprover
+from schedule_scorer import IncrementalScorer
+from scheduling_snapshot import load_scheduling_snapshot
+from slot_grid import SlotGrid
+from process_pool import get_process_pool, reset_process_pool
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
 import random
 from datetime import datetime, timedelta
 from collections import defaultdict
 import itertools
 
+
+class ScheduleOccupancy:
+    """
+    Index of a schedule for constant-time conflict checks. With a SlotGrid,
+    each faculty member, classroom and batch gets one integer bitmask over the
+    week's cells, so a whole block is checked with a single AND and every
+    feasible start of a block can be listed in one pass. Entries whose slot is
+    not on the grid (or every entry, without a grid) are keyed by (day, time_slot).
+    """
+
+    def __init__(self, entries=None, grid=None):
+        self.grid = grid
+        self.faculty_masks = defaultdict(int)
+        self.classroom_masks = defaultdict(int)
+        self.batch_masks = defaultdict(int)
+        self.faculty_by_slot = defaultdict(set)
+        self.classrooms_by_slot = defaultdict(set)
+        self.batches_by_slot = defaultdict(set)
+        self.faculty_daily_hours = defaultdict(int)   # (faculty_id, day) -> hours
+        self.faculty_weekly_hours = defaultdict(int)  # faculty_id -> hours
+        self.batch_daily_classes = defaultdict(int)   # (batch_id, day) -> classes
+        for entry in entries or []:
+            self.add(entry)
+
+    def _cell(self, day_idx, time_slot):
+        return self.grid.cell(day_idx, time_slot) if self.grid is not None else None
+
+    def add(self, entry):
+        """Record an entry (dict with day_of_week, time_slot, faculty_id, classroom_id, batch_id)"""
+        day = entry['day_of_week']
+        cell = self._cell(day, entry['time_slot'])
+        if cell is None:
+            slot_key = (day, entry['time_slot'])
+            self.faculty_by_slot[slot_key].add(entry['faculty_id'])
+            self.classrooms_by_slot[slot_key].add(entry['classroom_id'])
+            if entry.get('batch_id') is not None:
+                self.batches_by_slot[slot_key].add(entry['batch_id'])
+        else:
+            bit = 1 << cell
+            self.faculty_masks[entry['faculty_id']] |= bit
+            self.classroom_masks[entry['classroom_id']] |= bit
+            if entry.get('batch_id') is not None:
+                self.batch_masks[entry['batch_id']] |= bit
+        if entry.get('batch_id') is not None:
+            self.batch_daily_classes[(entry['batch_id'], day)] += 1
+        self.faculty_daily_hours[(entry['faculty_id'], day)] += 1
+        self.faculty_weekly_hours[entry['faculty_id']] += 1
+
+    def remove(self, entry):
+        """Forget an entry previously recorded with add()"""
+        day = entry['day_of_week']
+        cell = self._cell(day, entry['time_slot'])
+        if cell is None:
+            slot_key = (day, entry['time_slot'])
+            self.faculty_by_slot[slot_key].discard(entry['faculty_id'])
+            self.classrooms_by_slot[slot_key].discard(entry['classroom_id'])
+            if entry.get('batch_id') is not None:
+                self.batches_by_slot[slot_key].discard(entry['batch_id'])
+        else:
+            bit = 1 << cell
+            self.faculty_masks[entry['faculty_id']] &= ~bit
+            self.classroom_masks[entry['classroom_id']] &= ~bit
+            if entry.get('batch_id') is not None:
+                self.batch_masks[entry['batch_id']] &= ~bit
+        if entry.get('batch_id') is not None:
+            self.batch_daily_classes[(entry['batch_id'], day)] -= 1
+        self.faculty_daily_hours[(entry['faculty_id'], day)] -= 1
+        self.faculty_weekly_hours[entry['faculty_id']] -= 1
+
+    def busy_mask(self, faculty_id, classroom_id, batch_id=None):
+        """Cells where the faculty member, the classroom or (optionally) the batch is taken"""
+        mask = self.faculty_masks.get(faculty_id, 0) | self.classroom_masks.get(classroom_id, 0)
+        if batch_id is not None:
+            mask |= self.batch_masks.get(batch_id, 0)
+        return mask
+
+    def is_free(self, day_idx, time_slot, faculty_id, classroom_id, batch_id=None):
+        """Check that faculty, classroom and (optionally) batch are all free in a slot"""
+        cell = self._cell(day_idx, time_slot)
+        if cell is not None:
+            return not self.busy_mask(faculty_id, classroom_id, batch_id) >> cell & 1
+        slot_key = (day_idx, time_slot)
+        if faculty_id in self.faculty_by_slot.get(slot_key, ()):
+            return False
+        if classroom_id in self.classrooms_by_slot.get(slot_key, ()):
+            return False
+        if batch_id is not None and batch_id in self.batches_by_slot.get(slot_key, ()):
+            return False
+        return True
+
+    def is_block_free(self, day_idx, block_slots, faculty_id, classroom_id, batch_id=None):
+        """Check a run of consecutive slots; a single mask test when the run lies on the grid"""
+        bits = self.grid.block_bits(day_idx, block_slots) if self.grid is not None else None
+        if bits is None:
+            return all(self.is_free(day_idx, slot, faculty_id, classroom_id, batch_id) for slot in block_slots)
+        return not self.busy_mask(faculty_id, classroom_id, batch_id) & bits
+
+    def feasible_starts(self, block_size, faculty_id, classroom_id, batch_id=None, start_slots=None):
+        """
+        Mask of every cell where a block of block_size could start with the
+        faculty member, classroom and batch free for its whole length
+        (see SlotGrid.blocks to list them). Requires a grid.
+        """
+        free_mask = ~self.busy_mask(faculty_id, classroom_id, batch_id) & self.grid.week_mask
+        return self.grid.block_starts(free_mask, block_size, start_slots)
+
+    def faculty_workload(self, faculty_id, day_idx):
+        """Return (hours on day_idx, hours in the week) for a faculty member"""
+        return self.faculty_daily_hours.get((faculty_id, day_idx), 0), self.faculty_weekly_hours.get(faculty_id, 0)
+
+    def batch_classes_on_day(self, batch_id, day_idx):
+        """Number of classes a batch already has on a day"""
+        return self.batch_daily_classes.get((batch_id, day_idx), 0)
+
+
+class GenerationCancelled(Exception):
+    """Raised inside the optimizer when a running generation is cancelled"""
+
+
+def generate_option_from_snapshot(timing_config, snapshot, batch_id, semester, engine, seed, improve=False):
+    """Process-pool entry point: build and score one option without touching the database"""
+    optimizer = TimetableOptimizer(seed=seed, **timing_config)
+    optimizer.snapshot = snapshot
+    shift = optimizer.choose_shift()
+    if engine == 'csp':
+        schedule = ConstraintSolver(optimizer).solve(batch_id, semester, ScheduleOccupancy(grid=optimizer.slot_grid), order_seed=seed)
+    else:
+        schedule = optimizer.generate_single_timetable(batch_id, semester)
+    if improve and schedule:
+        schedule = optimizer.improve_timetable(schedule, batch_id)
+    return shift, schedule, optimizer.evaluate_timetable(schedule) if schedule else 0
+
+
 class TimetableOptimizer:
-    def __init__(self, include_short_break=False, short_break_duration=10, college_start_time='09:00', college_end_time='16:30', lunch_break_duration=60, lunch_break_start_time='12:15'):
+    # 'random' = randomized trial placement, 'csp' = constraint propagation with backtracking
+    ENGINES = ('random', 'csp')
+    SHIFTS = ('morning', 'afternoon')
+
+    def __init__(self, include_short_break=False, short_break_duration=10, college_start_time='09:00', college_end_time='16:30', lunch_break_duration=60, lunch_break_start_time='12:15', seed=None):
         # Generate dynamic time slots based on college timing
         self.college_start_time = college_start_time
         self.college_end_time = college_end_time
@@ -30,12 +175,36 @@ class TimetableOptimizer:
         
         self.days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
         self.max_classes_per_day = 6
+        
+        # Integer ordinals for the periods; consecutive-block checks use these
+        self.slot_grid = SlotGrid(self.time_slots, self.break_slots, len(self.days))
         self.include_short_break = include_short_break
         self.short_break_duration = short_break_duration
         
         # Initialize smart classroom allocator
         self.classroom_allocator = SmartClassroomAllocator()
         
+        # Every random choice goes through this generator, so the same seed reproduces a run
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.rng = random.Random(self.seed)
+        
+        # Preloaded SchedulingSnapshot; when set, lookups are served from memory instead of the database
+        self.snapshot = None
+        
+        # Optional hooks for background jobs: progress_callback(**fields) and a threading.Event to cancel
+        self.progress_callback = None
+        self.cancel_event = None
+        
+    def report_progress(self, **updates):
+        """Forward progress fields (blocks_placed, options_done, best_score, ...) to the callback"""
+        if self.progress_callback:
+            self.progress_callback(**updates)
+    
+    def check_cancelled(self):
+        """Abort generation if the owning job has been cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled()
+        
     
     def calculate_subject_blocks(self, subject):
         """Calculate how many blocks a subject needs based on scheduling preference and lab requirements"""
@@ -95,6 +264,9 @@ class TimetableOptimizer:
 
     def get_batch_subjects(self, batch_id, semester):
         """Get subjects for a specific batch and semester"""
+        if self.snapshot is not None:
+            return self.snapshot.batch_subjects(batch_id, semester)
+        
         try:
             # Get batch department first
             batch = Batch.query.get(batch_id)
@@ -134,6 +306,9 @@ class TimetableOptimizer:
     
     def get_available_faculty(self, subject_id, batch_id=None):
         """Get faculty members who can teach a specific subject, prioritizing by exact match"""
+        if self.snapshot is not None:
+            return self.snapshot.faculty_for_subject(subject_id, batch_id)
+        
         try:
             # Get the subject and batch information
             subject = Subject.query.get(subject_id)
@@ -270,6 +445,9 @@ class TimetableOptimizer:
     
     def get_available_classrooms(self, batch_id, requires_lab=False, day_of_week=None, time_slot=None, subject_id=None):
         """Get available classrooms for a batch using smart allocation"""
+        if self.snapshot is not None and (day_of_week is None or time_slot is None):
+            return self.snapshot.classrooms_for_batch(batch_id, requires_lab)
+        
         try:
             # Get batch info
             batch = Batch.query.get(batch_id)
@@ -332,10 +510,14 @@ class TimetableOptimizer:
         # This can be implemented later if needed
         return []
     
-    def can_schedule_block(self, day_idx, start_time_slot, faculty_id, classroom_id, existing_schedule, block_size):
-        """Check if a continuous block can be scheduled"""
+    def can_schedule_block(self, day_idx, start_time_slot, faculty_id, classroom_id, existing_schedule, block_size, batch_id=None):
+        """Check if a continuous block can be scheduled
+
+        existing_schedule may be a list of entries or a ScheduleOccupancy index.
+        """
+        occupancy = self._as_occupancy(existing_schedule)
         if block_size == 1:
-            return self.is_slot_available(day_idx, start_time_slot, faculty_id, classroom_id, existing_schedule)
+            return self.is_slot_available(day_idx, start_time_slot, faculty_id, classroom_id, occupancy, batch_id)
         
         # Special handling for lab sessions (4-period blocks, 180 mins)
         if block_size == 4 and start_time_slot in self.get_lab_start_times():
@@ -344,10 +526,7 @@ class TimetableOptimizer:
             if not consecutive_slots or len(consecutive_slots) != 4:
                 return False
                 
-            for slot in consecutive_slots:
-                if not self.is_slot_available(day_idx, slot, faculty_id, classroom_id, existing_schedule):
-                    return False
-            return True
+            return occupancy.is_block_free(day_idx, consecutive_slots, faculty_id, classroom_id, batch_id)
         
         # Get consecutive time slots for regular blocks
         consecutive_slots = self.get_consecutive_slots(start_time_slot, block_size)
@@ -355,93 +534,45 @@ class TimetableOptimizer:
             return False
         
         # Check if all slots in the block are available
-        for slot in consecutive_slots:
-            if not self.is_slot_available(day_idx, slot, faculty_id, classroom_id, existing_schedule):
-                return False
-        
-        return True
+        return occupancy.is_block_free(day_idx, consecutive_slots, faculty_id, classroom_id, batch_id)
     
     def get_consecutive_slots(self, start_slot, block_size):
         """Get consecutive time slots starting from start_slot"""
-        try:
-            start_idx = self.time_slots.index(start_slot)
-        except ValueError:
-            return []
-        
-        consecutive_slots = []
-        for i in range(block_size):
-            if start_idx + i >= len(self.time_slots):
-                return []  # Not enough consecutive slots available
-            
-            slot = self.time_slots[start_idx + i]
-            # Skip break slots
-            if slot in self.break_slots:
-                return []
-            
-            consecutive_slots.append(slot)
-        
-        return consecutive_slots
+        return self.slot_grid.consecutive(start_slot, block_size)
 
-    def is_slot_available(self, day_idx, time_slot, faculty_id, classroom_id, existing_schedule):
-        """Check if a time slot is available for faculty and classroom"""
-        slot_key = (day_idx, time_slot)
-        
-        # Check faculty availability
-        for entry in existing_schedule:
-            if (entry['day_of_week'] == day_idx and 
-                entry['time_slot'] == time_slot and 
-                entry['faculty_id'] == faculty_id):
-                return False
-        
-        # Check classroom availability
-        for entry in existing_schedule:
-            if (entry['day_of_week'] == day_idx and 
-                entry['time_slot'] == time_slot and 
-                entry['classroom_id'] == classroom_id):
-                return False
-        
-        return True
+    def _as_occupancy(self, existing_schedule):
+        """Return a ScheduleOccupancy for either an index or a plain list of entries"""
+        if isinstance(existing_schedule, ScheduleOccupancy):
+            return existing_schedule
+        return ScheduleOccupancy(existing_schedule, grid=self.slot_grid)
+
+    def is_slot_available(self, day_idx, time_slot, faculty_id, classroom_id, existing_schedule, batch_id=None):
+        """Check if a time slot is available for faculty, classroom and (optionally) batch"""
+        return self._as_occupancy(existing_schedule).is_free(day_idx, time_slot, faculty_id, classroom_id, batch_id)
     
     def calculate_faculty_workload(self, faculty_id, existing_schedule):
         """Calculate current workload for a faculty member"""
+        occupancy = self._as_occupancy(existing_schedule)
         daily_hours = defaultdict(int)
-        total_hours = 0
-        
-        for entry in existing_schedule:
-            if entry['faculty_id'] == faculty_id:
-                daily_hours[entry['day_of_week']] += 1
-                total_hours += 1
+        for day_idx in range(len(self.days)):
+            hours = occupancy.faculty_daily_hours.get((faculty_id, day_idx), 0)
+            if hours:
+                daily_hours[day_idx] = hours
         
-        return daily_hours, total_hours
+        return daily_hours, occupancy.faculty_weekly_hours.get(faculty_id, 0)
     
-    def assign_random_shift(self, batch_id):
-        """Assign a random shift to a batch during timetable generation"""
-        import random
-        shifts = ['morning', 'afternoon']
-        assigned_shift = random.choice(shifts)
-        
-        # Update the batch with the assigned shift
-        try:
-            from models import Batch
-            batch = Batch.query.get(batch_id)
-            if batch:
-                batch.shift = assigned_shift
-                from models import db
-                db.session.commit()
-                print(f"Assigned {assigned_shift} shift to batch {batch.name}")
-            return assigned_shift
-        except Exception as e:
-            print(f"Error assigning shift: {e}")
-            return 'morning'  # Default fallback
+    def choose_shift(self):
+        """Pick the shift for one option; it is only written to the batch when the timetable is saved"""
+        return self.rng.choice(self.SHIFTS)
     
-    def generate_single_timetable(self, batch_id, semester):
-        """Generate a single optimized timetable"""
+    def generate_single_timetable(self, batch_id, semester, occupancy=None):
+        """Generate a single optimized timetable
+
+        When an occupancy index is passed, placements respect the classes already
+        recorded in it and the new classes are added to it.
+        """
         print(f"Starting timetable generation for batch {batch_id}, semester {semester}")
         
-        # Assign random shift to batch
-        assigned_shift = self.assign_random_shift(batch_id)
-        print(f"Batch assigned to {assigned_shift} shift")
-        
         subjects = self.get_batch_subjects(batch_id, semester)
         print(f"Found {len(subjects)} subjects for this batch/semester")
         
@@ -453,12 +584,14 @@ class TimetableOptimizer:
         print(f"Found {len(fixed_slots)} fixed slots")
         
         schedule = []
+        if occupancy is None:
+            occupancy = ScheduleOccupancy(grid=self.slot_grid)
         
         # Add fixed slots first
         for slot in fixed_slots:
             if slot['batch_id'] == batch_id or slot['batch_id'] is None:
                 if slot['subject_id'] and slot['faculty_id'] and slot['classroom_id']:
-                    schedule.append({
+                    fixed_entry = {
                         'day_of_week': slot['day_of_week'],
                         'time_slot': slot['time_slot'],
                         'subject_id': slot['subject_id'],
@@ -466,7 +599,9 @@ class TimetableOptimizer:
                         'classroom_id': slot['classroom_id'],
                         'batch_id': batch_id,
                         'is_fixed': True
-                    })
+                    }
+                    schedule.append(fixed_entry)
+                    occupancy.add(fixed_entry)
         
         # Create a list of all required classes based on scheduling preferences
         required_classes = []
@@ -484,11 +619,14 @@ class TimetableOptimizer:
         print(f"Need to schedule {len(required_classes)} total classes")
         
         # Shuffle for randomization
-        random.shuffle(required_classes)
+        self.rng.shuffle(required_classes)
         
         scheduled_count = 0
+        placed_blocks = 0
+        self.report_progress(blocks_placed=0, blocks_total=len(required_classes))
         # Try to schedule each class
         for subject in required_classes:
+            self.check_cancelled()
             scheduled = False
             available_faculty = self.get_available_faculty(subject['id'], batch_id)
             available_classrooms = self.get_available_classrooms(batch_id, subject.get('requires_lab', False))
@@ -509,31 +647,29 @@ class TimetableOptimizer:
             max_attempts = 100
             
             while not scheduled and attempts < max_attempts:
-                day_idx = random.randint(0, len(self.days) - 1)
-                faculty = random.choice(available_faculty)
-                classroom = random.choice(available_classrooms)
+                day_idx = self.rng.randint(0, len(self.days) - 1)
+                faculty = self.rng.choice(available_faculty)
+                classroom = self.rng.choice(available_classrooms)
                 
                 # Special handling for lab subjects - use lab-specific time slots
                 if subject.get('requires_lab', False) and block_size == 4:
                     # For lab sessions, use specific lab start times
                     lab_start_times = self.get_lab_start_times()
-                    time_slot = random.choice(lab_start_times)
+                    time_slot = self.rng.choice(lab_start_times)
                 else:
                     # For regular classes, use normal time slots
-                    time_slot = random.choice(self.time_slots)
+                    time_slot = self.rng.choice(self.time_slots)
                 
                 # Check if continuous block can be scheduled
-                if self.can_schedule_block(day_idx, time_slot, faculty['id'], classroom['id'], schedule, block_size):
+                if self.can_schedule_block(day_idx, time_slot, faculty['id'], classroom['id'], occupancy, block_size, batch_id):
                     # Check faculty workload constraints
-                    daily_hours, total_hours = self.calculate_faculty_workload(faculty['id'], schedule)
+                    day_hours, total_hours = occupancy.faculty_workload(faculty['id'], day_idx)
                     
-                    if (daily_hours[day_idx] + block_size <= faculty.get('max_hours_per_day', 6) and 
+                    if (day_hours + block_size <= faculty.get('max_hours_per_day', 6) and 
                         total_hours + block_size <= faculty.get('max_hours_per_week', 20)):
                         
                         # Check if batch doesn't exceed max classes per day
-                        batch_daily_classes = sum(1 for entry in schedule 
-                                                if entry['day_of_week'] == day_idx and 
-                                                   entry.get('batch_id') == batch_id)
+                        batch_daily_classes = occupancy.batch_classes_on_day(batch_id, day_idx)
                         
                         if batch_daily_classes + block_size <= self.max_classes_per_day:
                             
@@ -548,7 +684,7 @@ class TimetableOptimizer:
                             block_slots = self.get_consecutive_slots(time_slot, block_size)
                             
                             for i, slot in enumerate(block_slots):
-                                schedule.append({
+                                new_entry = {
                                     'day_of_week': day_idx,
                                     'time_slot': slot,
                                     'subject_id': subject['id'],
@@ -559,10 +695,14 @@ class TimetableOptimizer:
                                     'block_size': block_size,
                                     'is_continuous_block': True if block_size > 1 else False,
                                     'is_lab': subject.get('requires_lab', False)
-                                })
+                                }
+                                schedule.append(new_entry)
+                                occupancy.add(new_entry)
                             
                             scheduled = True
                             scheduled_count += block_size
+                            placed_blocks += 1
+                            self.report_progress(blocks_placed=placed_blocks)
                 
                 attempts += 1
             
@@ -570,43 +710,11 @@ class TimetableOptimizer:
                 print(f"Could not schedule {subject['name']} after {max_attempts} attempts")
         
         print(f"Successfully scheduled {scheduled_count} out of {len(required_classes)} classes")
-        print(f"Timetable generated for {assigned_shift} shift")
         return schedule
     
     def evaluate_timetable(self, schedule):
         """Evaluate the quality of a timetable"""
-        score = 100
-        
-        # Penalty for uneven distribution across days
-        daily_classes = defaultdict(int)
-        for entry in schedule:
-            if not entry.get('is_fixed', False):
-                daily_classes[entry['day_of_week']] += 1
-        
-        if daily_classes:
-            avg_classes = sum(daily_classes.values()) / len(daily_classes)
-            for day_classes in daily_classes.values():
-                score -= abs(day_classes - avg_classes) * 2
-        
-        # Penalty for faculty overload
-        faculty_workload = defaultdict(int)
-        for entry in schedule:
-            faculty_workload[entry['faculty_id']] += 1
-        
-        for workload in faculty_workload.values():
-            if workload > 20:  # Assuming 20 is max weekly hours
-                score -= (workload - 20) * 5
-        
-        # Bonus for classroom utilization
-        classroom_usage = defaultdict(int)
-        for entry in schedule:
-            classroom_usage[entry['classroom_id']] += 1
-        
-        if classroom_usage:
-            avg_usage = sum(classroom_usage.values()) / len(classroom_usage)
-            score += avg_usage * 2
-        
-        return max(0, score)
+        return IncrementalScorer(schedule).score()
     
     def format_timetable_for_display(self, schedule):
         """Format timetable for frontend display"""
@@ -617,10 +725,18 @@ class TimetableOptimizer:
                 print(f"WARNING: Skipping entry with missing IDs - subject_id: {entry.get('subject_id')}, faculty_id: {entry.get('faculty_id')}, classroom_id: {entry.get('classroom_id')}")
                 continue
                 
-            # Get subject, faculty, and classroom details using SQLAlchemy
-            subject = Subject.query.get(entry['subject_id'])
-            faculty = Faculty.query.get(entry['faculty_id'])
-            classroom = Classroom.query.get(entry['classroom_id'])
+            # Get subject, faculty, and classroom details from the snapshot or using SQLAlchemy
+            if self.snapshot is not None:
+                subject = self.snapshot.subjects.get(entry['subject_id'])
+                faculty = self.snapshot.faculty.get(entry['faculty_id'])
+                classroom = self.snapshot.classrooms.get(entry['classroom_id'])
+            else:
+                subject = Subject.query.get(entry['subject_id'])
+                faculty = Faculty.query.get(entry['faculty_id'])
+                classroom = Classroom.query.get(entry['classroom_id'])
+                subject = {'name': subject.name, 'code': subject.code} if subject else None
+                faculty = {'name': faculty.name} if faculty else None
+                classroom = {'name': classroom.name} if classroom else None
             
             # Skip if any of the referenced objects don't exist
             if not all([subject, faculty, classroom]):
@@ -631,10 +747,10 @@ class TimetableOptimizer:
                 'day': self.days[entry['day_of_week']],
                 'day_index': entry['day_of_week'],
                 'time_slot': entry['time_slot'],
-                'subject_name': subject.name,
-                'subject_code': subject.code,
-                'faculty_name': faculty.name,
-                'classroom_name': classroom.name,
+                'subject_name': subject['name'],
+                'subject_code': subject['code'],
+                'faculty_name': faculty['name'],
+                'classroom_name': classroom['name'],
                 'is_fixed': entry.get('is_fixed', False),
                 'subject_id': entry['subject_id'],
                 'faculty_id': entry['faculty_id'],
@@ -743,30 +859,207 @@ class TimetableOptimizer:
         minutes = total_minutes % 60
         return f"{hours:02d}:{minutes:02d}"
     
-    def generate_optimized_timetables(self, batch_id, semester, num_options=3, include_short_break=False, short_break_duration=10, college_start_time='09:00', college_end_time='16:30', lunch_break_duration=60, lunch_break_start_time='12:15'):
-        """Generate multiple optimized timetable options"""
+    def generate_constrained_timetable(self, batch_id, semester, order_seed=None, occupancy=None):
+        """Generate a single timetable with the constraint propagation solver"""
+        print(f"Starting constraint-based generation for batch {batch_id}, semester {semester}")
+        
+        solver = ConstraintSolver(self)
+        if occupancy is None:
+            occupancy = ScheduleOccupancy(grid=self.slot_grid)
+        return solver.solve(batch_id, semester, occupancy, order_seed=order_seed)
+    
+    def improve_timetable(self, schedule, batch_id, occupancy=None, time_budget=1.0, max_iterations=2000):
+        """Run the local-search improvement phase over a generated schedule"""
+        improver = LocalSearchImprover(self, batch_id, time_budget=time_budget, max_iterations=max_iterations, rng=self.rng)
+        return improver.improve(schedule, occupancy=occupancy)
+    
+    def option_seeds(self, num_options):
+        """Per-option seeds derived from the run seed, so each option can be regenerated on its own"""
+        seeder = random.Random(self.seed)
+        return [seeder.randrange(2 ** 31) for _ in range(num_options)]
+    
+    def load_committed_occupancy(self, exclude_batch_ids=()):
+        """Build an occupancy index from the latest saved timetable of every other batch"""
+        latest_timetables = db.session.query(
+            db.func.max(Timetable.id)
+        ).group_by(Timetable.batch_id)
+        
+        query = db.session.query(
+            TimetableEntry.day_of_week,
+            TimetableEntry.time_slot,
+            TimetableEntry.faculty_id,
+            TimetableEntry.classroom_id,
+            TimetableEntry.batch_id
+        ).filter(TimetableEntry.timetable_id.in_(latest_timetables))
+        if exclude_batch_ids:
+            query = query.filter(~TimetableEntry.batch_id.in_(list(exclude_batch_ids)))
+        
+        occupancy = ScheduleOccupancy(grid=self.slot_grid)
+        for row in query.all():
+            occupancy.add({
+                'day_of_week': row.day_of_week,
+                'time_slot': row.time_slot,
+                'faculty_id': row.faculty_id,
+                'classroom_id': row.classroom_id,
+                'batch_id': row.batch_id
+            })
+        return occupancy
+    
+    def generate_institution_timetables(self, batches, engine='random', improve=False):
+        """
+        Schedule several batches in one pass against a shared occupancy model,
+        so faculty and classrooms are never double-booked across batches.
+        Classes already committed by batches outside this run are respected.
+        Returns one result per batch, in the order the batches were given.
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown timetable engine '{engine}'")
+        
+        occupancy = self.load_committed_occupancy(exclude_batch_ids=[batch.id for batch in batches])
+        self.snapshot = load_scheduling_snapshot([batch.id for batch in batches])
+        
+        # Batches with the most teaching hours are hardest to fit, so they go first
+        def required_hours(batch):
+            return sum(subject.get('hours_per_week', 0) for subject in self.get_batch_subjects(batch.id, batch.semester))
+        
+        results = {}
+        for batch in sorted(batches, key=required_hours, reverse=True):
+            print(f"Scheduling batch {batch.name} in institution-wide run")
+            shift = self.choose_shift()
+            if engine == 'csp':
+                schedule = self.generate_constrained_timetable(batch.id, batch.semester, occupancy=occupancy)
+            else:
+                schedule = self.generate_single_timetable(batch.id, batch.semester, occupancy=occupancy)
+            if improve and schedule:
+                schedule = self.improve_timetable(schedule, batch.id, occupancy=occupancy)
+            
+            scorer = IncrementalScorer(schedule)
+            results[batch.id] = {
+                'batch_id': batch.id,
+                'batch_name': batch.name,
+                'semester': batch.semester,
+                'shift': shift,
+                'score': scorer.score() if schedule else 0,
+                'schedule': self.format_timetable_for_display(schedule),
+                'total_classes': len([entry for entry in schedule if not entry.get('is_fixed', False)]),
+                'utilization_stats': scorer.utilization_stats()
+            }
+        
+        return [results[batch.id] for batch in batches]
+    
+    def generate_options_in_parallel(self, batch_id, semester, num_options, engine='random', max_workers=None, improve=False):
+        """Generate options concurrently in a process pool, returning (option_id, seed, shift, schedule, score) tuples"""
+        timing_config = {
+            'include_short_break': self.include_short_break,
+            'short_break_duration': self.short_break_duration,
+            'college_start_time': self.college_start_time,
+            'college_end_time': self.college_end_time,
+            'lunch_break_duration': self.lunch_break_duration,
+            'lunch_break_start_time': self.lunch_break_start_time
+        }
+        seeds = self.option_seeds(num_options)
+        
+        pool = get_process_pool(max_workers)
+        futures = []
+        results = []
+        try:
+            futures = [
+                pool.submit(generate_option_from_snapshot, timing_config, self.snapshot, batch_id, semester, engine, seed, improve)
+                for seed in seeds
+            ]
+            for i, future in enumerate(futures):
+                while True:
+                    self.check_cancelled()
+                    try:
+                        shift, schedule, score = future.result(timeout=0.5)
+                        break
+                    except FuturesTimeout:
+                        continue
+                results.append((i + 1, seeds[i], shift, schedule, score))
+                self.report_progress(options_done=i + 1, best_score=score if schedule else None)
+        except GenerationCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+        except BrokenProcessPool:
+            # A worker died; later requests get a new pool instead of this broken one
+            reset_process_pool(pool)
+            raise
+        return results
+    
+    def generate_optimized_timetables(self, batch_id, semester, num_options=3, include_short_break=False, short_break_duration=10, college_start_time='09:00', college_end_time='16:30', lunch_break_duration=60, lunch_break_start_time='12:15', engine='random', parallel=False, improve=False):
+        """
+        Generate multiple optimized timetable options. With improve=True each
+        option is refined by a local-search pass before it is scored. Nothing is
+        written to the database; each option carries the shift it was generated for.
+        """
         options = []
         
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown timetable engine '{engine}'")
+        
         try:
-            for i in range(num_options):
-                print(f"Generating timetable option {i+1}")
-                schedule = self.generate_single_timetable(batch_id, semester)
+            # One bulk load serves every option instead of per-class queries
+            self.snapshot = load_scheduling_snapshot([batch_id])
+            
+            if parallel:
+                try:
+                    for option_id, option_seed, shift, schedule, score in self.generate_options_in_parallel(batch_id, semester, num_options, engine, improve=improve):
+                        if not schedule:
+                            print(f"No schedule generated for option {option_id}")
+                            continue
+                        options.append({
+                            'option_id': option_id,
+                            'seed': option_seed,
+                            'shift': shift,
+                            'score': score,
+                            'schedule': self.format_timetable_for_display(schedule),
+                            'total_classes': len([entry for entry in schedule if not entry.get('is_fixed', False)]),
+                            'utilization_stats': self.get_utilization_stats(schedule)
+                        })
+                    
+                    options.sort(key=lambda x: x['score'], reverse=True)
+                    print(f"Generated {len(options)} total options in parallel")
+                    return options
+                except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                    # Some hosts (e.g. serverless) cannot start worker processes, and workers can be killed
+                    print(f"Parallel generation unavailable ({e}), falling back to sequential generation")
+                    options = []
+            
+            for i, option_seed in enumerate(self.option_seeds(num_options)):
+                print(f"Generating timetable option {i+1} (seed {option_seed})")
+                # Each option draws only from its own seed, so it can be regenerated on its own
+                self.rng = random.Random(option_seed)
+                shift = self.choose_shift()
+                if engine == 'csp':
+                    schedule = self.generate_constrained_timetable(batch_id, semester, order_seed=option_seed)
+                else:
+                    schedule = self.generate_single_timetable(batch_id, semester)
+                
+                if improve and schedule:
+                    schedule = self.improve_timetable(schedule, batch_id)
                 
                 if not schedule:
                     print(f"No schedule generated for option {i+1}")
+                    self.report_progress(options_done=i + 1)
                     continue
                     
-                score = self.evaluate_timetable(schedule)
+                # One pass builds the aggregates behind both the score and the stats
+                scorer = IncrementalScorer(schedule)
+                score = scorer.score()
                 formatted_schedule = self.format_timetable_for_display(schedule)
                 
                 options.append({
                     'option_id': i + 1,
+                    'seed': option_seed,
+                    'shift': shift,
                     'score': score,
                     'schedule': formatted_schedule,
                     'total_classes': len([entry for entry in schedule if not entry.get('is_fixed', False)]),
-                    'utilization_stats': self.get_utilization_stats(schedule)
+                    'utilization_stats': scorer.utilization_stats()
                 })
                 print(f"Option {i+1} generated successfully with score {score}")
+                self.report_progress(options_done=i + 1, best_score=score)
             
             # Sort by score (best first)
             options.sort(key=lambda x: x['score'], reverse=True)
@@ -774,6 +1067,9 @@ class TimetableOptimizer:
             
             return options
             
+        except GenerationCancelled:
+            print("Timetable generation cancelled")
+            raise
         except Exception as e:
             print(f"Error in generate_optimized_timetables: {str(e)}")
             import traceback
@@ -782,18 +1078,4 @@ class TimetableOptimizer:
     
     def get_utilization_stats(self, schedule):
         """Get utilization statistics for a timetable"""
-        faculty_hours = defaultdict(int)
-        classroom_hours = defaultdict(int)
-        daily_distribution = defaultdict(int)
-        
-        for entry in schedule:
-            if not entry.get('is_fixed', False):
-                faculty_hours[entry['faculty_id']] += 1
-                classroom_hours[entry['classroom_id']] += 1
-                daily_distribution[entry['day_of_week']] += 1
-        
-        return {
-            'faculty_utilization': dict(faculty_hours),
-            'classroom_utilization': dict(classroom_hours),
-            'daily_distribution': dict(daily_distribution)
-        }
+        return IncrementalScorer(schedule).utilization_stats()
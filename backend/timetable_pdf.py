@@ -0,0 +1,413 @@
+"""
+Timetable PDF Rendering
+Loads what a timetable PDF shows in a few bulk queries and renders it with
+ReportLab from plain data, so rendering needs no database session
+"""
+
+from models import db, Subject, Faculty, Classroom, Batch, Timetable, TimetableEntry, FacultySubject
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from process_pool import get_process_pool, reset_process_pool
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import hashlib
+import json
+
+DEFAULT_COLLEGE_NAME = "SRKR Engg. College (A) (Affiliated to JNTU Kakinada), Bhimavaram-534 204, India"
+DEPARTMENT_NAME = "Department of Computer Science and Engineering"
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+GRID_DAYS = DAY_NAMES[:6]
+
+# Columns of the printed grid, matching the reference layout
+GRID_TIME_SLOTS = [
+    "09:00-09:45",   # 1st period
+    "09:45-10:30",   # 2nd period
+    "10:30-11:15",   # 3rd period
+    "11:15-12:00",   # 4th period
+    "12:00-13:30",   # Lunch break
+    "01:30-02:15",   # 5th period
+    "02:15-03:00",   # 6th period
+    "03:00-03:45",   # 7th period
+    "03:45-04:30",   # 8th period
+    "04:30-05:15",   # 9th period (Sports/Counselling)
+]
+LUNCH_SLOT = "12:00-13:30"
+LAST_SLOT = "04:30-05:15"
+HEADER_LABELS = {LUNCH_SLOT: "12:00-01:30"}
+
+# Database time format -> PDF time format
+DB_TO_PDF_TIME = {
+    "09:00-09:45": "09:00-09:45",
+    "09:45-10:30": "09:45-10:30",
+    "10:30-11:15": "10:30-11:15",
+    "11:15-12:00": "11:15-12:00",
+    "12:00-13:30": "12:00-13:30",
+    "13:30-14:15": "01:30-02:15",
+    "14:15-15:00": "02:15-03:00",
+    "15:00-15:45": "03:00-03:45",
+    "15:45-16:30": "03:45-04:30",
+    "16:30-17:15": "04:30-05:15",
+}
+
+
+def map_db_time_to_pdf_time(db_time):
+    """Map database time format to PDF time format"""
+    return DB_TO_PDF_TIME.get(db_time, db_time)
+
+
+def load_timetable_pdf_data(timetable_ids):
+    """
+    Everything the PDFs of the given timetables show, as plain dictionaries
+    keyed by timetable id. Uses four queries however many timetables or
+    entries there are.
+    """
+    timetable_ids = list(timetable_ids)
+    if not timetable_ids:
+        return {}
+
+    timetables = db.session.query(
+        Timetable.id, Timetable.name, Timetable.semester, Timetable.academic_year,
+        Timetable.college_name, Timetable.timing_config, Batch.name.label('batch_name')
+    ).outerjoin(Batch, Timetable.batch_id == Batch.id).filter(Timetable.id.in_(timetable_ids)).all()
+
+    generated_on = datetime.now().strftime('%d-%m-%Y')
+    data = {}
+    for row in timetables:
+        try:
+            timing_config = json.loads(row.timing_config) if row.timing_config else {}
+        except (TypeError, ValueError):
+            timing_config = {}
+        data[row.id] = {
+            'id': row.id,
+            'name': row.name,
+            'semester': row.semester,
+            'academic_year': row.academic_year,
+            'college_name': row.college_name if row.college_name and row.college_name.strip() else DEFAULT_COLLEGE_NAME,
+            'batch_name': row.batch_name,
+            'timing_config': timing_config,
+            'generated_on': generated_on,
+            'entries': [],
+            'courses': []
+        }
+
+    entries = db.session.query(
+        TimetableEntry.timetable_id,
+        TimetableEntry.day_of_week,
+        TimetableEntry.time_slot,
+        TimetableEntry.subject_id,
+        Subject.name.label('subject_name'),
+        Subject.code.label('subject_code'),
+        Subject.requires_lab,
+        Faculty.name.label('faculty_name'),
+        Classroom.name.label('classroom_name')
+    ).outerjoin(Subject, TimetableEntry.subject_id == Subject.id
+    ).outerjoin(Faculty, TimetableEntry.faculty_id == Faculty.id
+    ).outerjoin(Classroom, TimetableEntry.classroom_id == Classroom.id
+    ).filter(TimetableEntry.timetable_id.in_(list(data))
+    ).order_by(TimetableEntry.timetable_id, TimetableEntry.id).all()
+
+    scheduled_subjects = {timetable_id: set() for timetable_id in data}
+    for row in entries:
+        data[row.timetable_id]['entries'].append({
+            'day': DAY_NAMES[row.day_of_week] if row.day_of_week < len(DAY_NAMES) else 'Unknown',
+            'time_slot': row.time_slot,
+            'subject_id': row.subject_id,
+            'subject_name': row.subject_name or 'Unknown Subject',
+            'subject_code': row.subject_code or 'N/A',
+            'faculty_name': row.faculty_name or 'Unknown Faculty',
+            'classroom_name': row.classroom_name or 'Unknown Room',
+            'requires_lab': bool(row.requires_lab)
+        })
+        if row.subject_id:
+            scheduled_subjects[row.timetable_id].add(row.subject_id)
+
+    subject_ids = set().union(*scheduled_subjects.values())
+    if not subject_ids:
+        return data
+
+    subjects = {subject.id: subject for subject in db.session.query(
+        Subject.id, Subject.code, Subject.name, Subject.credits, Subject.hours_per_week, Subject.requires_lab
+    ).filter(Subject.id.in_(subject_ids))}
+
+    # The course table names the first faculty mapped to each subject
+    teachers = {}
+    for row in db.session.query(FacultySubject.subject_id, Faculty.name).join(
+        Faculty, FacultySubject.faculty_id == Faculty.id
+    ).filter(FacultySubject.subject_id.in_(subject_ids)).order_by(FacultySubject.id):
+        teachers.setdefault(row.subject_id, row.name)
+
+    for timetable_id, ids in scheduled_subjects.items():
+        for subject_id in sorted(ids):
+            subject = subjects.get(subject_id)
+            if subject:
+                data[timetable_id]['courses'].append({
+                    'code': subject.code,
+                    'name': subject.name,
+                    'credits': subject.credits or 0,
+                    'hours_per_week': subject.hours_per_week or 0,
+                    'requires_lab': bool(subject.requires_lab),
+                    'faculty_name': teachers.get(subject_id, 'TBD')
+                })
+    return data
+
+
+def pdf_content_hash(data):
+    """SHA-256 of everything a PDF renders, so any change to it yields a new cache key"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def section_label(batch_name):
+    """Extract section from batch name (e.g., "CSE-A-2025" -> "Sec-A")"""
+    section = "Sec-A"  # Default section
+    if batch_name:
+        parts = batch_name.split('-')
+        if len(parts) >= 2:
+            section = f"Sec-{parts[1]}"
+        elif len(parts) == 1 and len(batch_name) > 3:
+            # Handle cases like "CSEA" -> "Sec-A"
+            section = f"Sec-{batch_name[-1]}"
+    return section
+
+
+def semester_suffix(semester):
+    return 'st' if semester == 1 else 'nd' if semester == 2 else 'rd' if semester == 3 else 'th'
+
+
+def build_timetable_elements(data):
+    """ReportLab flowables for one timetable: header, weekly grid and course details"""
+    elements = []
+    styles = getSampleStyleSheet()
+
+    college_style = ParagraphStyle(
+        'CollegeHeader',
+        parent=styles['Heading1'],
+        fontSize=14,
+        spaceAfter=5,
+        alignment=1,  # Center alignment
+        textColor=colors.darkblue
+    )
+    dept_style = ParagraphStyle(
+        'DeptHeader',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceAfter=10,
+        alignment=1,  # Center alignment
+        textColor=colors.darkblue
+    )
+    elements.append(Paragraph(data['college_name'], college_style))
+    elements.append(Paragraph(DEPARTMENT_NAME, dept_style))
+
+    # Info table with timetable details
+    info_data = [
+        [section_label(data['batch_name']),
+         f"B.Tech. AIML: {data['academic_year']} {data['semester']}{semester_suffix(data['semester'])} Semester",
+         f"w.e.f. {data['generated_on']}",
+         "Room: H-301"]
+    ]
+    info_table = Table(info_data, colWidths=[1.5*inch, 3*inch, 1.5*inch, 1.5*inch])
+    info_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+    ]))
+    elements.append(info_table)
+    elements.append(Spacer(1, 15))
+
+    # Place entries by day name and stored time slot; labs are marked on their 3-hour block
+    timetable_data = {day_name: {} for day_name in GRID_DAYS}
+    for entry in data['entries']:
+        day = entry['day']
+        if day not in timetable_data:
+            continue
+        if entry['requires_lab'] and entry['time_slot'] in ["09:00-12:00", "13:30-16:30"]:
+            timetable_data[day][entry['time_slot']] = f"{entry['subject_name']} (LAB)"
+        else:
+            timetable_data[day][entry['time_slot']] = entry['subject_name']
+
+    table_data = [['Day/Time'] + [HEADER_LABELS.get(slot, slot) for slot in GRID_TIME_SLOTS]]
+    for day_name in GRID_DAYS:
+        row = [day_name]
+        for time_slot in GRID_TIME_SLOTS:
+            if time_slot == LUNCH_SLOT:
+                row.append("LUNCH BREAK")
+            elif time_slot == LAST_SLOT:
+                # Last period - check if there's actual scheduled content
+                row.append(timetable_data[day_name].get(time_slot, "") or "---")
+            else:
+                row.append(timetable_data[day_name].get(time_slot, ""))
+        table_data.append(row)
+
+    # Column widths for landscape orientation
+    available_width = landscape(A4)[0] - 72  # Total width minus margins
+    day_col_width = 0.8*inch
+    time_col_width = (available_width - day_col_width) / len(GRID_TIME_SLOTS)
+    col_widths = [day_col_width] + [time_col_width] * len(GRID_TIME_SLOTS)
+
+    grid_style = [
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+
+        # Day column styling
+        ('BACKGROUND', (0, 1), (0, -1), colors.lightblue),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (0, -1), 8),
+        ('TEXTCOLOR', (0, 1), (0, -1), colors.darkblue),
+
+        # Data cells styling
+        ('FONTNAME', (1, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (1, 1), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 3),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+
+        # Alternating row colors for better readability
+        ('ROWBACKGROUNDS', (1, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ]
+
+    # Lunch break cells orange, labs light blue, other classes light green
+    for row_idx in range(1, len(table_data)):
+        for col_idx, time_slot in enumerate(GRID_TIME_SLOTS, start=1):
+            cell = (col_idx, row_idx)
+            if time_slot == LUNCH_SLOT:
+                grid_style.extend([
+                    ('BACKGROUND', cell, cell, colors.orange),
+                    ('FONTNAME', cell, cell, 'Helvetica-Bold'),
+                    ('TEXTCOLOR', cell, cell, colors.white),
+                ])
+            else:
+                cell_content = table_data[row_idx][col_idx]
+                if cell_content and cell_content.strip():
+                    background = colors.lightblue if "LAB" in cell_content.upper() else colors.lightgreen
+                    grid_style.extend([
+                        ('BACKGROUND', cell, cell, background),
+                        ('FONTNAME', cell, cell, 'Helvetica-Bold'),
+                    ])
+
+    table = Table(table_data, colWidths=col_widths)
+    table.setStyle(TableStyle(grid_style))
+    elements.append(table)
+    elements.append(Spacer(1, 20))
+
+    # Course details for the subjects actually scheduled in this timetable
+    course_title_style = ParagraphStyle(
+        'CourseTitle',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceAfter=10,
+        alignment=1,  # Center alignment
+        textColor=colors.darkblue
+    )
+    elements.append(Paragraph("Course Details", course_title_style))
+
+    course_data = [
+        ['Course Code', 'Course (Credits)', 'Teacher', 'Lec.', 'Tut.', 'Lab']
+    ]
+    total_lec = 0
+    total_tut = 0
+    total_lab = 0
+    for course in data['courses']:
+        # Hours based on subject type
+        lec_hours = course['hours_per_week'] if not course['requires_lab'] else max(0, course['hours_per_week'] - 3)
+        tut_hours = 1 if course['credits'] >= 3 and not course['requires_lab'] else 0
+        lab_hours = 3 if course['requires_lab'] else 0
+
+        total_lec += lec_hours
+        total_tut += tut_hours
+        total_lab += lab_hours
+
+        course_data.append([
+            course['code'],
+            f"{course['name']} ({course['credits']})",
+            course['faculty_name'],
+            str(lec_hours),
+            str(tut_hours),
+            str(lab_hours)
+        ])
+    course_data.append(['', 'Total', '', str(total_lec), str(total_tut), str(total_lab)])
+
+    course_table = Table(course_data, colWidths=[1*inch, 4*inch, 2*inch, 0.8*inch, 0.8*inch, 0.8*inch])
+    course_table.setStyle(TableStyle([
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+        # Data styling
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -2), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+
+        # Total row styling
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 10),
+    ]))
+    elements.append(course_table)
+    return elements
+
+
+def render_timetable_pdf(data, output):
+    """Write the PDF for one timetable's data to a binary file-like object"""
+    doc = SimpleDocTemplate(output, pagesize=landscape(A4), rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    doc.build(build_timetable_elements(data))
+
+
+def render_timetable_pdf_file(data, path):
+    """Process-pool entry point: render one timetable's data to a PDF file"""
+    with open(path, 'wb') as output:
+        render_timetable_pdf(data, output)
+
+
+def render_timetable_pdf_files(jobs, max_workers=None):
+    """
+    Render {timetable_id: (data, path)} to files, in worker processes when
+    there are several. Yields each timetable id once its file is complete.
+    If the pool breaks (a worker died), it is reset and the files not yet
+    finished are rendered in this process. jobs is copied up front, so the
+    caller may remove each id from it as it is yielded.
+    """
+    pending = list(jobs.items())
+    if len(pending) <= 1:
+        # Not worth a round trip to the pool
+        for timetable_id, (data, path) in pending:
+            render_timetable_pdf_file(data, path)
+            yield timetable_id
+        return
+    pool = get_process_pool(max_workers)
+    futures = {}
+    done = set()
+    try:
+        try:
+            for timetable_id, (data, path) in pending:
+                futures[timetable_id] = pool.submit(render_timetable_pdf_file, data, path)
+            for timetable_id, future in futures.items():
+                future.result()
+                done.add(timetable_id)
+                yield timetable_id
+        except BrokenProcessPool as e:
+            print(f"PDF render pool broke ({e}), rendering the rest in-process")
+            reset_process_pool(pool)
+            for timetable_id, (data, path) in pending:
+                if timetable_id not in done:
+                    render_timetable_pdf_file(data, path)
+                    yield timetable_id
+    finally:
+        for future in futures.values():
+            future.cancel()
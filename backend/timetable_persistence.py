@@ -0,0 +1,211 @@
+"""
+Timetable Persistence
+Validates incoming timetable entries in one pass and writes them with bulk
+statements, touching only the rows that changed when a timetable is edited
+"""
+
+from models import db, Subject, Faculty, Classroom, Batch, TimetableEntry, TimetableSlot
+from slot_grid import SlotGrid
+from sqlalchemy import bindparam
+from collections import defaultdict
+
+DAYS_PER_WEEK = 7
+TIME_SLOT_LENGTH = TimetableEntry.__table__.c.time_slot.type.length
+
+# What an entry assigns to its cell
+ASSIGNMENT_FIELDS = ('subject_id', 'faculty_id', 'classroom_id')
+
+# Entry field -> model its id must exist in
+REFERENCES = (
+    ('subject_id', Subject),
+    ('faculty_id', Faculty),
+    ('classroom_id', Classroom),
+    ('batch_id', Batch)
+)
+
+
+def prepare_entry_rows(timetable_id, entries, day_key='day_of_week', batch_id=None, grid=None):
+    """
+    Validate entries (dicts from the editor or generator) and turn them into
+    timetable_entries rows. Entries with missing fields are skipped, as before;
+    malformed values, ids that do not exist and several entries for one cell
+    (day_of_week, time_slot, batch_id), which uq_timetable_entries_cell forbids,
+    are reported instead of failing the insert halfway. References are checked
+    with one query per table.
+    With a SlotGrid, rows also get the slot_index of their time_slot.
+    Returns (rows, skipped, errors).
+    """
+    rows = []
+    skipped = 0
+    errors = []
+    cells = {}  # entry key -> position of the entry that holds the cell
+    for position, entry in enumerate(entries):
+        row = {
+            'timetable_id': timetable_id,
+            'subject_id': entry.get('subject_id'),
+            'faculty_id': entry.get('faculty_id'),
+            'classroom_id': entry.get('classroom_id'),
+            'day_of_week': entry.get(day_key),
+            'time_slot': entry.get('time_slot'),
+            'batch_id': entry.get('batch_id') or batch_id
+        }
+        if not all([row['subject_id'], row['faculty_id'], row['classroom_id'], row['day_of_week'] is not None, row['time_slot'], row['batch_id']]):
+            print(f"WARNING: Skipping entry {position} with missing data - subject_id: {row['subject_id']}, faculty_id: {row['faculty_id']}, classroom_id: {row['classroom_id']}, day: {row['day_of_week']}, time_slot: {row['time_slot']}, batch_id: {row['batch_id']}")
+            skipped += 1
+            continue
+        try:
+            for field in ('subject_id', 'faculty_id', 'classroom_id', 'day_of_week', 'batch_id'):
+                row[field] = int(row[field])
+        except (TypeError, ValueError):
+            errors.append(f"Entry {position}: {field} must be an integer")
+            continue
+        if not 0 <= row['day_of_week'] < DAYS_PER_WEEK:
+            errors.append(f"Entry {position}: day_of_week {row['day_of_week']} is out of range")
+            continue
+        if not isinstance(row['time_slot'], str) or len(row['time_slot']) > TIME_SLOT_LENGTH:
+            errors.append(f"Entry {position}: invalid time_slot {row['time_slot']!r}")
+            continue
+        key = entry_key(row)
+        if key in cells:
+            errors.append(f"Entry {position}: day {key[0]}, {key[1]} for batch {key[2]} is already taken by entry {cells[key]}")
+            continue
+        cells[key] = position
+        row['slot_index'] = grid.ordinal(row['time_slot']) if grid else None
+        rows.append(row)
+
+    for field, model in REFERENCES:
+        ids = {row[field] for row in rows}
+        if not ids:
+            continue
+        known = {row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(ids))}
+        for missing in sorted(ids - known):
+            errors.append(f"Unknown {field.replace('_id', '')} id {missing}")
+    return rows, skipped, errors
+
+
+def store_slot_grid(grid, timetable_ids):
+    """Write grid as the timetable_slots of each timetable, in one executemany"""
+    rows = [row for timetable_id in timetable_ids for row in grid.slot_rows(timetable_id)]
+    if rows:
+        db.session.execute(TimetableSlot.__table__.insert(), rows)
+
+
+def load_slot_grid(timetable):
+    """
+    SlotGrid of a saved timetable from its timetable_slots; timetables saved
+    before slot ordinals existed get theirs built from timing_config and stored.
+    """
+    slots = db.session.query(TimetableSlot.time_slot).filter_by(timetable_id=timetable.id).order_by(TimetableSlot.ordinal).all()
+    if slots:
+        return SlotGrid([time_slot for (time_slot,) in slots])
+    grid = SlotGrid.from_timing_config(timetable.timing_config)
+    store_slot_grid(grid, [timetable.id])
+    return grid
+
+
+def parse_cell(cell, batch_id=None):
+    """Entry key (day_of_week, time_slot, batch_id) for a cell dict; returns (key, error message)"""
+    try:
+        day_of_week = int(cell.get('day_of_week'))
+        batch_id = int(cell.get('batch_id') or batch_id)
+    except (TypeError, ValueError):
+        return None, 'day_of_week and batch_id must be integers'
+    time_slot = cell.get('time_slot')
+    if not 0 <= day_of_week < DAYS_PER_WEEK:
+        return None, f"day_of_week {day_of_week} is out of range"
+    if not time_slot or not isinstance(time_slot, str) or len(time_slot) > TIME_SLOT_LENGTH:
+        return None, f"invalid time_slot {time_slot!r}"
+    return (day_of_week, time_slot, batch_id), None
+
+
+def insert_entry_rows(rows):
+    """Insert prepared rows as one executemany"""
+    if not rows:
+        return
+    # Core inserts keep every row in one executemany; ORM bulk mode splits on NULL columns
+    db.session.execute(TimetableEntry.__table__.insert(), rows)
+
+
+def entry_key(entry):
+    """Cell a timetable entry occupies: (day_of_week, time_slot, batch_id)"""
+    return entry['day_of_week'], entry['time_slot'], entry['batch_id']
+
+
+def diff_timetable_entries(stored, rows):
+    """
+    Compare stored entries (dicts with id) with incoming rows cell by cell.
+    Rows sharing a cell are paired in order. Returns (inserts, updates, deletes):
+    rows to insert, (entry id, row) pairs whose subject, faculty or classroom
+    changed, and entry ids to delete.
+    """
+    stored_by_key = defaultdict(list)
+    for entry in stored:
+        stored_by_key[entry_key(entry)].append(entry)
+    incoming_by_key = defaultdict(list)
+    for row in rows:
+        incoming_by_key[entry_key(row)].append(row)
+
+    inserts, updates, deletes = [], [], []
+    for key in set(stored_by_key) | set(incoming_by_key):
+        existing = stored_by_key.get(key, [])
+        incoming = incoming_by_key.get(key, [])
+        for entry, row in zip(existing, incoming):
+            if any(entry[field] != row[field] for field in ASSIGNMENT_FIELDS):
+                updates.append((entry['id'], row))
+        deletes.extend(entry['id'] for entry in existing[len(incoming):])
+        inserts.extend(incoming[len(existing):])
+    return inserts, updates, deletes
+
+
+def sync_timetable_entries(timetable_id, rows, cells=None):
+    """
+    Make a timetable's stored entries match rows with only the statements
+    needed: one bulk INSERT, one executemany UPDATE and one DELETE at most.
+    With cells (a collection of entry keys) only those cells are compared,
+    so a single-cell edit leaves every other row alone.
+    Returns counts of inserted, updated, deleted and unchanged entries.
+    """
+    table = TimetableEntry.__table__
+    query = db.session.query(
+        table.c.id, table.c.day_of_week, table.c.time_slot, table.c.batch_id,
+        table.c.subject_id, table.c.faculty_id, table.c.classroom_id
+    ).filter(table.c.timetable_id == timetable_id)
+    if cells is not None:
+        cells = set(cells)
+        if not cells:
+            return {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        query = query.filter(table.c.day_of_week.in_({cell[0] for cell in cells}),
+                             table.c.time_slot.in_({cell[1] for cell in cells}))
+    stored = [dict(row._mapping) for row in query]
+    if cells is not None:
+        stored = [entry for entry in stored if entry_key(entry) in cells]
+        rows = [row for row in rows if entry_key(row) in cells]
+
+    inserts, updates, deletes = diff_timetable_entries(stored, rows)
+    if deletes:
+        db.session.execute(table.delete().where(table.c.id.in_(deletes)))
+    if updates:
+        # A changed cell is reset like a re-inserted row would be
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('entry_id')).values(
+                subject_id=bindparam('new_subject_id'),
+                faculty_id=bindparam('new_faculty_id'),
+                classroom_id=bindparam('new_classroom_id'),
+                is_temporary_allocation=False,
+                original_classroom_owner_id=None,
+                allocation_reason=None
+            ),
+            [{'entry_id': entry_id,
+              'new_subject_id': row['subject_id'],
+              'new_faculty_id': row['faculty_id'],
+              'new_classroom_id': row['classroom_id']} for entry_id, row in updates]
+        )
+    for row in inserts:
+        row['timetable_id'] = timetable_id
+    insert_entry_rows(inserts)
+    return {
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deleted': len(deletes),
+        'unchanged': len(stored) - len(updates) - len(deletes)
+    }